@@ -0,0 +1,207 @@
+"""Admission control: per-route concurrency limits, bounded wait queues and client deadlines.
+
+    ADMISSION_LIMITS         concurrency:queue per route class, e.g. 'predict=64:256,feedback=4:16'
+                             (empty disables admission control)
+    ADMISSION_QUEUE_TIMEOUT  longest wait in a queue, in seconds
+    ADMISSION_RETRY_AFTER    Retry-After of rejected requests, in seconds
+
+Routes are grouped in classes (ROUTE_CLASSES). A request of a class with a
+free slot runs at once; otherwise it waits in the class queue, and is
+rejected when the queue is full (429), when it waited longer than the queue
+timeout (503) or when its deadline passed (503), without running the
+handler. Routes outside ROUTE_CLASSES (health, metrics) are never limited.
+Rejections carry Retry-After and an X-Load-Shed header with the reason,
+which tells clients the request was not processed: it is safe to resend
+after Retry-After, and it is not a backend failure.
+
+Classes are served by priority (PRIORITY, predict first): a request of a
+lower class doesn't start, even with a free slot of its own, while a higher
+class has requests waiting. Under a /predict spike the feedback route
+queues up and sheds load instead of competing for the event loop.
+
+A client that gives up after some time sends it in the X-Deadline-Ms
+header (milliseconds from when the request reaches the server); a request
+still queued when it expires is dropped rather than scored for nobody.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+
+from prometheus_client import Gauge, Histogram
+
+from model_variants import parse_pairs
+
+DEADLINE_HEADER = 'X-Deadline-Ms'
+LOAD_SHED_HEADER = 'X-Load-Shed'
+
+# Route path -> class, and the classes from highest to lowest priority
+ROUTE_CLASSES = {
+    '/predict': 'predict',
+    '/predict/batch': 'predict',
+    '/predict/matrix': 'predict',
+    '/feedback': 'feedback',
+}
+PRIORITY = ['predict', 'feedback']
+
+ADMISSION_IN_FLIGHT = Gauge(
+    'app_admission_in_flight',
+    'Requests running per route class',
+    ['route_class'],
+    multiprocess_mode='livesum'
+)
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    'app_admission_queue_depth',
+    'Requests waiting for a slot per route class',
+    ['route_class'],
+    multiprocess_mode='livesum'
+)
+
+ADMISSION_QUEUE_WAIT = Histogram(
+    'app_admission_queue_wait_seconds',
+    'Time a queued request waited for a slot (admitted or not)',
+    ['route_class'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+
+class AdmissionRejected(Exception):
+    """A request refused by admission control, reason is queue_full, queue_timeout or deadline"""
+
+    def __init__(self, message, status_code, reason, retry_after):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def headers(self):
+        return {'Retry-After': str(max(math.ceil(self.retry_after), 1)), LOAD_SHED_HEADER: self.reason}
+
+
+def parse_limits(text):
+    """'predict=64:256,feedback=4' -> {'predict': (64, 256), 'feedback': (4, 0)}"""
+    limits = {}
+    for name, value in parse_pairs(text).items():
+        concurrency, _, queue = value.partition(':')
+        limits[name] = (int(concurrency), int(queue or 0))
+        if limits[name][0] < 1 or limits[name][1] < 0:
+            raise ValueError(f"Admission limit of {name!r} needs concurrency >= 1 and queue >= 0, got {value!r}")
+    return limits
+
+
+def parse_deadline(headers, start_ns):
+    """perf_counter_ns() deadline from the X-Deadline-Ms header, None without one"""
+    value = headers.get(DEADLINE_HEADER)
+    if value is None:
+        return None
+    try:
+        milliseconds = float(value)
+    except ValueError:
+        raise ValueError(f"{DEADLINE_HEADER} must be a number of milliseconds, got {value!r}")
+    if math.isnan(milliseconds):
+        raise ValueError(f"{DEADLINE_HEADER} must be a number of milliseconds, got {value!r}")
+    return start_ns + int(min(milliseconds, 1e12) * 1e6)
+
+
+class AdmissionController:
+    """Slots and FIFO wait queues per route class, handed out by class priority.
+
+    limits maps class -> (concurrency, queue size); classes missing from
+    limits are not limited. Used from the event loop only, so no locks.
+    """
+
+    def __init__(self, limits, priority=PRIORITY, queue_timeout=1.0, retry_after=1.0):
+        self.limits = dict(limits)
+        self.priority = [name for name in priority if name in self.limits] + \
+                        [name for name in self.limits if name not in priority]
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = dict.fromkeys(self.limits, 0)
+        self.waiters = {name: deque() for name in self.limits}
+
+    @classmethod
+    def from_env(cls, limits_spec, queue_timeout=1.0, retry_after=1.0):
+        limits = parse_limits(limits_spec)
+        return cls(limits, queue_timeout=queue_timeout, retry_after=retry_after) if limits else None
+
+    def route_class(self, path):
+        name = ROUTE_CLASSES.get(path)
+        return name if name in self.limits else None
+
+    def _can_start(self, name):
+        if self.in_flight[name] >= self.limits[name][0]:
+            return False
+        # Higher priority classes with requests waiting go first
+        for other in self.priority:
+            if other == name:
+                return True
+            if self.waiters[other]:
+                return False
+        return True
+
+    async def acquire(self, name, deadline_ns=None):
+        """Wait for a slot of class name, returns the seconds spent queued; raises AdmissionRejected"""
+        if deadline_ns is not None and time.perf_counter_ns() >= deadline_ns:
+            raise AdmissionRejected("Request deadline already passed", 503, 'deadline', self.retry_after)
+        waiters = self.waiters[name]
+        if not waiters and self._can_start(name):
+            self._start(name)
+            return 0.0
+        if len(waiters) >= self.limits[name][1]:
+            raise AdmissionRejected(f"Too many {name} requests waiting, please retry later", 429, 'queue_full',
+                                    self.retry_after)
+
+        timeout, reason = self.queue_timeout, 'queue_timeout'
+        if deadline_ns is not None and (deadline_ns - time.perf_counter_ns()) / 1e9 < timeout:
+            timeout, reason = (deadline_ns - time.perf_counter_ns()) / 1e9, 'deadline'
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        ADMISSION_QUEUE_DEPTH.labels(name).inc()
+        start_time = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, max(timeout, 0))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended, give it to the next request
+                self.release(name)
+            else:
+                waiter.cancel()
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                    ADMISSION_QUEUE_DEPTH.labels(name).dec()
+                # A higher priority queue that emptied may unblock a lower one
+                self._wake()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            message = "Request deadline passed while queued" if reason == 'deadline' else \
+                f"No {name} slot freed up within {self.queue_timeout:g}s, please retry later"
+            raise AdmissionRejected(message, 503, reason, self.retry_after)
+        finally:
+            ADMISSION_QUEUE_WAIT.labels(name).observe(time.perf_counter() - start_time)
+        return time.perf_counter() - start_time
+
+    def release(self, name):
+        self.in_flight[name] -= 1
+        ADMISSION_IN_FLIGHT.labels(name).dec()
+        self._wake()
+
+    def _start(self, name):
+        self.in_flight[name] += 1
+        ADMISSION_IN_FLIGHT.labels(name).inc()
+
+    def _wake(self):
+        """Hand free slots to waiting requests, highest priority class first"""
+        for name in self.priority:
+            waiters = self.waiters[name]
+            while waiters and self._can_start(name):
+                waiter = waiters.popleft()
+                ADMISSION_QUEUE_DEPTH.labels(name).dec()
+                if not waiter.done():
+                    self._start(name)
+                    waiter.set_result(None)
+            if waiters:
+                # This class is still at its limit, lower ones keep waiting
+                return
@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import numpy as np
+from prometheus_client import Gauge, Histogram
+
+MICROBATCH_QUEUE_DEPTH = Gauge(
+    'app_microbatch_queue_depth',
+    'Rows waiting in the /predict micro-batch queue',
+    multiprocess_mode='livesum'
+)
+
+MICROBATCH_SIZE = Histogram(
+    'app_microbatch_batch_size',
+    'Rows scored per micro-batch flush',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+)
+
+MICROBATCH_WAIT = Histogram(
+    'app_microbatch_wait_seconds',
+    'Time a row spends queued before its micro-batch is scored',
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05)
+)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row requests into one matrix computation.
+
+    Rows are queued until either max_batch_size rows are waiting or the oldest
+    row has waited max_wait_us microseconds, then score_fn is called once on
+    the stacked (n, d) matrix and each caller gets its own row of the result.
+    """
+
+    def __init__(self, score_fn, max_batch_size=64, max_wait_us=500):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_us = max_wait_us
+        self._rows = []
+        self._futures = []
+        self._enqueued_at = []
+        self._timer = None
+
+    async def submit(self, row):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._rows.append(row)
+        self._futures.append(future)
+        self._enqueued_at.append(time.perf_counter())
+        MICROBATCH_QUEUE_DEPTH.set(len(self._rows))
+
+        if len(self._rows) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_us / 1e6, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        rows, futures, enqueued_at = self._rows, self._futures, self._enqueued_at
+        self._rows, self._futures, self._enqueued_at = [], [], []
+        MICROBATCH_QUEUE_DEPTH.set(0)
+        if not rows:
+            return
+
+        now = time.perf_counter()
+        for t in enqueued_at:
+            MICROBATCH_WAIT.observe(now - t)
+        MICROBATCH_SIZE.observe(len(rows))
+
+        try:
+            results = self.score_fn(np.array(rows, dtype=float))
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            # The caller may have gone away (client disconnect / cancellation)
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,92 @@
+"""Binary request/response format of /predict/matrix for high-volume clients.
+
+A request is a raw little-endian row-major matrix with a 12-byte header:
+
+    magic b'LPDX', format version (u8), itemsize (u8, 4 = float32, 8 = float64),
+    n_features (u16), n_rows (u32), then n_rows * n_features floats
+
+with the columns in FEATURE_NAMES order. The response uses the same layout
+with magic b'LPDY' and a single column of probabilities in the request's
+float type; rows that failed validation score NaN.
+
+The body is wrapped with np.frombuffer, so no per-row Python object is built.
+"""
+
+import struct
+
+import numpy as np
+
+from inference import FEATURE_NAMES
+
+MATRIX_CONTENT_TYPE = 'application/x-lpd-matrix'
+REQUEST_MAGIC = b'LPDX'
+RESPONSE_MAGIC = b'LPDY'
+MATRIX_FORMAT_VERSION = 1
+MATRIX_HEADER = struct.Struct('<4sBBHI')
+DTYPES = {4: np.dtype('<f4'), 8: np.dtype('<f8')}
+
+# Accepted value ranges per feature, the same as the frontend's PredictionForm
+FEATURE_RANGES = {
+    'age': (0.1, 120),
+    'gender': (0, 1),
+    'total_bilirubin': (0, 100),
+    'direct_bilirubin': (0, 100),
+    'alkaline_phosphotase': (0, 2000),
+    'alanine_aminotransferase': (0, 2000),
+    'aspartate_aminotransferase': (0, 2000),
+    'total_proteins': (0, 20),
+    'albumin': (0, 10),
+    'albumin_globulin_ratio': (0, 10),
+}
+LOWER_BOUNDS = np.array([FEATURE_RANGES[name][0] for name in FEATURE_NAMES], dtype=np.float64)
+UPPER_BOUNDS = np.array([FEATURE_RANGES[name][1] for name in FEATURE_NAMES], dtype=np.float64)
+GENDER_COLUMN = FEATURE_NAMES.index('gender')
+
+
+def _pack(magic, matrix):
+    matrix = np.ascontiguousarray(matrix)
+    n_rows, n_cols = matrix.shape
+    header = MATRIX_HEADER.pack(magic, MATRIX_FORMAT_VERSION, matrix.dtype.itemsize, n_cols, n_rows)
+    return header + matrix.astype(matrix.dtype.newbyteorder('<'), copy=False).tobytes()
+
+
+def _unpack(magic, body):
+    if len(body) < MATRIX_HEADER.size:
+        raise ValueError("Body is shorter than the matrix header")
+    found_magic, version, itemsize, n_cols, n_rows = MATRIX_HEADER.unpack_from(body)
+    if found_magic != magic:
+        raise ValueError("Body is not an LPD matrix")
+    if version != MATRIX_FORMAT_VERSION or itemsize not in DTYPES:
+        raise ValueError(f"Unsupported matrix format v{version} (itemsize {itemsize})")
+    if len(body) != MATRIX_HEADER.size + n_rows * n_cols * itemsize:
+        raise ValueError(f"Body length does not match a {n_rows}x{n_cols} float{itemsize * 8} matrix")
+    return np.frombuffer(body, dtype=DTYPES[itemsize], offset=MATRIX_HEADER.size).reshape(n_rows, n_cols)
+
+
+def encode_matrix(X, dtype=np.float64):
+    """Request body for an (n, 10) matrix of raw features"""
+    return _pack(REQUEST_MAGIC, np.asarray(X, dtype=dtype).reshape(-1, len(FEATURE_NAMES)))
+
+
+def decode_matrix(body):
+    """Read-only (n, 10) view of a request body, raises ValueError if it is malformed"""
+    X = _unpack(REQUEST_MAGIC, body)
+    if X.shape[1] != len(FEATURE_NAMES):
+        raise ValueError(f"Expected {len(FEATURE_NAMES)} features per row, got {X.shape[1]}")
+    return X
+
+
+def encode_probabilities(probabilities, dtype):
+    return _pack(RESPONSE_MAGIC, np.asarray(probabilities, dtype=dtype).reshape(-1, 1))
+
+
+def decode_probabilities(body):
+    return _unpack(RESPONSE_MAGIC, body).ravel()
+
+
+def valid_rows(X):
+    """Boolean mask of rows whose values are all finite and within FEATURE_RANGES (gender 0 or 1)"""
+    # NaN fails every comparison, so it is rejected together with out-of-range values
+    valid = ((X >= LOWER_BOUNDS) & (X <= UPPER_BOUNDS)).all(axis=1)
+    gender = X[:, GENDER_COLUMN]
+    return valid & (gender == np.round(gender))
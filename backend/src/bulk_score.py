@@ -0,0 +1,237 @@
+"""Offline scoring of a large file with the serving model.
+
+    python src/bulk_score.py patients.csv scores.csv [--workers 4] [--chunk-size 100000] [--keep patient_id]
+
+The input is a csv with a header naming (at least) the FEATURE_NAMES
+columns, in any order, or a (n, 10) float .npy matrix in FEATURE_NAMES
+order. The output is a csv with one line per input row, in input order:
+the --keep columns copied from the input, then probability and prediction.
+Rows the /predict/matrix endpoint rejects (binary_format.valid_rows: a
+missing or non-numeric feature, a value out of FEATURE_RANGES, a gender
+other than 0 or 1) get empty probability and prediction.
+
+The file is cut into chunks of about --chunk-size rows (byte ranges ending
+on a line break for a csv, row ranges for a .npy) and the chunks are parsed,
+scored and formatted in a process pool. The main process only plans the
+ranges and writes the formatted chunks in order; at most two chunks per
+worker are in flight, so memory stays bounded whatever the input size.
+Quoted csv fields must not contain line breaks.
+
+Scores are exactly those of the predict endpoints: the model is loaded with
+load_serving_model from the same logistic_model.pkl (MODEL_PRECISION applies
+too), csv numbers are parsed with correct rounding like the JSON parser,
+every row is scored with predict_proba_compiled, whose result does not depend
+on the other rows of the chunk, and probabilities are written with repr, so
+they read back as the same floats the API returns.
+"""
+
+import argparse
+import csv
+import io
+import os
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from binary_format import valid_rows
+from inference import FEATURE_NAMES, PRECISION_TOLERANCE, load_serving_model, predict_proba_compiled
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(current_dir, "../models/logistic_model.pkl")
+
+DEFAULT_CHUNK_SIZE = 100000
+
+# Set in each worker by _init_worker
+_shared = {}
+
+
+def read_csv_header(csv_path):
+    """(column names, byte offset of the first data line)"""
+    with open(csv_path, 'rb') as f:
+        line = f.readline()
+        offset = f.tell()
+    columns = [name.strip() for name in next(csv.reader([line.decode('utf-8-sig')]))]
+    missing = [name for name in FEATURE_NAMES if name not in columns]
+    if missing:
+        raise ValueError(f"{csv_path} has no column for {missing}")
+    if len(set(columns)) != len(columns):
+        raise ValueError(f"{csv_path} has duplicate column names")
+    return columns, offset
+
+
+def csv_chunks(csv_path, data_offset, chunk_size, sample_lines=1000):
+    """(start, end) byte ranges of about chunk_size lines each, every range ending on a line break"""
+    size = os.path.getsize(csv_path)
+    with open(csv_path, 'rb') as f:
+        f.seek(data_offset)
+        sample = [line for _, line in zip(range(sample_lines), f)]
+        line_bytes = sum(map(len, sample)) / max(len(sample), 1)
+        chunk_bytes = max(int(chunk_size * line_bytes), 1)
+        start = data_offset
+        while start < size:
+            f.seek(start + chunk_bytes)
+            f.readline()
+            end = min(f.tell(), size)
+            yield start, end
+            start = end
+
+
+def npy_chunks(npy_path, chunk_size):
+    """(start, stop) row ranges of a (n, 10) .npy matrix"""
+    X = np.load(npy_path, mmap_mode='r')
+    if X.ndim != 2 or X.shape[1] != len(FEATURE_NAMES):
+        raise ValueError(f"{npy_path} has shape {X.shape}, expected (n, {len(FEATURE_NAMES)})")
+    for start in range(0, len(X), chunk_size):
+        yield start, min(start + chunk_size, len(X))
+
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _float_column(series):
+    if series.dtype.kind in 'biuf':
+        return series.to_numpy(dtype=np.float64)
+    # Some value did not parse as a number: the others go through float() like a JSON body
+    return np.array([_parse_float(value) for value in series], dtype=np.float64)
+
+
+def read_csv_chunk(csv_path, start, end, columns, keep=()):
+    """(X (n, 10) in FEATURE_NAMES order, frame of the keep columns as strings) of a byte range"""
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    try:
+        frame = pd.read_csv(io.BytesIO(data), header=None, names=columns, usecols=FEATURE_NAMES + list(keep),
+                            dtype={name: str for name in keep}, float_precision='round_trip')
+    except pd.errors.EmptyDataError:  # only blank lines
+        frame = pd.DataFrame(columns=FEATURE_NAMES + list(keep))
+    X = np.column_stack([_float_column(frame[name]) for name in FEATURE_NAMES]) if len(frame) else \
+        np.empty((0, len(FEATURE_NAMES)))
+    return X, frame[list(keep)].fillna('')
+
+
+def format_scores(probabilities, valid, kept=None):
+    """csv lines of kept columns + probability,prediction (empty for invalid rows)"""
+    probability = np.full(len(valid), '', dtype=object)
+    prediction = np.full(len(valid), '', dtype=object)
+    probability[valid] = [repr(p) for p in probabilities.tolist()]
+    prediction[valid] = (probabilities >= 0.5).astype(np.int64).astype(str)
+    out = kept.reset_index(drop=True) if kept is not None else pd.DataFrame(index=range(len(valid)))
+    out = out.assign(probability=probability, prediction=prediction)
+    return out.to_csv(header=False, index=False, lineterminator='\n')
+
+
+def score_matrix(model, X):
+    """Probabilities of the valid rows of X and the mask of valid rows (as for /predict/matrix)"""
+    valid = valid_rows(X)
+    X = X if valid.all() else X[valid]
+    return predict_proba_compiled(model, X), valid
+
+
+def _init_worker(model_path, precision):
+    _shared['model'] = load_serving_model(model_path, precision)
+
+
+def _score_chunk(task):
+    """Parse, score and format one chunk, returns (csv text, rows, invalid rows)"""
+    kind, path, start, end, columns, keep = task
+    if kind == 'csv':
+        X, kept = read_csv_chunk(path, start, end, columns, keep)
+    else:
+        X, kept = np.array(np.load(path, mmap_mode='r')[start:end], dtype=np.float64), None
+    probabilities, valid = score_matrix(_shared['model'], X)
+    return format_scores(probabilities, valid, kept), len(X), int(len(X) - valid.sum())
+
+
+def _ordered_results(tasks, model_path, precision, workers):
+    """Results of _score_chunk in task order, with at most 2 * workers chunks in flight"""
+    if workers == 1:
+        _init_worker(model_path, precision)
+        try:
+            yield from map(_score_chunk, tasks)
+        finally:
+            _shared.clear()
+        return
+    # Deferred like in retraining.py
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(model_path, precision)) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_score_chunk, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def bulk_score(input_path, output_path, model_path=MODEL_PATH, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+               keep=(), precision=None, verbose=True, progress_interval=10.0):
+    """Score every row of input_path (csv or .npy) into the output_path csv.
+
+    Returns a dict with the rows scored, invalid rows, seconds and rows per second.
+    """
+    start_time = time.perf_counter()
+    keep = list(keep)
+    if input_path.endswith('.npy'):
+        if keep:
+            raise ValueError("--keep needs a csv input")
+        tasks = (('npy', input_path, start, stop, None, ()) for start, stop in npy_chunks(input_path, chunk_size))
+    else:
+        columns, data_offset = read_csv_header(input_path)
+        missing = [name for name in keep if name not in columns]
+        if missing:
+            raise ValueError(f"{input_path} has no column for {missing}")
+        tasks = (('csv', input_path, start, end, columns, keep)
+                 for start, end in csv_chunks(input_path, data_offset, chunk_size))
+    # Fail here rather than in every worker if the model can't be loaded
+    load_serving_model(model_path, precision)
+    workers = workers or os.cpu_count() or 1
+
+    rows = invalid = 0
+    last_progress = start_time
+    with open(output_path, 'w', newline='') as out:
+        out.write(','.join(keep + ['probability', 'prediction']) + '\n')
+        for text, chunk_rows, chunk_invalid in _ordered_results(tasks, model_path, precision, workers):
+            out.write(text)
+            rows += chunk_rows
+            invalid += chunk_invalid
+            now = time.perf_counter()
+            if verbose and now - last_progress >= progress_interval:
+                print(f"{rows:,} rows, {rows / (now - start_time):,.0f} rows/s")
+                last_progress = now
+
+    seconds = time.perf_counter() - start_time
+    stats = {'rows': rows, 'invalid_rows': invalid, 'seconds': seconds,
+             'rows_per_second': rows / seconds if seconds > 0 else float('nan')}
+    if verbose:
+        print(f"Scored {rows:,} rows ({invalid:,} invalid) in {seconds:.2f}s with {workers} workers: "
+              f"{stats['rows_per_second']:,.0f} rows/s -> {output_path}")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input_path', help="csv with the FEATURE_NAMES columns, or a (n, 10) .npy matrix")
+    parser.add_argument('output_path', help="csv to write")
+    parser.add_argument('--model-path', default=MODEL_PATH, help="logistic_model.pkl (its .bin is used when current)")
+    parser.add_argument('--workers', type=int, default=None, help="default: the CPU count")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk (about, for a csv)")
+    parser.add_argument('--keep', action='append', default=[], help="input column copied to the output (repeatable)")
+    parser.add_argument('--precision', choices=sorted(PRECISION_TOLERANCE), default=None,
+                        help="float type of the model (default: MODEL_PRECISION or float64, like the API)")
+    args = parser.parse_args(argv)
+    bulk_score(args.input_path, args.output_path, model_path=args.model_path, workers=args.workers,
+               chunk_size=args.chunk_size, keep=args.keep, precision=args.precision)
+
+
+if __name__ == '__main__':
+    main()
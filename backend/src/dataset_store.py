@@ -0,0 +1,166 @@
+"""Binary columnar cache for the training dataset and the feedback log.
+
+The raw csv is parsed once into one .npy file per column, under a
+directory named after the csv's content hash, so a changed csv gets a new
+cache and an unchanged one is never parsed again. Feedback rows are added
+as new segments without touching existing ones, and compact() merges the
+feedback segments once there are too many of them.
+
+    <cache_dir>/<hash>/manifest.json
+    <cache_dir>/<hash>/<segment>/<column>.npy
+
+Columns are loaded with mmap_mode='r', so a single-segment read is
+zero-copy.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+MANIFEST_FORMAT_VERSION = 1
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DatasetStore:
+
+    def __init__(self, root, max_segments=16):
+        self.root = root
+        self.max_segments = max_segments
+        with open(os.path.join(root, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != MANIFEST_FORMAT_VERSION:
+            raise ValueError(f"Unsupported dataset store format in {root}")
+
+    @classmethod
+    def for_source(cls, cache_dir, source_path, loader, max_segments=16):
+        """Open the store for source_path, building it with loader(source_path) on first use.
+
+        loader returns a dict of column name -> 1-D array.
+        """
+        root = os.path.join(cache_dir, file_hash(source_path)[:16])
+        if not os.path.isfile(os.path.join(root, 'manifest.json')):
+            cls.create(root, loader(source_path), source=os.path.basename(source_path))
+        return cls(root, max_segments)
+
+    @classmethod
+    def create(cls, root, columns, source=None):
+        os.makedirs(root, exist_ok=True)
+        manifest = {
+            'format': MANIFEST_FORMAT_VERSION,
+            'source': source,
+            'columns': list(columns),
+            'segments': [],
+            'next_segment': 0,
+            'feedback_offset': 0
+        }
+        _write_segment(root, 'base-0', columns)
+        manifest['segments'].append({'name': 'base-0', 'kind': 'base', 'rows': _row_count(columns)})
+        _write_manifest(root, manifest)
+        return cls(root)
+
+    @property
+    def columns(self):
+        return self.manifest['columns']
+
+    @property
+    def feedback_offset(self):
+        """Byte offset into the feedback csv up to which rows have been appended"""
+        return self.manifest['feedback_offset']
+
+    def segments(self, kind=None):
+        return [s for s in self.manifest['segments'] if kind is None or s['kind'] == kind]
+
+    def append(self, columns, kind='feedback', feedback_offset=None):
+        """Add rows as a new segment; existing segments are never rewritten"""
+        if set(columns) != set(self.columns):
+            raise ValueError(f"Expected columns {self.columns}, got {sorted(columns)}")
+        rows = _row_count(columns)
+        if rows:
+            name = f"{kind}-{self.manifest['next_segment'] + 1}"
+            _write_segment(self.root, name, columns)
+            self.manifest['segments'].append({'name': name, 'kind': kind, 'rows': rows})
+            self.manifest['next_segment'] += 1
+        if feedback_offset is not None:
+            self.manifest['feedback_offset'] = feedback_offset
+        _write_manifest(self.root, self.manifest)
+        if len(self.segments('feedback')) > self.max_segments:
+            self.compact()
+
+    def read(self, kind=None):
+        """Column name -> array over every segment of kind (all segments when None).
+
+        One segment is returned as read-only memory maps; several are concatenated.
+        """
+        segments = self.segments(kind)
+        result = {}
+        for column in self.columns:
+            parts = [np.load(os.path.join(self.root, s['name'], f'{column}.npy'), mmap_mode='r')
+                     for s in segments]
+            if len(parts) == 1:
+                result[column] = parts[0]
+            elif parts:
+                result[column] = np.concatenate(parts)
+            else:
+                result[column] = np.empty(0)
+        return result
+
+    def iter_chunks(self, kind=None, chunk_size=65536):
+        """Yield column name -> array blocks of at most chunk_size rows, segment by segment.
+
+        Only the current block is read from the memory maps, so this works
+        for stores much larger than memory.
+        """
+        for s in self.segments(kind):
+            columns = {column: np.load(os.path.join(self.root, s['name'], f'{column}.npy'), mmap_mode='r')
+                       for column in self.columns}
+            for start in range(0, s['rows'], chunk_size):
+                yield {column: np.array(values[start:start + chunk_size]) for column, values in columns.items()}
+
+    def compact(self, kind='feedback'):
+        """Merge all segments of kind into one and remove the old segment files"""
+        old_segments = self.segments(kind)
+        if len(old_segments) <= 1:
+            return
+        merged = {column: np.array(values) for column, values in self.read(kind).items()}
+        name = f"{kind}-{self.manifest['next_segment'] + 1}"
+        _write_segment(self.root, name, merged)
+        self.manifest['segments'] = [s for s in self.manifest['segments'] if s['kind'] != kind]
+        self.manifest['segments'].append({'name': name, 'kind': kind, 'rows': _row_count(merged)})
+        self.manifest['next_segment'] += 1
+        _write_manifest(self.root, self.manifest)
+        # Only delete once the new manifest no longer references them
+        for s in old_segments:
+            shutil.rmtree(os.path.join(self.root, s['name']), ignore_errors=True)
+
+
+def _row_count(columns):
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("All columns must have the same number of rows")
+    return lengths.pop() if lengths else 0
+
+
+def _write_segment(root, name, columns):
+    tmp_dir = os.path.join(root, name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for column, values in columns.items():
+        np.save(os.path.join(tmp_dir, f'{column}.npy'), np.ascontiguousarray(values, dtype=np.float64))
+    os.replace(tmp_dir, os.path.join(root, name))
+
+
+def _write_manifest(root, manifest):
+    path = os.path.join(root, 'manifest.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
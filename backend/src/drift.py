@@ -0,0 +1,242 @@
+"""Streaming input and output distributions for drift monitoring, without logging requests.
+
+Each worker keeps fixed-bin histograms in numpy arrays:
+  - every feature, binned by its z-score against the serving model's
+    training mean/std (edges -4..4 in steps of 0.5, plus the two tails),
+    with the sums of the positive z-scores, of the negative ones (as
+    magnitudes) and of the squares;
+  - the predicted probability, in 20 bins over [0, 1].
+
+A batch is added with a few vectorized numpy calls; single rows are
+appended to a short list and folded in together every ROW_BUFFER_SIZE
+rows. Memory is fixed by features x bins, whatever the traffic.
+
+Sketches merge by adding their arrays. Every DRIFT_EXPORT_INTERVAL seconds
+the increase since the previous export is added to Prometheus counters, so
+multiprocess mode sums the workers and PromQL can compare any window with
+the training reference, e.g. the mean shift in training standard deviations:
+
+    (increase(app_feature_zscore_positive_total[1h]) - increase(app_feature_zscore_negative_total[1h]))
+      / increase(app_feature_zscore_count_total[1h])
+
+The signed sum is split in two so that every series only grows, and
+increase() handles the reset to 0 when a restart wipes the multiprocess
+directory like for any other counter.
+
+Alerting rules on these live in prometheus/drift_rules.yml. The mean shift
+and spread ratio over this worker's lifetime are also set as gauges.
+"""
+
+import asyncio
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+from inference import FEATURE_NAMES
+
+Z_EDGES = np.arange(-4, 4.5, 0.5)
+PROBABILITY_EDGES = np.linspace(0, 1, 21)[1:-1]
+ROW_BUFFER_SIZE = 64
+
+FEATURE_OBSERVATIONS = Counter(
+    'app_feature_zscore_observations',
+    'Inputs per feature and z-score bin (z against the training mean/std, bin upper edge)',
+    ['feature', 'upper']
+)
+
+FEATURE_COUNT = Counter(
+    'app_feature_zscore_count',
+    'Inputs observed per feature',
+    ['feature']
+)
+
+FEATURE_ZSCORE_POSITIVE = Counter(
+    'app_feature_zscore_positive',
+    'Sum of the positive z-scores of the observed inputs, per feature',
+    ['feature']
+)
+
+FEATURE_ZSCORE_NEGATIVE = Counter(
+    'app_feature_zscore_negative',
+    'Sum of the magnitudes of the negative z-scores of the observed inputs, per feature',
+    ['feature']
+)
+
+FEATURE_ZSCORE_SQUARES = Counter(
+    'app_feature_zscore_squares',
+    'Sum of the squared z-scores of every observed input, per feature',
+    ['feature']
+)
+
+PREDICTION_OBSERVATIONS = Counter(
+    'app_prediction_probability_observations',
+    'Predicted probabilities per bin (bin upper edge)',
+    ['upper']
+)
+
+FEATURE_MEAN_SHIFT = Gauge(
+    'app_feature_mean_shift',
+    'Mean z-score of the inputs seen by this worker, i.e. the mean shift in training standard deviations',
+    ['feature'],
+    multiprocess_mode='liveall'
+)
+
+FEATURE_STD_RATIO = Gauge(
+    'app_feature_std_ratio',
+    'Standard deviation of the z-scores seen by this worker, i.e. live std / training std',
+    ['feature'],
+    multiprocess_mode='liveall'
+)
+
+
+def _bin_labels(edges):
+    return [f'{edge:g}' for edge in edges] + ['+Inf']
+
+
+class StreamingHistogram:
+    """Fixed-bin histogram of k columns, plus their count, sums and sum of squares.
+
+    The sum is kept as positive and negative parts (both >= 0), so their
+    differences between two snapshots never decrease.
+
+    Value v of a column lands in bin i when edges[i - 1] <= v < edges[i];
+    the first and last bins take everything below and above the edges.
+    """
+
+    def __init__(self, n_columns, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.n_bins = len(self.edges) + 1
+        self.counts = np.zeros((n_columns, self.n_bins), dtype=np.int64)
+        self.count = 0
+        self.positive = np.zeros(n_columns)
+        self.negative = np.zeros(n_columns)
+        self.squares = np.zeros(n_columns)
+        self._offsets = np.arange(n_columns) * self.n_bins
+
+    def update(self, values):
+        """Add an (n, k) block of rows"""
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        bins = np.searchsorted(self.edges, values, side='right') + self._offsets
+        self.counts += np.bincount(bins.ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+        self.count += len(values)
+        self.positive += np.maximum(values, 0).sum(axis=0)
+        self.negative -= np.minimum(values, 0).sum(axis=0)
+        self.squares += np.square(values).sum(axis=0)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.count += other.count
+        self.positive += other.positive
+        self.negative += other.negative
+        self.squares += other.squares
+
+    def copy(self):
+        result = StreamingHistogram(len(self.counts), self.edges)
+        result.merge(self)
+        return result
+
+    @property
+    def total(self):
+        return self.positive - self.negative
+
+    @property
+    def mean(self):
+        return self.total / max(self.count, 1)
+
+    @property
+    def std(self):
+        return np.sqrt(np.maximum(self.squares / max(self.count, 1) - self.mean ** 2, 0))
+
+
+class DriftMonitor:
+    """Sketches of the inputs (z-scored against the serving model) and predicted probabilities.
+
+    The reference mean/std are read from model_ref, so after a retrain the
+    new inputs are compared with the new model's training data.
+    """
+
+    def __init__(self, model_ref, interval=5.0, row_buffer_size=ROW_BUFFER_SIZE):
+        self.model_ref = model_ref
+        self.interval = interval
+        self.row_buffer_size = row_buffer_size
+        self._rows = []
+        self._row_probabilities = []
+        self.features = StreamingHistogram(len(FEATURE_NAMES), Z_EDGES)
+        self.predictions = StreamingHistogram(1, PROBABILITY_EDGES)
+        self._exported = (self.features.copy(), self.predictions.copy())
+        self._reference = None
+        self._task = None
+
+    def reference(self):
+        version, model = self.model_ref.get()
+        if self._reference is None or self._reference[0] != version:
+            self._reference = (version, np.asarray(model['mean'], dtype=np.float64),
+                               np.asarray(model['std'], dtype=np.float64))
+        return self._reference[1:]
+
+    def observe_row(self, row, probability):
+        """Add one scored row; buffered and added with the next ROW_BUFFER_SIZE - 1 rows"""
+        self._rows.append(row)
+        self._row_probabilities.append(probability)
+        if len(self._rows) >= self.row_buffer_size:
+            self.flush_rows()
+
+    def flush_rows(self):
+        if self._rows:
+            rows, probabilities = self._rows, self._row_probabilities
+            self._rows, self._row_probabilities = [], []
+            self.observe(rows, probabilities)
+
+    def observe(self, X, probabilities):
+        """Add scored rows: X is (n, 10) raw features, probabilities their n scores"""
+        mean, std = self.reference()
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+        self.features.update((X - mean) / std)
+        self.predictions.update(np.asarray(probabilities, dtype=np.float64).reshape(-1, 1))
+
+    def export(self):
+        """Add what was observed since the last export to the Prometheus counters"""
+        self.flush_rows()
+        features, predictions = self._exported
+        if self.features.count != features.count:
+            z_labels = _bin_labels(self.features.edges)
+            new_counts = self.features.counts - features.counts
+            for j, name in enumerate(FEATURE_NAMES):
+                for b in np.flatnonzero(new_counts[j]):
+                    FEATURE_OBSERVATIONS.labels(name, z_labels[b]).inc(int(new_counts[j, b]))
+                FEATURE_COUNT.labels(name).inc(self.features.count - features.count)
+                FEATURE_ZSCORE_POSITIVE.labels(name).inc(float(self.features.positive[j] - features.positive[j]))
+                FEATURE_ZSCORE_NEGATIVE.labels(name).inc(float(self.features.negative[j] - features.negative[j]))
+                FEATURE_ZSCORE_SQUARES.labels(name).inc(float(self.features.squares[j] - features.squares[j]))
+                FEATURE_MEAN_SHIFT.labels(name).set(float(self.features.mean[j]))
+                FEATURE_STD_RATIO.labels(name).set(float(self.features.std[j]))
+        if self.predictions.count != predictions.count:
+            p_labels = _bin_labels(self.predictions.edges)
+            new_counts = self.predictions.counts[0] - predictions.counts[0]
+            for b in np.flatnonzero(new_counts):
+                PREDICTION_OBSERVATIONS.labels(p_labels[b]).inc(int(new_counts[b]))
+        self._exported = (self.features.copy(), self.predictions.copy())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.export()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.export()
+            except Exception as e:
+                print(f"Error exporting drift metrics: {str(e)}")
@@ -0,0 +1,200 @@
+"""Holdout evaluation of a model, in streaming chunks, and the publish gate built on it.
+
+EvaluationAccumulator takes (probabilities, labels) chunk by chunk and
+keeps only fixed-size sums:
+
+    accuracy and the confusion matrix at threshold 0.5
+    log-loss
+    calibration: rows, mean probability and observed positive rate in 10 bins
+    ROC-AUC: positive and negative counts in 2**16 score bins, exact up to
+             ties inside a bin (roc_auc() gives the exact value in one sort)
+
+so the holdout can be streamed from the dataset cache (holdout_chunks) and
+scored by several models in one pass (evaluate_models).
+
+The retraining jobs evaluate a candidate and the serving model on the same
+holdout and refuse to publish the candidate when it is worse by more than
+a tolerance (check_gate raises ModelRejected).
+"""
+
+import time
+
+import numpy as np
+from prometheus_client import Gauge, Histogram
+
+from inference import predict_proba_compiled
+
+CALIBRATION_BINS = 10
+AUC_BINS = 1 << 16
+LOG_LOSS_EPSILON = 1e-15
+
+# metric -> +1 when higher is better, -1 when lower is better
+GATE_METRICS = {
+    'accuracy': 1,
+    'roc_auc': 1,
+    'log_loss': -1,
+    'expected_calibration_error': -1,
+}
+
+EVALUATION_SECONDS = Histogram(
+    'app_evaluation_seconds',
+    'Wall time of scoring a model on the holdout set during a retrain',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+
+EVALUATION_METRIC = Gauge(
+    'app_evaluation_metric',
+    'Holdout metrics of the last retrain evaluation (model is candidate or current)',
+    ['model', 'metric'],
+    multiprocess_mode='mostrecent'
+)
+
+
+class ModelRejected(Exception):
+    """A retrained model did worse than the serving one on the holdout set"""
+
+    def __init__(self, message, reports=None):
+        super().__init__(message)
+        self.reports = reports or {}
+
+    def __reduce__(self):
+        # Raised in the trainer process, keep the reports when it is pickled back
+        return (ModelRejected, (str(self), self.reports))
+
+
+class EvaluationAccumulator:
+
+    def __init__(self, calibration_bins=CALIBRATION_BINS, auc_bins=AUC_BINS):
+        self.calibration_bins = calibration_bins
+        self.auc_bins = auc_bins
+        self.confusion = np.zeros((2, 2), dtype=np.int64)  # [actual, predicted]
+        self.log_loss_sum = 0.0
+        self.calibration_count = np.zeros(calibration_bins, dtype=np.int64)
+        self.calibration_probability = np.zeros(calibration_bins)
+        self.calibration_positive = np.zeros(calibration_bins)
+        self.auc_counts = np.zeros((2, auc_bins), dtype=np.int64)  # [label, score bin]
+
+    @property
+    def rows(self):
+        return int(self.confusion.sum())
+
+    def update(self, probabilities, y):
+        probabilities = np.asarray(probabilities, dtype=np.float64).ravel()
+        y = np.asarray(y).ravel().astype(np.int64)
+        predicted = (probabilities >= 0.5).astype(np.int64)
+        self.confusion += np.bincount(2 * y + predicted, minlength=4).reshape(2, 2)
+
+        clipped = np.clip(probabilities, LOG_LOSS_EPSILON, 1 - LOG_LOSS_EPSILON)
+        self.log_loss_sum -= float(np.sum(np.where(y == 1, np.log(clipped), np.log1p(-clipped))))
+
+        bins = np.minimum((probabilities * self.calibration_bins).astype(np.int64), self.calibration_bins - 1)
+        self.calibration_count += np.bincount(bins, minlength=self.calibration_bins)
+        self.calibration_probability += np.bincount(bins, weights=probabilities, minlength=self.calibration_bins)
+        self.calibration_positive += np.bincount(bins, weights=y, minlength=self.calibration_bins)
+
+        bins = np.minimum((probabilities * self.auc_bins).astype(np.int64), self.auc_bins - 1)
+        self.auc_counts += np.bincount(y * self.auc_bins + bins, minlength=2 * self.auc_bins).reshape(2, -1)
+
+    def roc_auc(self):
+        negatives, positives = self.auc_counts
+        n_negative, n_positive = negatives.sum(), positives.sum()
+        if n_negative == 0 or n_positive == 0:
+            return float('nan')
+        # Each positive beats the negatives in lower bins and ties with half of its own bin
+        negatives_below = np.cumsum(negatives) - negatives
+        return float(np.sum(positives * (negatives_below + 0.5 * negatives)) / (n_positive * n_negative))
+
+    def report(self):
+        rows = self.rows
+        (tn, fp), (fn, tp) = self.confusion.tolist()
+        count = self.calibration_count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_probability = self.calibration_probability / count
+            observed_rate = self.calibration_positive / count
+        filled = count > 0
+        ece = float(np.sum(count[filled] * np.abs(mean_probability[filled] - observed_rate[filled])) / max(rows, 1))
+        edges = np.linspace(0, 1, self.calibration_bins + 1)
+        return {
+            'rows': rows,
+            'accuracy': (tp + tn) / rows if rows else float('nan'),
+            'confusion_matrix': {'tn': tn, 'fp': fp, 'fn': fn, 'tp': tp},
+            'precision': tp / (tp + fp) if tp + fp else float('nan'),
+            'recall': tp / (tp + fn) if tp + fn else float('nan'),
+            'roc_auc': self.roc_auc(),
+            'log_loss': self.log_loss_sum / rows if rows else float('nan'),
+            'expected_calibration_error': ece,
+            'calibration': [
+                {'lower': float(edges[b]), 'upper': float(edges[b + 1]), 'rows': int(count[b]),
+                 'mean_probability': float(mean_probability[b]), 'observed_rate': float(observed_rate[b])}
+                for b in np.flatnonzero(filled)
+            ]
+        }
+
+
+def roc_auc(probabilities, y):
+    """Exact ROC-AUC with a single sort (Mann-Whitney U with average ranks for ties)"""
+    probabilities = np.asarray(probabilities, dtype=np.float64).ravel()
+    y = np.asarray(y).ravel() == 1
+    n_positive = int(y.sum())
+    n_negative = len(y) - n_positive
+    if n_positive == 0 or n_negative == 0:
+        return float('nan')
+    order = np.argsort(probabilities, kind='mergesort')
+    scores = probabilities[order]
+    distinct = np.r_[True, scores[1:] != scores[:-1]]
+    starts = np.flatnonzero(distinct)
+    ends = np.r_[starts[1:], len(scores)]
+    ranks = ((starts + ends + 1) / 2)[np.cumsum(distinct) - 1]
+    rank_sum = ranks[y[order]].sum()
+    return float((rank_sum - n_positive * (n_positive + 1) / 2) / (n_positive * n_negative))
+
+
+def evaluate_probabilities(probabilities, y):
+    """Report for scores that are already in memory"""
+    accumulator = EvaluationAccumulator()
+    accumulator.update(probabilities, y)
+    return accumulator.report()
+
+
+def evaluate_models(models, chunks):
+    """Score every compiled model of models (name -> model) on (X, y) chunks in one pass.
+
+    Returns name -> report, each with the seconds spent scoring and accumulating.
+    """
+    accumulators = {name: EvaluationAccumulator() for name in models}
+    seconds = dict.fromkeys(models, 0.0)
+    for X, y in chunks:
+        for name, model in models.items():
+            start_time = time.perf_counter()
+            accumulators[name].update(predict_proba_compiled(model, X), y)
+            seconds[name] += time.perf_counter() - start_time
+    return {name: dict(accumulators[name].report(), seconds=seconds[name]) for name in models}
+
+
+def holdout_chunks(dataset_path=None, chunk_size=65536, cache=True, cache_dir=None):
+    """(X, y) chunks of the raw holdout split train() evaluates on (feedback never goes there)"""
+    from out_of_core import chunk_source  # pulls in the training code, only needed in the trainer
+
+    source = chunk_source(dataset_path, None, chunk_size, cache, cache_dir)
+    source.count_rows()
+    for part, X, y in source:
+        if part == 'test':
+            yield X, y
+
+
+def check_gate(reports, metric='roc_auc', tolerance=0.005):
+    """Raise ModelRejected if reports['candidate'] is worse than reports['current'] by more than tolerance"""
+    if metric not in GATE_METRICS:
+        raise ValueError(f"Unknown gate metric {metric!r}, expected one of {sorted(GATE_METRICS)}")
+    candidate, current = reports['candidate'][metric], reports['current'][metric]
+    if GATE_METRICS[metric] * (candidate - current) < -tolerance:
+        raise ModelRejected(f"Candidate {metric} {candidate:.4f} vs serving {current:.4f} "
+                            f"(tolerance {tolerance:g})", reports)
+
+
+def observe_evaluation(reports):
+    """Export the reports of a retrain evaluation (called in the serving process)"""
+    for name, report in reports.items():
+        EVALUATION_SECONDS.observe(report['seconds'])
+        for metric in GATE_METRICS:
+            EVALUATION_METRIC.labels(name, metric).set(report[metric])
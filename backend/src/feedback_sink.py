@@ -0,0 +1,124 @@
+import asyncio
+import csv
+import fcntl
+import os
+import time
+from collections import deque
+
+from prometheus_client import Counter, Gauge, Histogram
+
+FEEDBACK_BUFFER_DEPTH = Gauge(
+    'app_feedback_buffer_depth',
+    'Feedback records buffered in memory and not yet written to disk',
+    multiprocess_mode='livesum'
+)
+
+FEEDBACK_FLUSH_LATENCY = Histogram(
+    'app_feedback_flush_latency_seconds',
+    'Time to append and fsync one batch of feedback records'
+)
+
+FEEDBACK_FLUSHED = Counter(
+    'app_feedback_flushed_records_total',
+    'Feedback records written to disk'
+)
+
+FEEDBACK_REJECTED = Counter(
+    'app_feedback_rejected_records_total',
+    'Feedback records rejected because the buffer was full'
+)
+
+
+class FeedbackSink:
+    """Write-behind buffer for feedback records.
+
+    put() only appends to a bounded in-memory buffer. A background task
+    writes the buffer to the CSV in batches, either when flush_size records
+    are waiting or every flush_interval seconds, with one fsync per batch
+    (group commit). drain() writes whatever is left on shutdown.
+    """
+
+    def __init__(self, path, fieldnames, capacity=10000, flush_size=256, flush_interval=1.0, fsync=True):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.capacity = capacity
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._buffer = deque()
+        self._lock = asyncio.Lock()
+        self._wakeup = None
+        self._task = None
+        self._closing = False
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def put(self, record):
+        """Buffer a record, returns False if the buffer is full"""
+        if len(self._buffer) >= self.capacity:
+            FEEDBACK_REJECTED.inc()
+            return False
+        self._buffer.append(record)
+        FEEDBACK_BUFFER_DEPTH.set(len(self._buffer))
+        if self._wakeup is not None and len(self._buffer) >= self.flush_size:
+            self._wakeup.set()
+        return True
+
+    def start(self):
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def drain(self):
+        """Stop the background task and write every buffered record"""
+        self._closing = True
+        if self._task is not None:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # Records stay buffered and are retried on the next trigger
+                print(f"Error flushing feedback: {str(e)}")
+
+    async def flush(self):
+        """Write all buffered records now, in batches of at most flush_size"""
+        async with self._lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.flush_size, len(self._buffer)))]
+                try:
+                    await asyncio.to_thread(self._write_batch, batch)
+                except Exception:
+                    self._buffer.extendleft(reversed(batch))
+                    raise
+                finally:
+                    FEEDBACK_BUFFER_DEPTH.set(len(self._buffer))
+                FEEDBACK_FLUSHED.inc(len(batch))
+
+    def _write_batch(self, batch):
+        start_time = time.perf_counter()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, 'a', newline='') as f:
+            # Several worker processes may append to the same file, one batch at a time
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            writer = csv.DictWriter(f, fieldnames=self.fieldnames, extrasaction='ignore')
+            if f.tell() == 0:
+                writer.writeheader()
+            writer.writerows(batch)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        FEEDBACK_FLUSH_LATENCY.observe(time.perf_counter() - start_time)
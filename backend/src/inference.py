@@ -0,0 +1,185 @@
+import os
+import pickle
+import struct
+
+import numpy as np
+
+# Input column order expected by the model (same order as PatientData)
+FEATURE_NAMES = [
+    'age',
+    'gender',
+    'total_bilirubin',
+    'direct_bilirubin',
+    'alkaline_phosphotase',
+    'alanine_aminotransferase',
+    'aspartate_aminotransferase',
+    'total_proteins',
+    'albumin',
+    'albumin_globulin_ratio'
+]
+
+
+def predict_proba(model, X):
+    """Score an (n, 10) matrix of raw features, returns n probabilities"""
+    X = np.asarray(X, dtype=float).reshape(-1, len(FEATURE_NAMES))
+    scaled_data = (X - model['mean']) / model['std']
+    pca_data = np.dot(scaled_data, model['eigenvectors'])
+    pca_with_bias = np.c_[np.ones((pca_data.shape[0], 1)), pca_data]
+    probability = 1 / (1 + np.exp(-np.dot(pca_with_bias, model['weights'])))
+    return probability.ravel()
+
+
+# Compiled artifact: the scaler, PCA projection and weights are all linear in
+# the raw features, so they fold into one coefficient vector and an intercept:
+#   logit = w0 + ((x - mean) / std) @ E @ w = intercept + x @ coef
+#
+# On-disk layout (little endian), no pickling involved:
+#   header  magic b'LPDM', format version (u16), float itemsize (u16), n_features (u32)
+#   body    coef[n], intercept[1], mean[n], std[n]
+COMPILED_MAGIC = b'LPDM'
+COMPILED_FORMAT_VERSION = 1
+COMPILED_HEADER = struct.Struct('<4sHHI')
+COMPILED_DTYPES = {4: np.dtype('<f4'), 8: np.dtype('<f8')}
+
+# Float type of the compiled artifact and of batch scoring. float32 halves the
+# artifact and the bytes read per scored row; the tolerance is the largest
+# probability difference to the float64 pipeline check_equivalence accepts.
+PRECISION_TOLERANCE = {'float64': 1e-9, 'float32': 1e-4}
+MODEL_PRECISION = os.getenv('MODEL_PRECISION', 'float64')
+
+
+def _precision(precision):
+    precision = precision or MODEL_PRECISION
+    if precision not in PRECISION_TOLERANCE:
+        raise ValueError(f"Unknown precision {precision!r}, expected one of {sorted(PRECISION_TOLERANCE)}")
+    return precision
+
+
+def compile_model(model, precision=None):
+    """Fold the pickled mean/std/eigenvectors/weights dict into a single affine map.
+
+    The folding is done in float64 and the result stored in precision
+    (default MODEL_PRECISION).
+    """
+    dtype = np.dtype(_precision(precision))
+    weights = np.asarray(model['weights'], dtype=np.float64).ravel()
+    mean = np.asarray(model['mean'], dtype=np.float64)
+    std = np.asarray(model['std'], dtype=np.float64)
+    coef = np.dot(model['eigenvectors'], weights[1:]) / std
+    intercept = weights[0] - np.dot(mean, coef)
+    return {'coef': coef.astype(dtype), 'intercept': float(intercept), 'mean': mean.astype(dtype),
+            'std': std.astype(dtype)}
+
+
+def predict_proba_compiled(compiled, X, timer=None):
+    """Same as predict_proba but with the compiled model: one matrix-vector product.
+
+    timer (see instrumentation.py) gets an 'affine' lap for the folded
+    scaling/PCA/linear step and a 'sigmoid' lap. X is scored in the
+    model's float type, so a float32 model returns float32 probabilities.
+
+    The dot products go through einsum rather than BLAS: BLAS sums a row in
+    a different order depending on how many rows come with it, einsum sums
+    every row the same way, so a row gets bit-identical probabilities from
+    /predict, the micro-batcher, /predict/batch and bulk_score.py.
+    """
+    X = np.ascontiguousarray(X, dtype=compiled['coef'].dtype).reshape(-1, len(FEATURE_NAMES))
+    logit = np.einsum('ij,j->i', X, compiled['coef']) + compiled['intercept']
+    if timer is not None:
+        timer.lap('affine')
+    probability = 1 / (1 + np.exp(-logit))
+    if timer is not None:
+        timer.lap('sigmoid')
+    return probability
+
+
+def check_equivalence(model, compiled, n_samples=1000, atol=None, seed=0):
+    """Compare compiled and original scoring on synthetic panels, raise ValueError on mismatch.
+
+    atol defaults to the PRECISION_TOLERANCE of the compiled model's float type.
+    """
+    if atol is None:
+        atol = PRECISION_TOLERANCE[compiled['coef'].dtype.name]
+    rng = np.random.default_rng(seed)
+    X = model['mean'] + model['std'] * rng.standard_normal((n_samples, len(FEATURE_NAMES)))
+    max_diff = float(np.max(np.abs(predict_proba(model, X) - predict_proba_compiled(compiled, X))))
+    if not max_diff <= atol:
+        raise ValueError(f"Compiled model differs from original by {max_diff:.3g} (tolerance {atol:.3g})")
+    return max_diff
+
+
+def save_compiled(compiled, path):
+    """Write the artifact in the float type of compiled['coef']"""
+    dtype = COMPILED_DTYPES[np.asarray(compiled['coef']).dtype.itemsize]
+    coef = np.asarray(compiled['coef'], dtype=dtype)
+    header = COMPILED_HEADER.pack(COMPILED_MAGIC, COMPILED_FORMAT_VERSION, coef.itemsize, coef.size)
+    body = np.concatenate([coef, [compiled['intercept']], compiled['mean'], compiled['std']]).astype(dtype)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(body.tobytes())
+    os.replace(tmp_path, path)
+
+
+def load_compiled(path):
+    """Load a compiled artifact; the arrays are read-only views over a memory map"""
+    with open(path, 'rb') as f:
+        magic, version, itemsize, n = COMPILED_HEADER.unpack(f.read(COMPILED_HEADER.size))
+    if magic != COMPILED_MAGIC:
+        raise ValueError(f"{path} is not a compiled model artifact")
+    if version != COMPILED_FORMAT_VERSION or itemsize not in COMPILED_DTYPES:
+        raise ValueError(f"Unsupported compiled model format v{version} (itemsize {itemsize})")
+    body = np.memmap(path, dtype=COMPILED_DTYPES[itemsize], mode='r', offset=COMPILED_HEADER.size,
+                     shape=(3 * n + 1,))
+    return {
+        'coef': body[:n],
+        'intercept': float(body[n]),
+        'mean': body[n + 1:2 * n + 1],
+        'std': body[2 * n + 1:]
+    }
+
+
+def compiled_path_for(model_path):
+    return os.path.splitext(model_path)[0] + '.bin'
+
+
+def load_current_compiled(model_path, precision=None):
+    """The compiled artifact next to model_path if it is up to date and in precision, else None"""
+    compiled_path = compiled_path_for(model_path)
+    if os.path.exists(compiled_path) and os.path.getmtime(compiled_path) >= os.path.getmtime(model_path):
+        compiled = load_compiled(compiled_path)
+        if compiled['coef'].dtype.name == _precision(precision):
+            return compiled
+    return None
+
+
+def load_serving_model(model_path, precision=None):
+    """Load the compiled artifact next to model_path, or compile the pickle if it is missing, stale
+    or in another precision"""
+    compiled = load_current_compiled(model_path, precision)
+    if compiled is not None:
+        return compiled
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    compiled = compile_model(model, precision)
+    check_equivalence(model, compiled)
+    return compiled
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile logistic_model.pkl into a pickle-free affine artifact")
+    parser.add_argument('model_path', help="path to logistic_model.pkl")
+    parser.add_argument('--output', help="output path (default: same name with .bin)")
+    parser.add_argument('--precision', choices=sorted(PRECISION_TOLERANCE), default=None,
+                        help="float type of the artifact (default: MODEL_PRECISION or float64)")
+    args = parser.parse_args()
+
+    with open(args.model_path, 'rb') as f:
+        model = pickle.load(f)
+    compiled = compile_model(model, args.precision)
+    max_diff = check_equivalence(model, compiled)
+    output = args.output or compiled_path_for(args.model_path)
+    save_compiled(compiled, output)
+    print(f"Compiled model saved to {output} (max abs diff vs original: {max_diff:.3g})")
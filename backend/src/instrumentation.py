@@ -0,0 +1,87 @@
+"""Per-stage latency histograms for the inference and training hot paths.
+
+Stages are timed with lap timers on time.perf_counter_ns():
+
+    timer = inference_timer()
+    ...                       # validate
+    timer.lap('validation')
+    ...                       # score
+    timer.lap('affine')
+
+INSTRUMENTATION_SAMPLE_RATE (0..1, default 1) is the fraction of requests
+that get a real timer; the others get NULL_TIMER, whose lap() does nothing,
+so 0 switches stage timing off entirely.
+"""
+
+import os
+import random
+import time
+
+from prometheus_client import Histogram
+
+INSTRUMENTATION_SAMPLE_RATE = float(os.getenv('INSTRUMENTATION_SAMPLE_RATE', '1'))
+
+INFERENCE_STAGE_LATENCY = Histogram(
+    'app_inference_stage_seconds',
+    'Time spent in each stage of an inference request (sampled)',
+    ['stage'],
+    buckets=(1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 5e-2)
+)
+
+TRAINING_STAGE_LATENCY = Histogram(
+    'app_training_stage_seconds',
+    'Time spent in each stage of a retraining run',
+    ['job', 'stage'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+
+class StageTimer:
+    """Records the time since the previous lap (or since start_ns) under a stage label"""
+
+    __slots__ = ('histogram', 'last')
+
+    def __init__(self, histogram, start_ns=None):
+        self.histogram = histogram
+        self.last = time.perf_counter_ns() if start_ns is None else start_ns
+
+    def lap(self, stage):
+        now = time.perf_counter_ns()
+        self.histogram.labels(stage).observe((now - self.last) / 1e9)
+        self.last = now
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def lap(self, stage):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+def sampled(rate=None):
+    rate = INSTRUMENTATION_SAMPLE_RATE if rate is None else rate
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def inference_timer(start_ns=None):
+    """A StageTimer on the inference histogram for sampled requests, NULL_TIMER otherwise"""
+    if sampled():
+        return StageTimer(INFERENCE_STAGE_LATENCY, start_ns)
+    return NULL_TIMER
+
+
+def observe_training_stages(job, timings):
+    """Export the stage timings (name -> seconds) reported by a retraining run"""
+    for stage, seconds in timings.items():
+        TRAINING_STAGE_LATENCY.labels(job, stage).observe(seconds)
+
+
+def route_template(request):
+    """Path template of the matched route (e.g. /predict/batch), so metric labels stay bounded"""
+    route = request.scope.get('route')
+    if route is not None:
+        return getattr(route, 'path', 'unmatched')
+    return 'unmatched'
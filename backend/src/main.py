@@ -1,20 +1,82 @@
+import time
+
+# Startup phases are measured from here, see app_startup_seconds
+IMPORT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, HTTPException, Request, Response
-from prometheus_client import generate_latest
 from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, ValidationError, field_validator
+from typing import Any, Dict, List
 import numpy as np
-import pandas as pd
-import pickle
 import os
-import time
-import csv
+from contextlib import asynccontextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from admission import AdmissionController, AdmissionRejected, parse_deadline
+from inference import FEATURE_NAMES, compiled_path_for, load_compiled, load_serving_model, predict_proba_compiled
+from instrumentation import inference_timer, route_template
+from batching import MicroBatcher
+from drift import DriftMonitor
+from binary_format import MATRIX_CONTENT_TYPE, decode_matrix, encode_probabilities, valid_rows
+from feedback_sink import FeedbackSink
+from metrics_server import mark_worker_dead, render_metrics, start_metrics_server
+from model_registry import ModelFileWatcher, ModelRef
+from model_variants import ModelVariants
+from prediction_cache import PredictionCache
+from retraining import RETRAIN_JOBS, Retrainer
+
+# Feedback rows are buffered in memory and written to this CSV in the background
+FEEDBACK_PATH = os.getenv('FEEDBACK_PATH', '../data/train.csv')
+feedback_sink = FeedbackSink(
+    FEEDBACK_PATH,
+    fieldnames=FEATURE_NAMES + ['actual_result'],
+    capacity=int(os.getenv('FEEDBACK_BUFFER_CAPACITY', '10000')),
+    flush_size=int(os.getenv('FEEDBACK_FLUSH_SIZE', '256')),
+    flush_interval=float(os.getenv('FEEDBACK_FLUSH_INTERVAL', '1.0'))
+)
 
-from prometheus_client import start_http_server, Counter, Histogram, generate_latest
+# Prometheus metrics are also served on a separate port (0 disables it). Started from the
+# lifespan, not at import, so that with several workers the first one takes the port.
+METRICS_PORT = int(os.getenv('METRICS_PORT', '8001'))
 
-app = FastAPI()
+STARTUP_SECONDS = Gauge(
+    'app_startup_seconds',
+    'Time spent in each startup phase of this worker (import, model_load, warmup, total)',
+    ['phase'],
+    multiprocess_mode='liveall'
+)
+
+# Rows of synthetic patients run through the predict path before the worker reports ready
+WARMUP_ROWS = int(os.getenv('WARMUP_ROWS', '64'))
 
-# Start Prometheus metrics server on a separate port (e.g., 8001)
-start_http_server(8001)
+@asynccontextmanager
+async def lifespan(app):
+    start_metrics_server(METRICS_PORT)
+    start_time = time.perf_counter()
+    warm_up(WARMUP_ROWS)
+    STARTUP_SECONDS.labels('warmup').set(time.perf_counter() - start_time)
+    feedback_sink.start()
+    if model_watcher is not None:
+        model_watcher.start()
+    if drift_monitor is not None:
+        drift_monitor.start()
+    app.state.ready = True
+    STARTUP_SECONDS.labels('total').set(time.perf_counter() - IMPORT_STARTED)
+    yield
+    # Stop receiving traffic first, then drain: write out buffered feedback and let a running retrain finish
+    app.state.ready = False
+    await feedback_sink.drain()
+    await retrainer.close()
+    if model_watcher is not None:
+        await model_watcher.stop()
+    if drift_monitor is not None:
+        await drift_monitor.stop()
+    mark_worker_dead()
+
+app = FastAPI(lifespan=lifespan)
+app.state.ready = False
 
 # Prometheus metrics
 REQUEST_COUNT = Counter(
@@ -29,20 +91,72 @@ REQUEST_LATENCY = Histogram(
     ['method', 'endpoint']
 )
 
+ADMISSION_REJECTED = Counter(
+    'app_admission_rejected',
+    'Requests refused by admission control before reaching the handler',
+    ['endpoint', 'reason']
+)
+
+ADMISSION_QUEUED = Counter(
+    'app_admission_queued',
+    'Requests that waited in an admission queue before running',
+    ['endpoint']
+)
+
+# Per-route-class concurrency limits and wait queues (see admission.py), empty disables them
+ADMISSION_LIMITS = os.getenv('ADMISSION_LIMITS', 'predict=64:256,feedback=4:16')
+admission = AdmissionController.from_env(
+    ADMISSION_LIMITS,
+    queue_timeout=float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '1.0')),
+    retry_after=float(os.getenv('ADMISSION_RETRY_AFTER', '1'))
+)
+
+async def call_admitted(request, call_next, route_class):
+    """call_next once route_class has a free slot, or the rejection response"""
+    path = request.url.path
+    try:
+        waited = await admission.acquire(route_class, parse_deadline(request.headers, request.state.start_ns))
+    except AdmissionRejected as e:
+        ADMISSION_REJECTED.labels(path, e.reason).inc()
+        return JSONResponse(content={"detail": str(e)}, status_code=e.status_code, headers=e.headers)
+    except ValueError as e:
+        ADMISSION_REJECTED.labels(path, 'invalid_deadline').inc()
+        return JSONResponse(content={"detail": str(e)}, status_code=400)
+    if waited:
+        ADMISSION_QUEUED.labels(path).inc()
+        # The queue wait is in ADMISSION_QUEUE_WAIT, keep it out of the 'validation' stage
+        request.state.admitted_ns = time.perf_counter_ns()
+    try:
+        return await call_next(request)
+    finally:
+        admission.release(route_class)
+
 @app.middleware("http")
 async def monitor_requests(request: Request, call_next):
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
+    # Request latency and deadlines count from arrival; handlers start their stage timers
+    # from admission, so 'validation' covers body parsing but not the admission queue
+    request.state.start_ns = start_ns
+    request.state.admitted_ns = start_ns
     method = request.method
-    endpoint = request.url.path
+    route_class = admission.route_class(request.url.path) if admission is not None else None
 
     try:
-        response = await call_next(request)
+        if route_class is not None:
+            response = await call_admitted(request, call_next, route_class)
+        else:
+            response = await call_next(request)
         status_code = response.status_code
     except Exception as e:
         status_code = 500
         raise e
     finally:
-        latency = time.time() - start_time
+        latency = (time.perf_counter_ns() - start_ns) / 1e9
+        # Route template rather than the raw path keeps the label set bounded;
+        # rejected requests never reach the router, their path is one of ROUTE_CLASSES
+        endpoint = route_template(request)
+        if endpoint == 'unmatched' and route_class is not None:
+            endpoint = request.url.path
         REQUEST_LATENCY.labels(method, endpoint).observe(latency)
         REQUEST_COUNT.labels(method, endpoint, status_code).inc()
 
@@ -51,16 +165,62 @@ async def monitor_requests(request: Request, call_next):
 # Metrics endpoint
 @app.get("/metrics")
 async def metrics():
-    return Response(generate_latest(), media_type="text/plain")
+    # Aggregated over every worker in multiprocess mode (see metrics_server.py)
+    return Response(render_metrics(), media_type="text/plain")
+
+# Liveness: the process is up and the event loop answers, nothing else is checked
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
 
-# Load model
+# Readiness: the model is loaded and warmed up, and the worker is not shutting down
+@app.get("/readyz")
+async def readyz():
+    if not app.state.ready:
+        raise HTTPException(status_code=503, detail="Not ready")
+    return {"status": "ready", "model_version": model_ref.version}
+
+# Load model (compiled into a single affine map, see inference.py). The image ships the
+# compiled .bin, so this is a memory map rather than an unpickle.
+model_load_started = time.perf_counter()
 try:
     current_dir = os.path.dirname(__file__)
     model_path = os.path.join(current_dir, "../models/logistic_model.pkl")
-    with open(model_path, "rb") as f:
-        model = pickle.load(f)
+    model_ref = ModelRef(load_serving_model(model_path))
 except Exception as e:
     raise RuntimeError(f"Failed to load model: {str(e)}")
+STARTUP_SECONDS.labels('model_load').set(time.perf_counter() - model_load_started)
+
+# With several workers (serve.py) each one polls the compiled artifact so a model
+# published by any worker's retrain reaches all of them (0 disables polling)
+MODEL_RELOAD_INTERVAL = float(os.getenv('MODEL_RELOAD_INTERVAL', '0'))
+model_watcher = None
+if MODEL_RELOAD_INTERVAL > 0:
+    model_watcher = ModelFileWatcher(model_ref, compiled_path_for(model_path), load_compiled, MODEL_RELOAD_INTERVAL)
+
+# Optional extra models for A/B traffic splits and shadow scoring (see model_variants.py)
+MODEL_VARIANTS = os.getenv('MODEL_VARIANTS', '')
+model_variants = None
+if MODEL_VARIANTS:
+    model_variants = ModelVariants.from_env(model_ref, MODEL_VARIANTS, os.getenv('MODEL_TRAFFIC', ''))
+
+def score_variants(X, request, timer):
+    """Score X with every loaded model in one product and pick the served one.
+
+    Returns the served probabilities, its version and name, and the background
+    task that records agreement and latency once the response has been sent.
+    """
+    primary_version, probabilities = model_variants.score(X, timer)
+    served = model_variants.route(request.headers.get('x-routing-key'))
+    background = BackgroundTask(model_variants.record, served, probabilities,
+                                getattr(request.state, 'start_ns', None))
+    return (probabilities[:, served], model_variants.versions(primary_version)[served],
+            model_variants.names[served], background)
+
+# Histograms of the inputs and predicted probabilities for drift monitoring, exported
+# every DRIFT_EXPORT_INTERVAL seconds (see drift.py, 0 disables them)
+DRIFT_EXPORT_INTERVAL = float(os.getenv('DRIFT_EXPORT_INTERVAL', '5'))
+drift_monitor = DriftMonitor(model_ref, DRIFT_EXPORT_INTERVAL) if DRIFT_EXPORT_INTERVAL > 0 else None
 
 class PatientData(BaseModel):
     age: float
@@ -74,58 +234,201 @@ class PatientData(BaseModel):
     albumin: float
     albumin_globulin_ratio: float
 
+# Optional micro-batching of concurrent /predict calls (see batching.py)
+MICROBATCH_ENABLED = os.getenv('MICROBATCH_ENABLED', '0') == '1'
+MICROBATCH_MAX_BATCH_SIZE = int(os.getenv('MICROBATCH_MAX_BATCH_SIZE', '64'))
+MICROBATCH_MAX_WAIT_US = int(os.getenv('MICROBATCH_MAX_WAIT_US', '500'))
+
+def score_rows(X):
+    # Reads the model at flush time so a newly published model is picked up
+    version, model = model_ref.get()
+    return [(p, version) for p in predict_proba_compiled(model, X)]
+
+predict_batcher = MicroBatcher(score_rows, MICROBATCH_MAX_BATCH_SIZE, MICROBATCH_MAX_WAIT_US)
+
+# Optional LRU cache of /predict results for repeated panels (0 disables it)
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '0'))
+PREDICTION_CACHE_TTL = float(os.getenv('PREDICTION_CACHE_TTL', '0'))  # seconds, 0 = no expiry
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL or None) if PREDICTION_CACHE_SIZE else None
+
 @app.post("/predict")
-async def predict(data: PatientData):
+async def predict(data: PatientData, request: Request):
+    timer = inference_timer(getattr(request.state, 'admitted_ns', None))
     try:
-        input_values = [
-            data.age,
-            data.gender,
-            data.total_bilirubin,
-            data.direct_bilirubin,
-            data.alkaline_phosphotase,
-            data.alanine_aminotransferase,
-            data.aspartate_aminotransferase,
-            data.total_proteins,
-            data.albumin,
-            data.albumin_globulin_ratio
-        ]
-
-        input_array = np.array(input_values).reshape(1, -1)
-        scaled_data = (input_array - model['mean']) / model['std']
-        pca_data = np.dot(scaled_data, model['eigenvectors'])
-        pca_with_bias = np.c_[np.ones((pca_data.shape[0], 1)), pca_data]
-        probability = 1 / (1 + np.exp(-np.dot(pca_with_bias, model['weights'])))
-
-        return {
-            "probability": float(probability[0][0]),
-            "prediction": int(probability[0][0] >= 0.5)
+        input_values = [getattr(data, name) for name in FEATURE_NAMES]
+        timer.lap('validation')
+        probability = None
+        variant = background = None
+        if model_variants is not None:
+            # The cache and the micro-batcher only know the primary model, so they are bypassed
+            probabilities, version, variant, background = score_variants(input_values, request, timer)
+            probability = probabilities[0]
+        elif prediction_cache is not None:
+            cache_key = prediction_cache.key(input_values)
+            version = model_ref.version
+            probability = prediction_cache.get(version, cache_key)
+            timer.lap('cache_lookup')
+
+        if probability is None:
+            if MICROBATCH_ENABLED:
+                probability, version = await predict_batcher.submit(input_values)
+                timer.lap('microbatch')
+            else:
+                version, model = model_ref.get()
+                probability = predict_proba_compiled(model, input_values, timer)[0]
+            if prediction_cache is not None:
+                prediction_cache.put(version, cache_key, probability)
+        if drift_monitor is not None:
+            drift_monitor.observe_row(input_values, probability)
+            timer.lap('drift')
+
+        content = {
+            "probability": float(probability),
+            "prediction": int(probability >= 0.5),
+            "model_version": version
         }
+        if variant is not None:
+            content["model_variant"] = variant
+        response = JSONResponse(content=content, background=background)
+        timer.lap('serialization')
+        return response
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# Upper bound on rows accepted by /predict/batch
+MAX_BATCH_SIZE = int(os.getenv('MAX_BATCH_SIZE', '1000'))
+
+class BatchRequest(BaseModel):
+    # Rows are validated one by one so a bad row doesn't reject the whole batch
+    patients: List[Dict[str, Any]]
+
+    @field_validator('patients', mode='before')
+    @classmethod
+    def check_batch_size(cls, patients):
+        # Runs before the rows are validated; HTTPException is not caught by pydantic, so this is a 413
+        if isinstance(patients, list) and len(patients) > MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch of {len(patients)} rows exceeds MAX_BATCH_SIZE={MAX_BATCH_SIZE}"
+            )
+        return patients
+
+@app.post("/predict/batch")
+async def predict_batch(batch: BatchRequest, request: Request):
+    timer = inference_timer(getattr(request.state, 'admitted_ns', None))
+
+    results = [None] * len(batch.patients)
+    valid_rows = []
+    valid_index = []
+    for i, row in enumerate(batch.patients):
+        try:
+            patient = PatientData(**row)
+        except ValidationError as e:
+            errors = [{"field": ".".join(str(l) for l in err["loc"]), "msg": err["msg"]} for err in e.errors()]
+            results[i] = {"index": i, "error": errors}
+            continue
+        valid_rows.append([getattr(patient, name) for name in FEATURE_NAMES])
+        valid_index.append(i)
+    timer.lap('validation')
+
+    version, model = model_ref.get()
+    variant = background = None
+    if valid_rows:
+        try:
+            if model_variants is not None:
+                probabilities, version, variant, background = score_variants(valid_rows, request, timer)
+            else:
+                probabilities = predict_proba_compiled(model, valid_rows, timer)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        for i, p in zip(valid_index, probabilities):
+            results[i] = {"index": i, "probability": float(p), "prediction": int(p >= 0.5)}
+        if drift_monitor is not None:
+            drift_monitor.observe(valid_rows, probabilities)
+            timer.lap('drift')
+
+    content = {
+        "results": results,
+        "count": len(valid_index),
+        "errors": len(results) - len(valid_index),
+        "model_version": version
+    }
+    if variant is not None:
+        content["model_variant"] = variant
+    response = JSONResponse(content=content, background=background)
+    timer.lap('serialization')
+    return response
+
+# Upper bound on rows accepted by /predict/matrix
+MAX_MATRIX_ROWS = int(os.getenv('MAX_MATRIX_ROWS', '100000'))
+
+@app.post("/predict/matrix")
+async def predict_matrix(request: Request):
+    """Binary batch scoring (see binary_format.py): raw float matrix in, probabilities out.
+
+    Invalid rows score NaN and are counted in the X-Invalid-Rows header.
+    """
+    timer = inference_timer(getattr(request.state, 'admitted_ns', None))
+    if request.headers.get('content-type', '').split(';')[0].strip() != MATRIX_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Content-Type must be {MATRIX_CONTENT_TYPE}")
+    try:
+        X = decode_matrix(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(X) > MAX_MATRIX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Matrix of {len(X)} rows exceeds MAX_MATRIX_ROWS={MAX_MATRIX_ROWS}"
+        )
+    valid = valid_rows(X)
+    timer.lap('validation')
+
+    version, model = model_ref.get()
+    headers = {"X-Invalid-Rows": str(int(len(X) - valid.sum()))}
+    background = None
+    probabilities = np.full(len(X), np.nan)
+    if model_variants is not None:
+        if valid.any():
+            probabilities[valid], version, headers["X-Model-Variant"], background = score_variants(
+                X[valid], request, timer)
+    elif valid.all():
+        probabilities = predict_proba_compiled(model, X, timer)
+    elif valid.any():
+        probabilities[valid] = predict_proba_compiled(model, X[valid], timer)
+    headers["X-Model-Version"] = str(version)
+    if drift_monitor is not None:
+        drift_monitor.observe(X[valid], probabilities[valid])
+        timer.lap('drift')
+
+    response = Response(
+        content=encode_probabilities(probabilities, X.dtype),
+        media_type=MATRIX_CONTENT_TYPE,
+        headers=headers,
+        background=background
+    )
+    timer.lap('serialization')
+    return response
+
 # Global counter for feedback submissions
 feedback_count = 0
-RETRAIN_THRESHOLD = 1  # Retrain after 10 incorrect predictions
+RETRAIN_THRESHOLD = int(os.getenv('RETRAIN_THRESHOLD', '1'))  # Retrain after this many incorrect predictions
+
+# Retraining runs in a separate trainer process, one run at a time.
+# 'full' retrains on the whole dataset, 'online' only folds in new feedback rows.
+RETRAIN_MODE = os.getenv('RETRAIN_MODE', 'full')
+# With the watcher, retrained models are published from the artifact like in every other worker
+retrainer = Retrainer(model_watcher or model_ref, RETRAIN_JOBS[RETRAIN_MODE], args=(FEEDBACK_PATH, model_path))
 
 @app.post("/feedback")
 async def feedback(data: dict):
     global feedback_count
-    
+
+    # Only buffers the record, the background task writes it to disk
+    if not feedback_sink.put(data):
+        raise HTTPException(status_code=503, detail="Feedback buffer is full, please retry later")
+
     try:
-        # Ensure directory exists
-        os.makedirs("../data", exist_ok=True)
-        
-        # Check if train.csv exists, if not create with headers
-        file_exists = os.path.isfile("../data/train.csv")
-        
-        # Append data to CSV
-        with open("../data/Liver Patient Dataset(LPD)_train.csv", "a", newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=data.keys())
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow(data)
-            
         # Increment feedback counter
         feedback_count += 1
         
@@ -133,9 +436,9 @@ async def feedback(data: dict):
         if feedback_count >= RETRAIN_THRESHOLD:
             # Reset counter
             feedback_count = 0
-            # Trigger retraining (could be async)
+            # Trigger retraining in the background, serving continues on the current model
             await retrain_model()
-            return JSONResponse(content={"message": "Feedback saved and model retrained"})
+            return JSONResponse(content={"message": "Feedback saved and model retraining scheduled"})
         
         return JSONResponse(content={"message": "Feedback saved successfully"})
         
@@ -143,29 +446,25 @@ async def feedback(data: dict):
         raise HTTPException(status_code=500, detail=f"Failed to save feedback: {str(e)}")
 
 async def retrain_model():
-    """Retrain the model using updated dataset and save the new model"""
-    try:
-        # Load existing data
-        df = pd.read_csv("../data/train.csv")
-        
-        # Implement your model training logic here
-        # For example:
-        # X = df.drop('actual_result', axis=1)
-        # y = df['actual_result']
-        # Perform train/test split, scaling, PCA, etc.
-        # Train logistic regression
-        # Save new model to replace the old one
-        
-        # Update the loaded model in memory
-        global model
-        current_dir = os.path.dirname(__file__)
-        model_path = os.path.join(current_dir, "../models/logistic_model.pkl")
-        with open(model_path, "rb") as f:
-            model = pickle.load(f)
-            
-        # Log retraining event
-        print("Model successfully retrained with feedback data")
-        
-    except Exception as e:
-        print(f"Error retraining model: {str(e)}")
-        raise
+    """Schedule a retrain on the updated dataset; the new model is published when it is ready"""
+    # Make sure buffered feedback is on disk before the trainer reads it
+    await feedback_sink.flush()
+    retrainer.trigger()
+
+def warm_up(n_rows):
+    """Run synthetic patients through validation, scoring and serialization once so the
+    first real requests don't pay for lazy initialisation (numpy ufunc dispatch, pydantic)"""
+    if n_rows <= 0:
+        return
+    version, model = model_ref.get()
+    rng = np.random.default_rng(0)
+    X = np.abs(np.asarray(model['mean']) + np.asarray(model['std']) * rng.standard_normal((n_rows, len(FEATURE_NAMES))))
+    X[:, FEATURE_NAMES.index('gender')] = rng.integers(0, 2, n_rows)
+    patients = [PatientData(**dict(zip(FEATURE_NAMES, row.tolist()))) for row in X]
+    rows = [[getattr(patient, name) for name in FEATURE_NAMES] for patient in patients]
+    probabilities = predict_proba_compiled(model, rows)
+    predict_proba_compiled(model, rows[0])
+    JSONResponse(content={"results": [{"index": i, "probability": float(p), "prediction": int(p >= 0.5)}
+                                      for i, p in enumerate(probabilities)], "model_version": version})
+
+STARTUP_SECONDS.labels('import').set(time.perf_counter() - IMPORT_STARTED)
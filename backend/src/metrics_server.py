@@ -0,0 +1,45 @@
+"""Prometheus exposition for one or many worker processes.
+
+With PROMETHEUS_MULTIPROC_DIR set (serve.py does this for --workers > 1)
+every worker writes its metrics to files in that directory and any worker
+can serve the aggregate, both on /metrics and on the separate metrics port.
+Only one worker gets to bind the port; the others skip it.
+"""
+
+import os
+
+from prometheus_client import REGISTRY, CollectorRegistry, generate_latest, multiprocess, start_http_server
+
+
+def multiprocess_enabled():
+    return bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def metrics_registry():
+    """Registry aggregating every worker in multiprocess mode, the default registry otherwise"""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics():
+    return generate_latest(metrics_registry())
+
+
+def start_metrics_server(port):
+    """Serve metrics on port (0 disables), returns False if another worker already has it"""
+    if not port:
+        return False
+    try:
+        start_http_server(port, registry=metrics_registry())
+    except OSError:
+        return False
+    return True
+
+
+def mark_worker_dead():
+    # Drops this worker's live gauges from the aggregate
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
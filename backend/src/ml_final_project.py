@@ -1,242 +1,283 @@
 # -*- coding: utf-8 -*-
-"""ML_Final_project.ipynb
+"""Training pipeline for the liver disease logistic model.
 
-Automatically generated by Colab.
+Originally exported from the ML_Final_project.ipynb Colab notebook
+(https://colab.research.google.com/drive/1QHw2YDEp8FnFMi7d6vJ587Q8qyXur-5R).
 
-Original file is located at
-    https://colab.research.google.com/drive/1QHw2YDEp8FnFMi7d6vJ587Q8qyXur-5R
+Usage:
+    from ml_final_project import train
+    result = train()
+
+or from the command line:
+    python ml_final_project.py --dataset-path ../data/raw --model-dir ../models
 """
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-import seaborn as sns
+import argparse
+import csv
+import functools
+import io
 import os
 import pickle
+import time
 
-dataset_path = os.getenv('DATASET_PATH', '/home/prabhav/SPE_Project/backend/data/raw')
-print("Files in dataset folder:", os.listdir(dataset_path))
-df = pd.read_csv(os.path.join(dataset_path, 'Liver Patient Dataset (LPD)_train.csv'), encoding='latin1')
-print(df.head())
-print(df.head())
-df.info()
-
-df.dropna(inplace=True)
-
-df['Result'] = df['Result'].map({1: 1, 2: 0})
-
-df['Gender of the patient'] = df['Gender of the patient'].map({'Male': 0, 'Female': 1})
-
-
-numerical_features = ['Age of the patient', 'Total Bilirubin', 'Direct Bilirubin', '\u00a0Alkphos Alkaline Phosphotase',
-                      '\u00a0Sgpt Alamine Aminotransferase', 'Sgot Aspartate Aminotransferase', 'Total Protiens',
-                      '\u00a0ALB Albumin', 'A/G Ratio Albumin and Globulin Ratio','Gender of the patient']
-
-
-X = df[numerical_features]
-y = df['Result']
-
-split_ratio = 0.8
-split_index = int(len(X) * split_ratio)
-
-X_train, X_test = X.iloc[:split_index], X.iloc[split_index:]
-y_train, y_test = y.iloc[:split_index], y.iloc[split_index:]
-
-train_df = X_train.copy()
-train_df['Result'] = y_train.values
-
-test_df = X_test.copy()
-test_df['Result'] = y_test.values
-
-"""Here we are removing all the rows which has a null value, this is done to avoid incorrect assumptions about the missing values.
-
-Other alternatives that can be done are:
-
-1. Group-Specific Imputation
-2. Predictive Imputation
-"""
+import numpy as np
+import pandas as pd
 
-train_df.head()
+from dataset_store import DatasetStore
+from evaluation import evaluate_probabilities
+from inference import (FEATURE_NAMES, MODEL_PRECISION, check_equivalence, compile_model, compiled_path_for,
+                       save_compiled)
+from running_stats import RunningStats, save_training_state, stats_path_for
+from solvers import SOLVERS, fit_logistic, gradient_descent, gradient_descent_l1, sigmoid
 
-train_df.describe()
+current_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATASET_PATH = os.getenv('DATASET_PATH', os.path.join(current_dir, '../data/raw'))
+DEFAULT_MODEL_DIR = os.path.join(current_dir, '../models')
+DATASET_FILE = 'Liver Patient Dataset (LPD)_train.csv'
+# Binary columnar cache of the dataset and feedback (see dataset_store.py)
+DEFAULT_CACHE_DIR = os.getenv('DATASET_CACHE_DIR', os.path.join(current_dir, '../data/cache'))
+
+# Column names in the raw dataset, in the same order as FEATURE_NAMES (the API order)
+numerical_features = ['Age of the patient', 'Gender of the patient', 'Total Bilirubin', 'Direct Bilirubin',
+                      '\u00a0Alkphos Alkaline Phosphotase', '\u00a0Sgpt Alamine Aminotransferase',
+                      'Sgot Aspartate Aminotransferase', 'Total Protiens', '\u00a0ALB Albumin',
+                      'A/G Ratio Albumin and Globulin Ratio']
+
+# Binary columns are left alone by the outlier imputation
+CATEGORICAL_FEATURES = ['gender']
 
-train_df.shape
 
-train_df.info()
+"""DATA LOADING"""
 
-category_counts = train_df['Gender of the patient'].value_counts()
-print(category_counts)
+def read_dataset_csv(csv_path):
+    """Parse the LPD csv, returns (X, y) with X columns in FEATURE_NAMES order"""
+    return _clean_dataset_frame(pd.read_csv(csv_path, encoding='latin1'))
 
-for column in train_df.columns:
-    print(f"Unique values in {column}:")
-    print(train_df[column].unique())
 
-test_df.info()
+def iter_dataset_csv(csv_path, chunk_size):
+    """read_dataset_csv in blocks of at most chunk_size csv rows, yields (X, y)"""
+    with pd.read_csv(csv_path, encoding='latin1', chunksize=chunk_size) as reader:
+        for df in reader:
+            yield _clean_dataset_frame(df)
+
+
+def _clean_dataset_frame(df):
+    df = df.dropna()
+
+    df['Result'] = df['Result'].map({1: 1, 2: 0})
+
+    # Same encoding as the frontend form / API
+    df['Gender of the patient'] = df['Gender of the patient'].map({'Male': 1, 'Female': 0})
+
+    X = df[numerical_features].to_numpy(dtype=np.float64)
+    y = df['Result'].to_numpy(dtype=np.float64)
+    return X, y
+
+
+def load_dataset(dataset_path=None):
+    """Read the LPD csv and return (X, y) with X columns in FEATURE_NAMES order"""
+    return read_dataset_csv(os.path.join(dataset_path or DEFAULT_DATASET_PATH, DATASET_FILE))
+
+
+def _to_columns(X, y):
+    columns = {name: X[:, i] for i, name in enumerate(FEATURE_NAMES)}
+    columns['result'] = y
+    return columns
+
+
+def _from_columns(columns):
+    return np.column_stack([columns[name] for name in FEATURE_NAMES]), np.asarray(columns['result'])
+
+
+def open_dataset_store(dataset_path=None, feedback_path=None, cache_dir=None):
+    """Open the columnar cache of the dataset (parsing the csv only on first use)
+    and append any feedback rows it hasn't seen yet as a new segment"""
+    csv_path = os.path.join(dataset_path or DEFAULT_DATASET_PATH, DATASET_FILE)
+    store = DatasetStore.for_source(cache_dir or DEFAULT_CACHE_DIR, csv_path,
+                                    lambda path: _to_columns(*read_dataset_csv(path)))
+    if feedback_path and os.path.isfile(feedback_path):
+        X_new, y_new, feedback_offset = load_feedback(feedback_path, store.feedback_offset)
+        if feedback_offset != store.feedback_offset:
+            store.append(_to_columns(X_new, y_new), feedback_offset=feedback_offset)
+    return store
+
+
+def load_feedback(feedback_path, offset=0):
+    """Read feedback rows written by the backend, starting at byte offset.
+
+    Returns (X, y, end_offset); pass end_offset back in to read only the
+    rows appended since. X and y are empty when there is no new feedback.
+    Rows with missing or non-numeric values are skipped.
+    """
+    columns = FEATURE_NAMES + ['actual_result']
+    empty = np.empty((0, len(FEATURE_NAMES))), np.empty(0)
+    if not feedback_path or not os.path.isfile(feedback_path):
+        return empty + (0,)
+
+    with open(feedback_path, 'rb') as f:
+        header = f.readline()
+        if offset < len(header) or offset > os.fstat(f.fileno()).st_size:
+            offset = len(header)
+        f.seek(offset)
+        data = f.read()
+    # Only consume complete lines, a partially written row is picked up next time
+    data = data[:data.rfind(b'\n') + 1]
+    end_offset = offset + len(data)
+
+    fieldnames = next(csv.reader([header.decode()]), [])
+    if not set(columns).issubset(fieldnames):
+        return empty + (end_offset,)
+    return _parse_feedback(data.decode(), fieldnames) + (end_offset,)
+
+
+def feedback_end_offset(feedback_path):
+    """Byte offset just past the last complete line of the feedback csv (0 if there is none)"""
+    if not feedback_path or not os.path.isfile(feedback_path):
+        return 0
+    with open(feedback_path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            block = f.read(end - start)
+            newline = block.rfind(b'\n')
+            if newline != -1:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+def iter_feedback(feedback_path, offset=0, end_offset=None, chunk_size=65536):
+    """load_feedback in blocks of at most chunk_size rows, yields (X, y).
+
+    Stops at end_offset (default: the last complete line), so repeated
+    passes see the same rows even while the backend keeps appending.
+    """
+    end_offset = feedback_end_offset(feedback_path) if end_offset is None else end_offset
+    if not end_offset:
+        return
+    with open(feedback_path, 'rb') as f:
+        header = f.readline()
+        fieldnames = next(csv.reader([header.decode()]), [])
+        if not set(FEATURE_NAMES + ['actual_result']).issubset(fieldnames):
+            return
+        f.seek(max(offset, len(header)))
+        lines = []
+        position = f.tell()
+        for line in f:
+            if position >= end_offset:
+                break
+            position += len(line)
+            lines.append(line.decode())
+            if len(lines) == chunk_size:
+                yield _parse_feedback(''.join(lines), fieldnames)
+                lines = []
+        if lines:
+            yield _parse_feedback(''.join(lines), fieldnames)
+
+
+def _parse_feedback(text, fieldnames):
+    """(X, y) from feedback csv lines, skipping rows with missing or non-numeric values"""
+    columns = FEATURE_NAMES + ['actual_result']
+    rows = []
+    for record in csv.DictReader(io.StringIO(text), fieldnames=fieldnames):
+        try:
+            rows.append([float(record[name]) for name in columns])
+        except (TypeError, ValueError):
+            continue
+    if not rows:
+        return np.empty((0, len(FEATURE_NAMES))), np.empty(0)
+    rows = np.array(rows)
+    return rows[:, :-1], rows[:, -1]
+
+
+def train_test_split(X, y, split_ratio=0.8):
+    split_index = int(len(X) * split_ratio)
+    return X[:split_index], X[split_index:], y[:split_index], y[split_index:]
+
 
 """OUTLIERS FINDING"""
 
 def find_outliers_iqr(data):
-
-    Q1 = np.percentile(data, 25)
-    Q3 = np.percentile(data, 75)
+    """Boolean mask of values outside 1.5 IQR, for every column of a 2-D array at once"""
+    data = np.asarray(data, dtype=np.float64)
+    Q1, Q3 = np.percentile(data, [25, 75], axis=0)
     IQR = Q3 - Q1
     lower_bound = Q1 - 1.5 * IQR
     upper_bound = Q3 + 1.5 * IQR
-    outliers = data[(data < lower_bound) | (data > upper_bound)]
-    return outliers.tolist()
+    return (data < lower_bound) | (data > upper_bound)
 
 
-numeric_df = train_df.select_dtypes(include=['number'])
-for column in numeric_df.columns:
-    outliers = find_outliers_iqr(train_df[column])
-    if outliers:
-        print(f"Outliers in {column}: {outliers}")
-    else:
-        print(f"No outliers found in {column}")
-
-"""This is done to detect and handle outliers in a dataset by using the Interquartile Range method."""
-
-train_df.describe()
-
 """OUTLIERS REMOVAL BY IMPUTING"""
 
-def impute_outliers_with_median_no_lib(data):
+def outlier_bounds(data):
+    """Per-column (lower_bound, upper_bound, median) of the 1.5 IQR rule.
 
-    data_sorted = sorted(data)
-    n = len(data)
+    Uses the same order-statistic quartiles as the original notebook
+    (sorted[(n + 1) // 4 - 1] and sorted[3 * (n + 1) // 4 - 1]) but sorts all
+    columns in a single call instead of one Python list per column.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    n = data.shape[0]
+    data_sorted = np.sort(data, axis=0)
 
     if n % 2 == 0:
         median = (data_sorted[n // 2 - 1] + data_sorted[n // 2]) / 2
     else:
         median = data_sorted[n // 2]
 
-    q1_index = (n + 1) // 4
-    q3_index = 3 * (n + 1) // 4
-
-    if q1_index % 1 != 0:
-        q1 = (data_sorted[int(q1_index) - 1] + data_sorted[int(q1_index)]) / 2
-    else:
-        q1 = data_sorted[int(q1_index) - 1]
-
-    if q3_index % 1 != 0:
-        q3 = (data_sorted[int(q3_index) - 1] + data_sorted[int(q3_index)]) / 2
-    else:
-        q3 = data_sorted[int(q3_index) - 1]
+    q1 = data_sorted[(n + 1) // 4 - 1]
+    q3 = data_sorted[3 * (n + 1) // 4 - 1]
 
     iqr = q3 - q1
-    lower_bound = q1 - 1.5 * iqr
-    upper_bound = q3 + 1.5 * iqr
-
-    imputed_data = [x if lower_bound <= x <= upper_bound else median for x in data]
-
-    return imputed_data
-
-numeric_df = train_df.select_dtypes(include=['number'])
-
-for column in numeric_df.columns:
-    train_df[column] = impute_outliers_with_median_no_lib(train_df[column].tolist())
-
-
-numeric_df = train_df.select_dtypes(include=['number'])
-
-train_df.describe()
-
-for column in train_df.columns:
-    print(f"Unique values in {column}:")
-    print(df[column].unique())
-
-train_df.info()
-
-train_df.describe()
-
+    return q1 - 1.5 * iqr, q3 + 1.5 * iqr, median
 
 
+def impute_outliers_with_median(data, bounds=None):
+    """Replace values outside 1.5 IQR with the column median, for every column at once.
 
+    bounds (from outlier_bounds) lets new rows be imputed with the bounds of
+    the original training data instead of their own.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    lower_bound, upper_bound, median = bounds if bounds is not None else outlier_bounds(data)
+    return np.where((data >= lower_bound) & (data <= upper_bound), data, median)
 
 
+"""SCALING"""
 
 def zscore_scaling(data, mean, std):
     return (data - mean) / std
 
-train_mean = train_df[numerical_features].mean()
-train_std = train_df[numerical_features].std()
-
-train_df[numerical_features] = zscore_scaling(train_df[numerical_features], train_mean, train_std)
-test_df[numerical_features] = zscore_scaling(test_df[numerical_features], train_mean, train_std)
 
 """PCA"""
 
-numeric_df_train = train_df.select_dtypes(include=['number'])
-data_train = numeric_df_train.to_numpy()
-cov_matrix_train = np.cov(data_train, rowvar=False)
-eigenvalues, eigenvectors = np.linalg.eig(cov_matrix_train)
-
-sorted_indices = np.argsort(eigenvalues)[::-1]
-eigenvalues = eigenvalues[sorted_indices]
-eigenvectors = eigenvectors[:, sorted_indices]
-
-explained_variance_ratio = eigenvalues / np.sum(eigenvalues)
-
-cumulative_variance = np.cumsum(explained_variance_ratio)
-n_components = np.argmax(cumulative_variance >= 0.95) + 1
-
-principal_components_train = np.dot(data_train, eigenvectors[:, :n_components])
+def fit_pca(data, variance_threshold=0.95):
+    """Principal axes of already-scaled data, returns (eigenvalues, eigenvectors, n_components)"""
+    return pca_from_covariance(np.cov(data, rowvar=False), variance_threshold)
 
-principal_df_train = pd.DataFrame(
-    principal_components_train,
-    columns=[f"PC{i+1}" for i in range(n_components)]
-)
-final_train_df = pd.concat([principal_df_train, train_df['Result'].reset_index(drop=True)], axis=1)
 
-numeric_df_test = test_df.select_dtypes(include=['number'])
-data_test = numeric_df_test.to_numpy()
-principal_components_test = np.dot(data_test, eigenvectors[:, :n_components])
-principal_df_test = pd.DataFrame(
-    principal_components_test,
-    columns=[f"PC{i+1}" for i in range(n_components)]
-)
-final_test_df = pd.concat([principal_df_test, test_df['Result'].reset_index(drop=True)], axis=1)
+def pca_from_covariance(cov_matrix, variance_threshold=0.95):
+    """Principal axes of a covariance matrix, largest eigenvalue first.
 
-# Print results
-print("Explained Variance Ratio (Training Data):", explained_variance_ratio[:n_components])
-print("Number of Principal Components:", n_components)
-print(final_train_df.head())
-print(final_test_df.head())
+    eigh exploits the symmetry (real eigenvalues, orthonormal vectors) and
+    returns them in ascending order, so no argsort is needed. Each vector's
+    sign is fixed so its largest component is positive, which makes the
+    basis reproducible across runs and platforms.
+    """
+    eigenvalues, eigenvectors = np.linalg.eigh(cov_matrix)
+    eigenvalues = eigenvalues[::-1]
+    eigenvectors = eigenvectors[:, ::-1]
+    largest = eigenvectors[np.argmax(np.abs(eigenvectors), axis=0), np.arange(eigenvectors.shape[1])]
+    eigenvectors = eigenvectors * np.where(largest < 0, -1.0, 1.0)
 
-"""Here we have done PCA to get the principal components and project our already present data on these components to receive our new data frame.
+    explained_variance_ratio = eigenvalues / np.sum(eigenvalues)
+    cumulative_variance = np.cumsum(explained_variance_ratio)
+    n_components = int(np.argmax(cumulative_variance >= variance_threshold) + 1)
+    return eigenvalues, eigenvectors, n_components
 
-# logistic
-"""
-
-import numpy as np
-import matplotlib.pyplot as plt
-
-def sigmoid(z):
-    return 1 / (1 + np.exp(-z))
-
-def compute_cost(X, y, weights):
-    m = len(y)
-    h = sigmoid(X @ weights)
-    epsilon = 1e-5
-    cost = -(1 / m) * (y.T @ np.log(h + epsilon) + (1 - y).T @ np.log(1 - h + epsilon))
-    return cost
-
-def gradient_descent(X, y, weights, learning_rate, iterations):
-    m = len(y)
-    cost_history = []
-
-    for _ in range(iterations):
-        predictions = sigmoid(X @ weights)
-        gradient = (1 / m) * X.T @ (predictions - y)
-        weights -= learning_rate * gradient
-        cost = compute_cost(X, y, weights)
-        cost_history.append(cost)
-
-    return weights, cost_history
 
-def predict(X, weights):
-    probabilities = sigmoid(X @ weights)
-    return (probabilities >= 0.5).astype(int)
+"""# logistic"""
 
 def logistic_regression_manual(X, y, learning_rate=0.05, iterations=1000):
     X = np.c_[np.ones((X.shape[0], 1)), X]
@@ -245,52 +286,6 @@ def logistic_regression_manual(X, y, learning_rate=0.05, iterations=1000):
     weights, cost_history = gradient_descent(X, y, weights, learning_rate, iterations)
     return weights, cost_history
 
-X_train = np.array(principal_components_train)
-y_train = np.array(train_df['Result'])
-
-X_test = np.array(principal_components_test)
-y_test = np.array(test_df['Result'])
-
-weights, cost_history = logistic_regression_manual(X_train, y_train, learning_rate=0.01, iterations=1000)
-
-X_test_bias = np.c_[np.ones((X_test.shape[0], 1)), X_test]
-y_pred = predict(X_test_bias, weights)
-
-accuracy = np.mean(y_pred.flatten() == y_test) * 100
-print(f"Accuracy: {accuracy:.2f}%")
-
-flat_cost_history = np.array(cost_history).flatten()
-
-def sigmoid(z):
-    return 1 / (1 + np.exp(-z))
-
-def compute_cost_l1(X, y, weights, lambda_):
-    m = len(y)
-    h = sigmoid(X @ weights)
-    epsilon = 1e-5
-    cost = -(1 / m) * (y.T @ np.log(h + epsilon) + (1 - y).T @ np.log(1 - h + epsilon))
-    l1_penalty = lambda_ * np.sum(np.abs(weights[1:]))
-    return cost + l1_penalty
-
-def gradient_descent_l1(X, y, weights, learning_rate, iterations, lambda_):
-    m = len(y)
-    cost_history = []
-
-    for _ in range(iterations):
-        predictions = sigmoid(X @ weights)
-        gradient = (1 / m) * X.T @ (predictions - y)
-        l1_gradient = lambda_ * np.sign(weights)
-        l1_gradient[0] = 0
-        weights -= learning_rate * (gradient + l1_gradient)
-        cost = compute_cost_l1(X, y, weights, lambda_)
-        cost_history.append(cost)
-
-    return weights, cost_history
-
-def predict(X, weights):
-    probabilities = sigmoid(X @ weights)
-    return (probabilities >= 0.5).astype(int)
-
 def logistic_regression_l1(X, y, learning_rate=0.01, iterations=1000, lambda_=0.01):
     X = np.c_[np.ones((X.shape[0], 1)), X]
     weights = np.zeros((X.shape[1], 1))
@@ -298,58 +293,234 @@ def logistic_regression_l1(X, y, learning_rate=0.01, iterations=1000, lambda_=0.
     weights, cost_history = gradient_descent_l1(X, y, weights, learning_rate, iterations, lambda_)
     return weights, cost_history
 
-X_train = np.array(principal_components_train)
-y_train = np.array(train_df['Result'])
 
-X_test = np.array(principal_components_test)
-y_test = np.array(test_df['Result'])
+"""SAVING"""
 
-weights, cost_history = logistic_regression_l1(X_train, y_train, learning_rate=0.01, iterations=1000, lambda_=0.009)
+def save_model(model, model_dir, state=None, precision=None):
+    """Write logistic_model.pkl and its compiled .bin next to it, both replaced atomically.
 
-X_test_bias = np.c_[np.ones((X_test.shape[0], 1)), X_test]
-y_pred = predict(X_test_bias, weights)
+    state (running statistics, outlier bounds, feedback offset) is saved
+    alongside as logistic_model.stats.npz for online updates. The .bin is
+    in precision (default MODEL_PRECISION), the pickle is always float64.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    model_path = os.path.join(model_dir, "logistic_model.pkl")
+    tmp_path = model_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model, f)
+    os.replace(tmp_path, model_path)
 
-accuracy = np.mean(y_pred.flatten() == y_test) * 100
-print(f"Accuracy: {accuracy:.2f}%")
+    compiled = compile_model(model, precision)
+    check_equivalence(model, compiled)
+    save_compiled(compiled, compiled_path_for(model_path))
+    if state is not None:
+        save_training_state(stats_path_for(model_path), **state)
+    return model_path, compiled
 
-"""# SVM"""
 
-"""# DECISION TREE"""
+def _record_stage(timings, name, start_time):
+    """Store the time since start_time under name and return the new start time"""
+    timings[name] = time.perf_counter() - start_time
+    return time.perf_counter()
 
-base_dir = "/home/prabhav/SPE_Project/backend"
-model_dir = os.path.join(base_dir, "models")
-os.makedirs(model_dir, exist_ok=True)
 
-# Ensure consistent feature names (must match API)
-numerical_features_api = [
-    'age',
-    'gender',
-    'total_bilirubin', 
-    'direct_bilirubin',
-    'alkaline_phosphotase',
-    'alanine_aminotransferase',
-    'aspartate_aminotransferase',
-    'total_proteins',
-    'albumin',
-    'albumin_globulin_ratio'
-]
+def load_split(dataset_path=None, feedback_path=None, cache=True, cache_dir=None):
+    """Raw (X_train, X_test, y_train, y_test, feedback_offset), feedback appended to the training split.
 
-# Convert back to DataFrame with correct column names
-X_train_df = pd.DataFrame(principal_components_train, 
-                         columns=[f"PC{i+1}" for i in range(n_components)])
-X_test_df = pd.DataFrame(principal_components_test,
-                       columns=[f"PC{i+1}" for i in range(n_components)])
-
-# Save model with all required components
-model_path = os.path.join(model_dir, "logistic_model.pkl")
-with open(model_path, 'wb') as f:
-    pickle.dump({
+    With cache the dataset and feedback are read from the columnar store
+    instead of being parsed from csv.
+    """
+    if cache:
+        store = open_dataset_store(dataset_path, feedback_path, cache_dir)
+        X, y = _from_columns(store.read('base'))
+        X_feedback, y_feedback = _from_columns(store.read('feedback'))
+        feedback_offset = store.feedback_offset
+    else:
+        X, y = load_dataset(dataset_path)
+        X_feedback, y_feedback, feedback_offset = load_feedback(feedback_path)
+    X_train, X_test, y_train, y_test = train_test_split(X, y)
+    # Feedback only ever goes into the training split so the holdout stays comparable
+    X_train = np.vstack([X_train, X_feedback])
+    y_train = np.concatenate([y_train, y_feedback])
+    return X_train, X_test, y_train, y_test, feedback_offset
+
+
+def preprocess_split(X_train, X_test, timings=None):
+    """Impute, scale and project raw rows with statistics fitted on X_train alone.
+
+    X_train is imputed, X_test is only scaled and projected, as at serving
+    time. Stage wall times are added to timings (a dict) when one is given.
+    """
+    timings = {} if timings is None else timings
+    stage = functools.partial(_record_stage, timings)
+    X_train = np.array(X_train, dtype=np.float64)
+
+    t = time.perf_counter()
+    continuous = [i for i, name in enumerate(FEATURE_NAMES) if name not in CATEGORICAL_FEATURES]
+    outlier_counts = find_outliers_iqr(X_train[:, continuous]).sum(axis=0)
+    bounds = outlier_bounds(X_train[:, continuous])
+    X_train[:, continuous] = impute_outliers_with_median(X_train[:, continuous], bounds)
+    t = stage('impute', t)
+
+    # Sufficient statistics of the imputed training data, kept for online updates (see online.py)
+    stats = RunningStats.from_array(X_train)
+    train_mean = X_train.mean(axis=0)
+    train_std = X_train.std(axis=0, ddof=1)
+    X_train = zscore_scaling(X_train, train_mean, train_std)
+    X_test = zscore_scaling(X_test, train_mean, train_std)
+    t = stage('scale', t)
+
+    eigenvalues, eigenvectors, n_components = fit_pca(X_train)
+    eigenvectors = eigenvectors[:, :n_components]
+    t = stage('eig', t)
+
+    principal_components_train = X_train @ eigenvectors
+    principal_components_test = X_test @ eigenvectors
+    stage('project', t)
+
+    return {
+        'X_train': principal_components_train,
+        'X_test': principal_components_test,
+        'mean': train_mean,
+        'std': train_std,
+        'eigenvalues': eigenvalues,
+        'eigenvectors': eigenvectors,
+        'n_components': n_components,
+        'outlier_counts': dict(zip([FEATURE_NAMES[i] for i in continuous], outlier_counts.tolist())),
+        'stats': stats,
+        'bounds': bounds,
+        'continuous': continuous
+    }
+
+
+def prepare_data(dataset_path=None, feedback_path=None, timings=None, cache=True, cache_dir=None):
+    """Load, impute, scale and project the dataset; everything train() needs before the solver.
+
+    With cache the dataset and feedback are read from the columnar store
+    instead of being parsed from csv. Stage wall times are added to timings
+    (a dict) when one is given.
+    """
+    timings = {} if timings is None else timings
+
+    t = time.perf_counter()
+    X_train, X_test, y_train, y_test, feedback_offset = load_split(dataset_path, feedback_path, cache, cache_dir)
+    _record_stage(timings, 'load', t)
+
+    data = preprocess_split(X_train, X_test, timings)
+    state = {'stats': data.pop('stats'), 'bounds': data.pop('bounds'), 'continuous': data.pop('continuous'),
+             'feedback_offset': feedback_offset}
+    return dict(data, y_train=y_train, y_test=y_test, state=state)
+
+
+def train(dataset_path=None, model_dir=None, feedback_path=None, learning_rate=None,
+          iterations=None, lambda_=0.009, solver='gd', initial_weights=None, cost_every=1,
+          cache=True, cache_dir=None, chunk_size=None, precision=None, save=True, verbose=True,
+          **solver_options):
+    """Run the full pipeline and (optionally) save the model main.py loads.
+
+    solver is one of solvers.SOLVERS; the default 'gd' with lambda_ > 0 is
+    the notebook's L1 gradient descent. initial_weights warm-starts the
+    solver (ignored if it doesn't match the number of principal components).
+    learning_rate and iterations of None use the solver's own defaults.
+    chunk_size switches to the out-of-core preprocessing of out_of_core.py,
+    which reads that many rows at a time instead of the whole dataset.
+    precision ('float64' or 'float32', default MODEL_PRECISION) is the float
+    type of the solver and the compiled artifact; the pickled model keeps
+    float64 arrays either way.
+
+    Returns a dict with the model dict, its compiled form, the holdout
+    accuracy and full evaluation report (see evaluation.py), the training
+    state save_model() needs and the wall time of every stage in seconds.
+    """
+    timings = {}
+    if chunk_size:
+        from out_of_core import prepare_data_chunked  # imports this module
+        data = prepare_data_chunked(dataset_path, feedback_path, timings, chunk_size=chunk_size,
+                                    cache=cache, cache_dir=cache_dir)
+    else:
+        data = prepare_data(dataset_path, feedback_path, timings, cache=cache, cache_dir=cache_dir)
+    principal_components_train, y_train = data['X_train'], data['y_train']
+    principal_components_test, y_test = data['X_test'], data['y_test']
+    train_mean, train_std = data['mean'], data['std']
+    eigenvalues, eigenvectors, n_components = data['eigenvalues'], data['eigenvectors'], data['n_components']
+    stage = functools.partial(_record_stage, timings)
+    precision = precision or MODEL_PRECISION
+
+    t = time.perf_counter()
+    if initial_weights is not None and np.size(initial_weights) != n_components + 1:
+        initial_weights = None
+    weights, cost_history = fit_logistic(principal_components_train, y_train, solver=solver,
+                                         weights=initial_weights, learning_rate=learning_rate,
+                                         iterations=iterations, lambda_=lambda_, cost_every=cost_every,
+                                         dtype=np.dtype(precision), **solver_options)
+    weights = weights.astype(np.float64)
+    t = stage('solve', t)
+
+    X_test_bias = np.c_[np.ones((principal_components_test.shape[0], 1)), principal_components_test]
+    evaluation = evaluate_probabilities(sigmoid(X_test_bias @ weights), y_test)
+    accuracy = evaluation['accuracy'] * 100
+    t = stage('evaluate', t)
+
+    model = {
         'weights': weights,
-        'mean': train_mean.values,  # Save as numpy array
-        'std': train_std.values,    # Save as numpy array
-        'eigenvectors': eigenvectors[:len(numerical_features), :n_components],  # Correct dimensions
+        'mean': train_mean,
+        'std': train_std,
+        'eigenvectors': eigenvectors,
         'n_components': n_components,
-        'feature_names': numerical_features_api,  # API-compatible names
+        'feature_names': FEATURE_NAMES,  # API-compatible names
         'original_feature_names': numerical_features  # Original names from dataset
-    }, f)
-print("✅ Model saved to:", model_path)
\ No newline at end of file
+    }
+    compiled = compile_model(model, precision)
+    model_path = None
+    if save:
+        model_path, compiled = save_model(model, model_dir or DEFAULT_MODEL_DIR, data['state'], precision)
+        t = stage('save', t)
+
+    if verbose:
+        for name, count in data['outlier_counts'].items():
+            print(f"Outliers imputed in {name}: {count}")
+        print("Explained Variance Ratio (Training Data):", (eigenvalues / np.sum(eigenvalues))[:n_components])
+        print("Number of Principal Components:", n_components)
+        print(f"Accuracy: {accuracy:.2f}%")
+        print(f"ROC-AUC: {evaluation['roc_auc']:.4f}  Log-loss: {evaluation['log_loss']:.4f}  "
+              f"Calibration error: {evaluation['expected_calibration_error']:.4f}")
+        for name, seconds in timings.items():
+            print(f"  {name:<10} {seconds * 1000:9.2f} ms")
+        if model_path:
+            print("✅ Model saved to:", model_path)
+
+    return {
+        'model': model,
+        'compiled': compiled,
+        'accuracy': accuracy,
+        'evaluation': evaluation,
+        'cost_history': cost_history,
+        'timings': timings,
+        'state': data['state'],
+        'model_path': model_path
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the liver disease logistic model")
+    parser.add_argument('--dataset-path', default=None, help="folder containing the LPD training csv")
+    parser.add_argument('--model-dir', default=None, help="where to write logistic_model.pkl")
+    parser.add_argument('--feedback-path', default=None, help="feedback csv written by the backend")
+    parser.add_argument('--learning-rate', type=float, default=None, help="default depends on the solver")
+    parser.add_argument('--iterations', type=int, default=None, help="default depends on the solver")
+    parser.add_argument('--lambda', dest='lambda_', type=float, default=0.009)
+    parser.add_argument('--solver', choices=sorted(SOLVERS), default='gd')
+    parser.add_argument('--no-cache', dest='cache', action='store_false',
+                        help="parse the csv instead of using the columnar dataset cache")
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help="preprocess this many rows at a time, for datasets larger than memory")
+    parser.add_argument('--precision', choices=['float32', 'float64'], default=None,
+                        help="float type of the solver and the compiled model (default: MODEL_PRECISION)")
+    args = parser.parse_args(argv)
+    train(dataset_path=args.dataset_path, model_dir=args.model_dir, feedback_path=args.feedback_path,
+          learning_rate=args.learning_rate, iterations=args.iterations, lambda_=args.lambda_,
+          solver=args.solver, cache=args.cache, chunk_size=args.chunk_size, precision=args.precision)
+
+
+if __name__ == '__main__':
+    main()
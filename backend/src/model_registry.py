@@ -0,0 +1,115 @@
+import asyncio
+import os
+import threading
+
+from prometheus_client import Gauge
+
+MODEL_VERSION = Gauge(
+    'app_model_version',
+    'Version of the model currently serving predictions',
+    # One sample per worker (pid label) in multiprocess mode, so a lagging worker shows up
+    multiprocess_mode='liveall'
+)
+
+
+class ModelRef:
+    """Double-buffered, versioned reference to the serving model.
+
+    Readers call get() once per request and use the (version, model) pair
+    they got back; publish() swaps in a new pair with a single assignment,
+    so readers never need a lock and never see a half-updated model. The
+    previously published pair is kept so a bad model can be rolled back.
+    """
+
+    def __init__(self, model, version=1):
+        self._current = (version, model)
+        self._previous = None
+        self._publish_lock = threading.Lock()
+        MODEL_VERSION.set(version)
+
+    def get(self):
+        return self._current
+
+    @property
+    def version(self):
+        return self._current[0]
+
+    def publish(self, model):
+        """Make model the serving model, returns its version"""
+        with self._publish_lock:
+            version = self._current[0] + 1
+            self._previous = self._current
+            self._current = (version, model)
+        MODEL_VERSION.set(version)
+        return version
+
+    def rollback(self):
+        """Serve the previously published model again (under a new version number)"""
+        with self._publish_lock:
+            if self._previous is None:
+                raise ValueError("No previous model to roll back to")
+            model = self._previous[1]
+        return self.publish(model)
+
+
+class ModelFileWatcher:
+    """Publishes the model artifact at path into model_ref whenever the file is replaced.
+
+    Used when several worker processes serve the same model: the trainer
+    replaces the artifact atomically and every worker picks it up within
+    interval seconds. Files are compared by (inode, mtime, size), so an
+    os.replace() always counts as a change.
+    """
+
+    def __init__(self, model_ref, path, loader, interval=2.0):
+        self.model_ref = model_ref
+        self.path = path
+        self.loader = loader
+        self.interval = interval
+        self._signature = self._stat()
+        self._task = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def check(self):
+        """Load and publish the artifact if it changed, returns the new version or None"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return None
+        model = self.loader(self.path)
+        self._signature = signature
+        version = self.model_ref.publish(model)
+        print(f"Loaded model artifact {self.path} (version {version})")
+        return version
+
+    def publish(self, model):
+        """Retrainer hook: the trainer already wrote the artifact, so serve it from disk
+        like every other worker does instead of publishing the in-memory copy"""
+        return self.check() or self.model_ref.version
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                # A half-written or corrupt artifact: keep serving the current model and retry
+                print(f"Error loading model artifact {self.path}: {str(e)}")
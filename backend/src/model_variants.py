@@ -0,0 +1,184 @@
+"""Several models served side by side: weighted A/B routing and shadow scoring.
+
+    MODEL_VARIANTS  extra models as name=path pairs, e.g. 'candidate=../models/candidate.pkl'
+                    (the compiled .bin next to the pickle is used when it is up to date)
+    MODEL_TRAFFIC   share of the served traffic per model, e.g. 'primary=90,candidate=10';
+                    by default everything goes to 'primary', the model main.py retrains.
+                    Loaded models without a share are shadows: scored, never returned.
+
+A request with an X-Routing-Key header (a patient or session id) is routed
+by a hash of the key, so the same key always gets the same model; without
+one the model is drawn at random by weight.
+
+Every model is an affine map of the same 10 raw features (see
+inference.compile_model), so their coefficient vectors are stacked into
+one (M, 10) matrix and all M probabilities come out of a single einsum,
+which sums every row like predict_proba_compiled: a model's column is
+bit-identical to scoring it alone, whatever the batch size. A shadow
+costs one more column, not another model call. How far the other models
+agree with the served one is recorded after the response has been sent
+(a background task), so it adds no latency either.
+
+The primary model's version counts its retrains (ModelRef); an extra
+model's version is a hash of its compiled coefficients (artifact_version),
+exported with its name in app_model_variant_info.
+"""
+
+import hashlib
+import random
+import time
+
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+from inference import load_serving_model
+
+PRIMARY = 'primary'
+
+MODEL_AGREEMENT = Counter(
+    'app_model_agreement',
+    'Rows on which a model predicted the same class as the served model (agree) or not (disagree)',
+    ['model', 'served', 'outcome']
+)
+
+MODEL_SCORE_DIFFERENCE = Histogram(
+    'app_model_score_difference',
+    'Mean absolute probability difference between a model and the served model, per request',
+    ['model', 'served'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+
+MODEL_SERVED_LATENCY = Histogram(
+    'app_model_served_latency_seconds',
+    'Request latency by the model that served the response',
+    ['model'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+
+MODEL_VARIANT_INFO = Gauge(
+    'app_model_variant_info',
+    'Version (hash of the compiled coefficients) of each extra model, always 1',
+    ['model', 'version'],
+    multiprocess_mode='liveall'
+)
+
+MODEL_STACK_SIZE = Gauge(
+    'app_model_stack_size',
+    'Models scored together on every request (served and shadow)',
+    multiprocess_mode='liveall'
+)
+
+
+def parse_pairs(text):
+    """'a=1,b=2' -> {'a': '1', 'b': '2'}"""
+    pairs = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, sep, value = item.partition('=')
+        if not sep or not name.strip():
+            raise ValueError(f"Expected name=value, got {item!r}")
+        pairs[name.strip()] = value.strip()
+    return pairs
+
+
+def artifact_version(compiled):
+    """Short hash of a compiled model's coefficients and intercept, the version of an extra model"""
+    digest = hashlib.blake2b(digest_size=6)
+    digest.update(np.ascontiguousarray(compiled['coef']).tobytes())
+    digest.update(np.asarray(compiled['intercept'], dtype=compiled['coef'].dtype).tobytes())
+    return digest.hexdigest()
+
+
+class ModelVariants:
+    """The primary model (a ModelRef, so retrains are picked up) plus fixed extra models.
+
+    traffic maps model names to routing weights; names missing from it
+    are shadows.
+    """
+
+    def __init__(self, model_ref, variants, traffic=None):
+        if PRIMARY in variants:
+            raise ValueError(f"{PRIMARY!r} is the retrained model, give the variant another name")
+        self.model_ref = model_ref
+        self.names = [PRIMARY] + list(variants)
+        self.variants = list(variants.values())
+        # The same artifact gets the same version in every worker and after restarts
+        self.variant_versions = [artifact_version(m) for m in self.variants]
+        for name, version in zip(variants, self.variant_versions):
+            MODEL_VARIANT_INFO.labels(name, version).set(1)
+        traffic = {PRIMARY: 1.0} if not traffic else {name: float(w) for name, w in traffic.items()}
+        unknown = set(traffic) - set(self.names)
+        if unknown:
+            raise ValueError(f"MODEL_TRAFFIC names unknown models: {sorted(unknown)}")
+        weights = np.array([traffic.get(name, 0.0) for name in self.names])
+        if (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError("MODEL_TRAFFIC weights must be non-negative with a positive total")
+        self.weights = weights / weights.sum()
+        self._cumulative = np.cumsum(self.weights)
+        self._last_served = int(np.flatnonzero(self.weights)[-1])
+        self._stack = None
+        MODEL_STACK_SIZE.set(len(self.names))
+
+    @classmethod
+    def from_env(cls, model_ref, variants_spec, traffic_spec=''):
+        variants = {name: load_serving_model(path) for name, path in parse_pairs(variants_spec).items()}
+        return cls(model_ref, variants, parse_pairs(traffic_spec))
+
+    @property
+    def shadows(self):
+        return [name for name, weight in zip(self.names, self.weights) if weight == 0]
+
+    def stack(self):
+        """(primary version, coef (M, 10), intercepts (M,)), rebuilt when a new primary is published"""
+        version, model = self.model_ref.get()
+        stack = self._stack
+        if stack is None or stack[0] != version:
+            dtype = model['coef'].dtype
+            models = [model] + self.variants
+            # One contiguous row per model: einsum then sums each row in predict_proba_compiled's order
+            coef = np.stack([np.asarray(m['coef'], dtype=dtype) for m in models])
+            intercepts = np.array([m['intercept'] for m in models], dtype=dtype)
+            # Swapped in with one assignment, like ModelRef, so readers need no lock
+            stack = self._stack = (version, coef, intercepts)
+        return stack
+
+    def versions(self, primary_version):
+        # Extra models are fixed for the life of the process
+        return [primary_version] + self.variant_versions
+
+    def score(self, X, timer=None):
+        """(primary version, (n, M) probabilities of every model) in one matrix product"""
+        version, coef, intercepts = self.stack()
+        X = np.ascontiguousarray(X, dtype=coef.dtype).reshape(-1, coef.shape[1])
+        logits = np.einsum('ij,kj->ik', X, coef) + intercepts
+        if timer is not None:
+            timer.lap('affine')
+        probabilities = 1 / (1 + np.exp(-logits))
+        if timer is not None:
+            timer.lap('sigmoid')
+        return version, probabilities
+
+    def route(self, key=None):
+        """Column of the model that serves this request"""
+        if key is None:
+            u = random.random()
+        else:
+            u = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big') / 2.0 ** 64
+        return min(int(np.searchsorted(self._cumulative, u, side='right')), self._last_served)
+
+    def record(self, served, probabilities, start_ns=None):
+        """Export agreement with the served model and the request latency (run after the response)"""
+        served_name = self.names[served]
+        if start_ns is not None:
+            MODEL_SERVED_LATENCY.labels(served_name).observe((time.perf_counter_ns() - start_ns) / 1e9)
+        if len(probabilities) == 0:
+            return
+        served_probability = probabilities[:, served]
+        served_class = served_probability >= 0.5
+        for j, name in enumerate(self.names):
+            if j == served:
+                continue
+            agree = int(np.count_nonzero((probabilities[:, j] >= 0.5) == served_class))
+            MODEL_AGREEMENT.labels(name, served_name, 'agree').inc(agree)
+            MODEL_AGREEMENT.labels(name, served_name, 'disagree').inc(len(probabilities) - agree)
+            difference = float(np.mean(np.abs(probabilities[:, j] - served_probability)))
+            MODEL_SCORE_DIFFERENCE.labels(name, served_name).observe(difference)
@@ -0,0 +1,103 @@
+"""Incremental model updates from new feedback rows.
+
+A full train() saves the running mean/covariance of the training data next
+to the model (logistic_model.stats.npz). An online update folds only the
+new feedback rows into those statistics, recomputes the scaler and PCA
+basis from them, carries the current model over into the new basis and
+takes a few SGD passes over the new rows. The cost is proportional to the
+number of new rows, not to the size of the dataset.
+"""
+
+import os
+import pickle
+import time
+
+import numpy as np
+
+from inference import FEATURE_NAMES, compile_model
+from ml_final_project import (impute_outliers_with_median, load_feedback, pca_from_covariance,
+                              save_model, zscore_scaling)
+from running_stats import load_training_state, stats_path_for
+from solvers import fit_logistic
+
+
+def warm_start_weights(model, mean, std, eigenvectors):
+    """Weights in a new scaler/PCA basis that reproduce the current model as closely as possible.
+
+    The current model is logit = intercept + x @ coef; in the new basis we
+    need eigenvectors @ w = coef * std and w0 = intercept + mean @ coef.
+    """
+    compiled = compile_model(model, 'float64')
+    coef = compiled['coef']
+    weights = eigenvectors.T @ (coef * std)
+    bias = compiled['intercept'] + mean @ coef
+    return np.r_[bias, weights].reshape(-1, 1)
+
+
+def online_update(model, state, X_new, y_new, learning_rate=0.05, epochs=5, lambda_=0.009, batch_size=256,
+                  timings=None):
+    """Fold new rows into the running statistics and return the updated model dict.
+
+    state is the dict from running_stats.load_training_state and is updated in place.
+    Stage wall times are added to timings (a dict) when one is given.
+    """
+    timings = {} if timings is None else timings
+    t = time.perf_counter()
+    X_new = np.array(X_new, dtype=np.float64)
+    continuous = state['continuous']
+    # Impute with the bounds of the original training data
+    X_new[:, continuous] = impute_outliers_with_median(X_new[:, continuous], state['bounds'])
+    timings['impute'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    stats = state['stats']
+    stats.update(X_new)
+    mean, std = stats.mean, stats.std
+    timings['scale'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    # Covariance of the z-scored data, same matrix train() builds from the full dataset
+    _, eigenvectors, n_components = pca_from_covariance(stats.covariance / np.outer(std, std))
+    eigenvectors = eigenvectors[:, :n_components]
+    timings['eig'] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    weights = warm_start_weights(model, mean, std, eigenvectors)
+    principal_components = zscore_scaling(X_new, mean, std) @ eigenvectors
+    weights, _ = fit_logistic(principal_components, y_new, solver='sgd', weights=weights,
+                              learning_rate=learning_rate, iterations=epochs, lambda_=lambda_,
+                              batch_size=batch_size, cost_every=0)
+    timings['solve'] = time.perf_counter() - t
+
+    return dict(model, weights=weights, mean=mean, std=std, eigenvectors=eigenvectors,
+                n_components=n_components, feature_names=FEATURE_NAMES)
+
+
+def update_from_feedback(feedback_path, model_path, timings=None, gate=None, **options):
+    """Trainer-process job: apply feedback appended since the last update and save the model.
+
+    Returns the compiled model, or None when there is no new feedback.
+    Raises if the model was never fully trained (no saved statistics).
+    gate(model) is called with the updated model dict before it is saved
+    and can raise to keep the current model.
+    """
+    timings = {} if timings is None else timings
+    t = time.perf_counter()
+    stats_path = stats_path_for(model_path)
+    if not os.path.isfile(stats_path):
+        raise ValueError(f"No training statistics at {stats_path}, run a full train first")
+    state = load_training_state(stats_path)
+
+    X_new, y_new, feedback_offset = load_feedback(feedback_path, state['feedback_offset'])
+    if len(X_new) == 0:
+        return None
+
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+    timings['load'] = time.perf_counter() - t
+    model = online_update(model, state, X_new, y_new, timings=timings, **options)
+    if gate is not None:
+        gate(model)
+    state['feedback_offset'] = feedback_offset
+    _, compiled = save_model(model, os.path.dirname(model_path), state)
+    return compiled
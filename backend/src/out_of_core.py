@@ -0,0 +1,290 @@
+"""Out-of-core preprocessing: the prepare_data() pipeline over fixed-size chunks.
+
+Memory use is bounded by one chunk of rows plus a few per-column
+summaries, whatever the size of the dataset:
+
+    pass 1  count the rows (for the 80/20 split) and take per-column min/max
+    pass 2  histogram every continuous training column
+    pass 3  keep the values of the histogram bins holding the needed order
+            statistics, which gives exact quartiles and medians
+    pass 4  impute outliers and fold each chunk into RunningStats (mean, covariance)
+            symmetric eigensolver on the covariance of the z-scored data
+    pass 5  impute, scale and project each chunk into .npy memory maps
+
+The result has the same keys as prepare_data() and matches it on the same
+data; X_train, X_test, y_train and y_test are read-only memory maps.
+"""
+
+import functools
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from inference import FEATURE_NAMES
+from ml_final_project import (CATEGORICAL_FEATURES, DATASET_FILE, DEFAULT_DATASET_PATH, _from_columns,
+                              _record_stage, feedback_end_offset, iter_dataset_csv, iter_feedback,
+                              open_dataset_store, pca_from_covariance, zscore_scaling)
+from running_stats import RunningStats
+
+DEFAULT_CHUNK_SIZE = 65536
+
+
+class ChunkSource:
+    """Re-iterable stream of (part, X, y) chunks.
+
+    The first split_ratio of the dataset rows are 'train' and the rest
+    'test', as in train_test_split; every feedback row is 'train'. count()
+    or count_rows() must run before the first iteration.
+    """
+
+    def __init__(self, dataset_chunks, feedback_chunks, feedback_offset=0, split_ratio=0.8):
+        self.dataset_chunks = dataset_chunks
+        self.feedback_chunks = feedback_chunks
+        self.feedback_offset = feedback_offset
+        self.split_ratio = split_ratio
+        self.n_rows = None
+        self.n_feedback = None
+
+    def count_rows(self):
+        self.n_rows = self.n_feedback = 0
+        for X, _ in self.dataset_chunks():
+            self.n_rows += len(X)
+        for X, _ in self.feedback_chunks():
+            self.n_feedback += len(X)
+
+    def count(self):
+        """Pass 1: row counts plus the min and max of every column of the training part"""
+        self.count_rows()
+        n_features = len(FEATURE_NAMES)
+        lower, upper = np.full(n_features, np.inf), np.full(n_features, -np.inf)
+        for part, X, _ in self:
+            if part == 'train' and len(X):
+                lower = np.minimum(lower, X.min(axis=0))
+                upper = np.maximum(upper, X.max(axis=0))
+        return lower, upper
+
+    @property
+    def n_train(self):
+        return int(self.n_rows * self.split_ratio) + self.n_feedback
+
+    @property
+    def n_test(self):
+        return self.n_rows - int(self.n_rows * self.split_ratio)
+
+    def __iter__(self):
+        split_index = int(self.n_rows * self.split_ratio)
+        seen = 0
+        for X, y in self.dataset_chunks():
+            k = min(max(split_index - seen, 0), len(X))
+            if k:
+                yield 'train', X[:k], y[:k]
+            if k < len(X):
+                yield 'test', X[k:], y[k:]
+            seen += len(X)
+        for X, y in self.feedback_chunks():
+            if len(X):
+                yield 'train', X, y
+
+
+def chunk_source(dataset_path=None, feedback_path=None, chunk_size=DEFAULT_CHUNK_SIZE, cache=True, cache_dir=None):
+    """ChunkSource over the columnar store (cache) or straight over the csv files"""
+    if cache:
+        store = open_dataset_store(dataset_path, feedback_path, cache_dir)
+        return ChunkSource(
+            lambda: (_from_columns(columns) for columns in store.iter_chunks('base', chunk_size)),
+            lambda: (_from_columns(columns) for columns in store.iter_chunks('feedback', chunk_size)),
+            store.feedback_offset
+        )
+    csv_path = os.path.join(dataset_path or DEFAULT_DATASET_PATH, DATASET_FILE)
+    # Fixed once, so every pass sees the same feedback rows even if more are appended meanwhile
+    end_offset = feedback_end_offset(feedback_path)
+    return ChunkSource(
+        lambda: iter_dataset_csv(csv_path, chunk_size),
+        lambda: iter_feedback(feedback_path, 0, end_offset, chunk_size),
+        end_offset
+    )
+
+
+class OrderStatistics:
+    """Exact k-th smallest values of every column of a stream, in two passes.
+
+    Pass 1 (add_to_histogram) counts the values per bin between lower and
+    upper; pass 2 (add_candidates) keeps only the distinct values, with
+    their counts, of the bins that contain one of the requested ranks.
+    Memory is bins per column plus the distinct values of those few bins.
+    """
+
+    def __init__(self, lower, upper, ranks, bins=4096):
+        self.lower = np.asarray(lower, dtype=np.float64)
+        self.width = np.where(upper > lower, np.asarray(upper) - self.lower, 1.0)
+        self.ranks = sorted(set(ranks))
+        self.bins = bins
+        self.counts = np.zeros((len(self.lower), bins), dtype=np.int64)
+        self._targets = None
+        self._candidates = None
+
+    def _bin(self, X):
+        return np.clip(((X - self.lower) / self.width * self.bins).astype(np.int64), 0, self.bins - 1)
+
+    def add_to_histogram(self, X):
+        b = self._bin(X)
+        for j in range(b.shape[1]):
+            self.counts[j] += np.bincount(b[:, j], minlength=self.bins)
+
+    def _select_bins(self):
+        # (column, rank) -> (bin holding that rank, number of values in lower bins)
+        cumulative = np.cumsum(self.counts, axis=1)
+        self._targets = {}
+        for j in range(len(self.counts)):
+            for rank in self.ranks:
+                b = int(np.searchsorted(cumulative[j], rank + 1))
+                self._targets[j, rank] = (b, int(cumulative[j, b] - self.counts[j, b]))
+        self._candidates = {(j, b): (np.empty(0), np.empty(0, dtype=np.int64))
+                            for j, b in {(j, b) for (j, _), (b, _) in self._targets.items()}}
+
+    def add_candidates(self, X):
+        if self._targets is None:
+            self._select_bins()
+        b = self._bin(X)
+        for (j, target), (values, counts) in self._candidates.items():
+            new = X[b[:, j] == target, j]
+            if len(new):
+                merged, inverse = np.unique(np.concatenate([values, new]), return_inverse=True)
+                weights = np.concatenate([counts, np.ones(len(new), dtype=np.int64)])
+                self._candidates[j, target] = merged, np.bincount(inverse, weights=weights).astype(np.int64)
+
+    def value(self, rank):
+        """Per-column value of the given 0-based rank"""
+        if self._targets is None:
+            self._select_bins()
+        result = np.empty(len(self.counts))
+        for j in range(len(self.counts)):
+            b, below = self._targets[j, rank]
+            values, counts = self._candidates[j, b]
+            result[j] = values[np.searchsorted(np.cumsum(counts), rank - below + 1)]
+        return result
+
+
+def _lerp(a, b, t):
+    # Same interpolation as np.percentile's default 'linear' method
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+def _quartile_ranks(n):
+    """0-based ranks needed by outlier_bounds() and find_outliers_iqr() for n rows"""
+    # outlier_bounds() indexes sorted[(n + 1) // 4 - 1], which wraps around to the maximum for n < 3
+    quartiles = [((n + 1) // 4 - 1) % n, (3 * (n + 1) // 4 - 1) % n]
+    median = [n // 2 - 1, n // 2] if n % 2 == 0 else [n // 2]
+    percentile = [int(np.floor(q * (n - 1))) for q in (0.25, 0.75)] + [int(np.ceil(q * (n - 1))) for q in (0.25, 0.75)]
+    return quartiles + median + percentile
+
+
+def _bounds(order, n):
+    """(imputation bounds as outlier_bounds() returns them, outlier detection bounds of find_outliers_iqr())"""
+    q1_rank, q3_rank = _quartile_ranks(n)[:2]
+    q1, q3 = order.value(q1_rank), order.value(q3_rank)
+    if n % 2 == 0:
+        median = (order.value(n // 2 - 1) + order.value(n // 2)) / 2
+    else:
+        median = order.value(n // 2)
+    iqr = q3 - q1
+
+    percentiles = []
+    for q in (0.25, 0.75):
+        position = q * (n - 1)
+        low, high = int(np.floor(position)), int(np.ceil(position))
+        percentiles.append(_lerp(order.value(low), order.value(high), position - low))
+    p25, p75 = percentiles
+    return (q1 - 1.5 * iqr, q3 + 1.5 * iqr, median), (p25 - 1.5 * (p75 - p25), p75 + 1.5 * (p75 - p25))
+
+
+def prepare_data_chunked(dataset_path=None, feedback_path=None, timings=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                         cache=True, cache_dir=None, work_dir=None):
+    """prepare_data() in chunks of chunk_size rows (see the module docstring).
+
+    The projected matrices are written under work_dir; with the default
+    None a temporary directory is used and removed right away (the memory
+    maps stay valid until the arrays are released).
+    """
+    timings = {} if timings is None else timings
+    stage = functools.partial(_record_stage, timings)
+    continuous = [i for i, name in enumerate(FEATURE_NAMES) if name not in CATEGORICAL_FEATURES]
+
+    t = time.perf_counter()
+    source = chunk_source(dataset_path, feedback_path, chunk_size, cache, cache_dir)
+    lower, upper = source.count()
+    n_train = source.n_train
+    t = stage('load', t)
+
+    order = OrderStatistics(lower[continuous], upper[continuous], _quartile_ranks(n_train))
+    for part, X, _ in source:
+        if part == 'train':
+            order.add_to_histogram(X[:, continuous])
+    for part, X, _ in source:
+        if part == 'train':
+            order.add_candidates(X[:, continuous])
+    bounds, outlier_limits = _bounds(order, n_train)
+    t = stage('impute', t)
+
+    stats = RunningStats(len(FEATURE_NAMES))
+    outlier_counts = np.zeros(len(continuous), dtype=np.int64)
+    for part, X, _ in source:
+        if part == 'train':
+            X = _impute(X, continuous, bounds, outlier_limits, outlier_counts)
+            stats.update(X)
+    mean, std = stats.mean, stats.std
+    t = stage('scale', t)
+
+    # Covariance of the z-scored data, the matrix prepare_data() builds from the full dataset
+    eigenvalues, eigenvectors, n_components = pca_from_covariance(stats.covariance / np.outer(std, std))
+    eigenvectors = eigenvectors[:, :n_components]
+    t = stage('eig', t)
+
+    temporary = work_dir is None
+    work_dir = tempfile.mkdtemp(prefix='lpd_chunks_') if temporary else work_dir
+    os.makedirs(work_dir, exist_ok=True)
+    shapes = {'X_train': (n_train, n_components), 'y_train': (n_train,),
+              'X_test': (source.n_test, n_components), 'y_test': (source.n_test,)}
+    outputs = {name: np.lib.format.open_memmap(os.path.join(work_dir, f'{name}.npy'), mode='w+',
+                                               dtype=np.float64, shape=shape)
+               for name, shape in shapes.items()}
+    positions = {'train': 0, 'test': 0}
+    for part, X, y in source:
+        if part == 'train':
+            X = _impute(X, continuous, bounds)
+        start, stop = positions[part], positions[part] + len(X)
+        outputs[f'X_{part}'][start:stop] = zscore_scaling(X, mean, std) @ eigenvectors
+        outputs[f'y_{part}'][start:stop] = y
+        positions[part] = stop
+    for array in outputs.values():
+        array.flush()
+    data = {name: np.load(os.path.join(work_dir, f'{name}.npy'), mmap_mode='r') for name in shapes}
+    if temporary:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    stage('project', t)
+
+    data.update({
+        'mean': mean,
+        'std': std,
+        'eigenvalues': eigenvalues,
+        'eigenvectors': eigenvectors,
+        'n_components': n_components,
+        'outlier_counts': dict(zip([FEATURE_NAMES[i] for i in continuous], outlier_counts.tolist())),
+        'state': {'stats': stats, 'bounds': bounds, 'continuous': continuous,
+                  'feedback_offset': source.feedback_offset}
+    })
+    return data
+
+
+def _impute(X, continuous, bounds, outlier_limits=None, outlier_counts=None):
+    X = np.array(X, dtype=np.float64)
+    values = X[:, continuous]
+    if outlier_counts is not None:
+        outlier_counts += ((values < outlier_limits[0]) | (values > outlier_limits[1])).sum(axis=0)
+    lower_bound, upper_bound, median = bounds
+    X[:, continuous] = np.where((values >= lower_bound) & (values <= upper_bound), values, median)
+    return X
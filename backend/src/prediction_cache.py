@@ -0,0 +1,111 @@
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+PREDICTION_CACHE_HITS = Counter(
+    'app_prediction_cache_hits_total',
+    'Predictions served from the prediction cache'
+)
+
+PREDICTION_CACHE_MISSES = Counter(
+    'app_prediction_cache_misses_total',
+    'Predictions not found in the prediction cache (including expired entries)'
+)
+
+PREDICTION_CACHE_EVICTIONS = Counter(
+    'app_prediction_cache_evictions_total',
+    'Prediction cache entries evicted to stay within the size limit'
+)
+
+PREDICTION_CACHE_MEMORY = Gauge(
+    'app_prediction_cache_memory_bytes',
+    'Approximate memory used by prediction cache entries',
+    multiprocess_mode='livesum'
+)
+
+PREDICTION_CACHE_ENTRIES = Gauge(
+    'app_prediction_cache_entries',
+    'Entries currently held in the prediction cache',
+    multiprocess_mode='livesum'
+)
+
+
+class PredictionCache:
+    """Bounded LRU cache of probabilities keyed on the feature vector and model version.
+
+    Entries belong to one model version: the first lookup with a newer
+    version drops everything, so a published model never serves a stale
+    score. ttl (seconds) optionally expires entries as well.
+    """
+
+    def __init__(self, maxsize=10000, ttl=None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = None
+        self._entries = OrderedDict()
+        self._entry_size = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(row):
+        # float64 bytes of the row; adding 0.0 folds -0.0 into 0.0 so equal panels share a key
+        return (np.asarray(row, dtype=np.float64) + 0.0).tobytes()
+
+    def get(self, version, key):
+        """Cached probability or None"""
+        self._check_version(version)
+        entry = self._entries.get(key)
+        if entry is None:
+            PREDICTION_CACHE_MISSES.inc()
+            return None
+        probability, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self._update_gauges()
+            PREDICTION_CACHE_MISSES.inc()
+            return None
+        self._entries.move_to_end(key)
+        PREDICTION_CACHE_HITS.inc()
+        return probability
+
+    def put(self, version, key, probability):
+        self._check_version(version)
+        if version != self.version:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[key] = (probability, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            PREDICTION_CACHE_EVICTIONS.inc()
+        self._update_gauges()
+
+    def clear(self):
+        self._entries.clear()
+        self._update_gauges()
+
+    def memory_bytes(self):
+        if not self._entries:
+            return 0
+        if self._entry_size is None:
+            key, value = next(iter(self._entries.items()))
+            # key bytes + value tuple + its float, plus roughly 100 bytes of OrderedDict bookkeeping
+            self._entry_size = sys.getsizeof(key) + sys.getsizeof(value) + sys.getsizeof(value[0]) + 100
+        return len(self._entries) * self._entry_size + sys.getsizeof(self._entries)
+
+    def _check_version(self, version):
+        # Only ever move forward, a late put from an older model must not wipe the new entries
+        if self.version is None or version > self.version:
+            self.version = version
+            self.clear()
+
+    def _update_gauges(self):
+        PREDICTION_CACHE_ENTRIES.set(len(self._entries))
+        PREDICTION_CACHE_MEMORY.set(self.memory_bytes())
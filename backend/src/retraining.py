@@ -0,0 +1,206 @@
+import asyncio
+import contextlib
+import fcntl
+import os
+import pickle
+import time
+
+from prometheus_client import Counter, Histogram
+
+from evaluation import ModelRejected, observe_evaluation
+from instrumentation import observe_training_stages
+
+# Solver used by the trainer process (see solvers.SOLVERS)
+RETRAIN_SOLVER = os.getenv('RETRAIN_SOLVER', 'proximal_l1')
+
+# A retrained model is only published if it is no worse than the serving one on the
+# holdout set by this metric (see evaluation.GATE_METRICS, empty disables the gate)
+RETRAIN_GATE_METRIC = os.getenv('RETRAIN_GATE_METRIC', 'roc_auc')
+RETRAIN_GATE_TOLERANCE = float(os.getenv('RETRAIN_GATE_TOLERANCE', '0.005'))
+
+# Niceness added to the trainer process, so a retrain gets the CPU /predict leaves free
+RETRAIN_NICE = int(os.getenv('RETRAIN_NICE', '10'))
+
+RETRAIN_DURATION = Histogram(
+    'app_retrain_duration_seconds',
+    'Wall time of a retraining run in the trainer process',
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+
+RETRAIN_RUNS = Counter(
+    'app_retrain_runs_total',
+    'Retraining runs by outcome',
+    ['outcome']
+)
+
+
+def lower_priority(increment):
+    """Trainer process initializer"""
+    if increment > 0 and hasattr(os, 'nice'):
+        os.nice(increment)
+
+
+@contextlib.contextmanager
+def model_lock(model_path):
+    """Exclusive lock so trainer processes of different workers never train the same model at once"""
+    with open(model_path + '.lock', 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield
+
+
+def gate_candidate(model, model_path, timings, reports):
+    """Evaluate the candidate model dict and the serving model on the holdout set.
+
+    Fills reports (name -> evaluation report) and timings['gate'], raises
+    ModelRejected when the candidate regresses on RETRAIN_GATE_METRIC.
+    """
+    from evaluation import check_gate, evaluate_models, holdout_chunks
+    from inference import compile_model, load_serving_model
+
+    if not RETRAIN_GATE_METRIC or not os.path.isfile(model_path):
+        return
+    start_time = time.perf_counter()
+    models = {'candidate': compile_model(model), 'current': load_serving_model(model_path)}
+    reports.update(evaluate_models(models, holdout_chunks()))
+    timings['gate'] = time.perf_counter() - start_time
+    check_gate(reports, RETRAIN_GATE_METRIC, RETRAIN_GATE_TOLERANCE)
+
+
+def retrain_from_feedback(feedback_path, model_path):
+    """Runs in the trainer process: retrain on the dataset plus feedback.
+
+    Returns (compiled model, stage timings, evaluation reports); raises
+    ModelRejected, without saving, if the gate refuses the new model.
+
+    The training code (and pandas) is imported here so the serving process never pays for it.
+    """
+    from ml_final_project import save_model, train
+
+    # Warm-start from the current weights with the converging L1 solver, skip per-iteration cost logging
+    reports = {}
+    with model_lock(model_path):
+        initial_weights = None
+        if os.path.isfile(model_path):
+            with open(model_path, "rb") as f:
+                initial_weights = pickle.load(f)['weights']
+        result = train(feedback_path=feedback_path, solver=RETRAIN_SOLVER, initial_weights=initial_weights,
+                       cost_every=0, save=False, verbose=False)
+        timings = result['timings']
+        gate_candidate(result['model'], model_path, timings, reports)
+        start_time = time.perf_counter()
+        _, compiled = save_model(result['model'], os.path.dirname(model_path), result['state'])
+        timings['save'] = time.perf_counter() - start_time
+    return compiled, timings, reports
+
+
+def update_from_feedback(feedback_path, model_path):
+    """Runs in the trainer process: fold only the new feedback rows into the current model (see online.py).
+
+    Returns (compiled model, stage timings, evaluation reports), or None when
+    there is no new feedback; raises ModelRejected like retrain_from_feedback.
+    """
+    import functools
+
+    import online
+
+    timings = {}
+    reports = {}
+    with model_lock(model_path):
+        gate = functools.partial(gate_candidate, model_path=model_path, timings=timings, reports=reports)
+        compiled = online.update_from_feedback(feedback_path, model_path, timings=timings, gate=gate)
+    return None if compiled is None else (compiled, timings, reports)
+
+
+# RETRAIN_MODE -> trainer job; 'online' needs the statistics saved by a full train
+RETRAIN_JOBS = {
+    'full': retrain_from_feedback,
+    'online': update_from_feedback,
+}
+
+
+class Retrainer:
+    """Runs a retraining job off the event loop and publishes the result.
+
+    At most one job runs at a time. Triggers that arrive while a job is
+    running are coalesced into a single follow-up run so the newest feedback
+    is always picked up. A failed job leaves the serving model untouched.
+
+    The job returns the new model, None when nothing changed, or a
+    (model, timings[, evaluation reports]) tuple whose stage timings and
+    reports are exported here (the trainer process has its own registry).
+    A job that raises ModelRejected leaves the serving model in place too.
+    """
+
+    def __init__(self, model_ref, job, args=(), executor=None):
+        self.model_ref = model_ref
+        self.job = job
+        self.args = args
+        self._executor = executor
+        self._task = None
+        self._pending = False
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def trigger(self):
+        """Schedule a retrain, returns False if one was already running (it will rerun once)"""
+        if self.running:
+            self._pending = True
+            return False
+        self._pending = False
+        self._task = asyncio.create_task(self._run())
+        return True
+
+    async def wait(self):
+        if self._task is not None:
+            await self._task
+
+    async def close(self):
+        self._pending = False
+        await self.wait()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            # Imported on first retrain, the serving path never needs them
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawn: the trainer must not inherit the server's event loop and threads
+            self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=lower_priority, initargs=(RETRAIN_NICE,))
+        return self._executor
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start_time = time.perf_counter()
+            try:
+                model = await loop.run_in_executor(self._get_executor(), self.job, *self.args)
+            except ModelRejected as e:
+                RETRAIN_RUNS.labels('rejected').inc()
+                observe_evaluation(e.reports)
+                print(f"Retrained model not published: {str(e)}")
+            except Exception as e:
+                RETRAIN_RUNS.labels('failed').inc()
+                print(f"Error retraining model: {str(e)}")
+            else:
+                if isinstance(model, tuple):
+                    model, timings, *reports = model
+                    observe_training_stages(self.job.__name__, timings)
+                    if reports:
+                        observe_evaluation(reports[0])
+                if model is None:
+                    RETRAIN_RUNS.labels('unchanged').inc()
+                else:
+                    version = self.model_ref.publish(model)
+                    RETRAIN_RUNS.labels('published').inc()
+                    print(f"Model successfully retrained with feedback data (version {version})")
+            finally:
+                RETRAIN_DURATION.observe(time.perf_counter() - start_time)
+            if not self._pending:
+                break
+            self._pending = False
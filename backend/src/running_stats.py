@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+
+
+class RunningStats:
+    """Running mean and covariance of a stream of rows.
+
+    Batches are folded in with the Welford / Chan et al. update, so the
+    result matches a full recompute over all rows seen without keeping any
+    of them, and the cost of update() only depends on the batch size.
+    """
+
+    def __init__(self, n_features):
+        self.count = 0
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros((n_features, n_features))
+
+    @classmethod
+    def from_array(cls, X):
+        stats = cls(np.shape(X)[1])
+        stats.update(X)
+        return stats
+
+    def update(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        n_batch = X.shape[0]
+        if n_batch == 0:
+            return
+        batch_mean = X.mean(axis=0)
+        centered = X - batch_mean
+        total = self.count + n_batch
+        delta = batch_mean - self.mean
+        self.m2 = self.m2 + centered.T @ centered + np.outer(delta, delta) * (self.count * n_batch / total)
+        self.mean = self.mean + delta * (n_batch / total)
+        self.count = total
+
+    def merge(self, other):
+        """Fold in another RunningStats (e.g. computed on a different chunk)"""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 = self.m2 + other.m2 + np.outer(delta, delta) * (self.count * other.count / total)
+        self.mean = self.mean + delta * (other.count / total)
+        self.count = total
+
+    @property
+    def covariance(self):
+        return self.m2 / (self.count - 1)
+
+    @property
+    def variance(self):
+        return np.diag(self.m2) / (self.count - 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+"""Training state saved next to the model artifact"""
+
+def stats_path_for(model_path):
+    return os.path.splitext(model_path)[0] + '.stats.npz'
+
+
+def save_training_state(path, stats, bounds, continuous, feedback_offset=0):
+    """Save the running statistics, outlier bounds and how much feedback has been consumed"""
+    lower_bound, upper_bound, median = bounds
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, count=stats.count, mean=stats.mean, m2=stats.m2, lower_bound=lower_bound,
+                 upper_bound=upper_bound, median=median, continuous=np.asarray(continuous),
+                 feedback_offset=feedback_offset)
+    os.replace(tmp_path, path)
+
+
+def load_training_state(path):
+    """Returns a dict with stats, bounds, continuous and feedback_offset"""
+    with np.load(path, allow_pickle=False) as data:
+        stats = RunningStats(len(data['mean']))
+        stats.count = int(data['count'])
+        stats.mean = data['mean']
+        stats.m2 = data['m2']
+        return {
+            'stats': stats,
+            'bounds': (data['lower_bound'], data['upper_bound'], data['median']),
+            'continuous': data['continuous'].tolist(),
+            'feedback_offset': int(data['feedback_offset'])
+        }
@@ -0,0 +1,72 @@
+"""Run the backend with one or more uvicorn worker processes.
+
+    python src/serve.py [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+WEB_CONCURRENCY sets the default worker count. With more than one worker:
+  - the compiled model artifact is (re)built once here, and every worker
+    memory-maps the same file, so the model arrays are shared through the
+    page cache instead of being unpickled per worker;
+  - workers poll the artifact (MODEL_RELOAD_INTERVAL, default 2s), so a
+    model retrained by any of them reaches all of them;
+  - Prometheus runs in multiprocess mode (PROMETHEUS_MULTIPROC_DIR, default
+    a fresh temporary directory) and /metrics or the metrics port of any
+    worker returns the aggregate of all workers.
+"""
+
+import argparse
+import os
+import pickle
+import shutil
+import tempfile
+
+import uvicorn
+
+from inference import check_equivalence, compile_model, compiled_path_for, load_current_compiled, save_compiled
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(current_dir, "../models/logistic_model.pkl")
+
+
+def build_compiled_artifact(model_path):
+    """Make sure the .bin next to model_path exists, is at least as new as the pickle and in MODEL_PRECISION"""
+    compiled_path = compiled_path_for(model_path)
+    if load_current_compiled(model_path) is not None:
+        return compiled_path
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    compiled = compile_model(model)
+    check_equivalence(model, compiled)
+    save_compiled(compiled, compiled_path)
+    return compiled_path
+
+
+def prepare_multiprocess_metrics():
+    """Point prometheus_client at an empty multiprocess directory, before any worker imports it"""
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        # Files left by a previous run would be added to this run's counters
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+    else:
+        directory = tempfile.mkdtemp(prefix='prometheus_multiproc_')
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = directory
+    return directory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', '1')))
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    if args.workers > 1:
+        build_compiled_artifact(MODEL_PATH)
+        os.environ.setdefault('MODEL_RELOAD_INTERVAL', '2')
+        prepare_multiprocess_metrics()
+
+    uvicorn.run('main:app', app_dir=current_dir, host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
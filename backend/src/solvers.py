@@ -0,0 +1,240 @@
+"""Logistic regression solvers.
+
+Every solver takes X with the bias column already added, y as an (m, 1)
+column and initial weights as a (d, 1) column (pass the current model's
+weights to warm-start), and returns (weights, cost_history).
+
+cost_every controls how often the cost is logged: every N iterations
+(epochs for SGD), or never when it is 0. tol enables early stopping once
+the largest weight update falls below it.
+"""
+
+import numpy as np
+
+
+def sigmoid(z):
+    return 1 / (1 + np.exp(-z))
+
+def compute_cost(X, y, weights):
+    m = len(y)
+    h = sigmoid(X @ weights)
+    epsilon = 1e-5
+    cost = -(1 / m) * (y.T @ np.log(h + epsilon) + (1 - y).T @ np.log(1 - h + epsilon))
+    return cost
+
+def compute_cost_l1(X, y, weights, lambda_):
+    return compute_cost(X, y, weights) + lambda_ * np.sum(np.abs(weights[1:]))
+
+def predict(X, weights):
+    probabilities = sigmoid(X @ weights)
+    return (probabilities >= 0.5).astype(int)
+
+
+def _should_log(cost_every, iteration):
+    return cost_every and (iteration + 1) % cost_every == 0
+
+
+"""Batch gradient descent (the original notebook solvers)"""
+
+def gradient_descent(X, y, weights, learning_rate, iterations, cost_every=1, tol=None):
+    m = len(y)
+    cost_history = []
+
+    for i in range(iterations):
+        predictions = sigmoid(X @ weights)
+        gradient = (1 / m) * X.T @ (predictions - y)
+        step = learning_rate * gradient
+        weights -= step
+        if _should_log(cost_every, i):
+            cost_history.append(compute_cost(X, y, weights))
+        if tol is not None and np.max(np.abs(step)) < tol:
+            break
+
+    return weights, cost_history
+
+def gradient_descent_l1(X, y, weights, learning_rate, iterations, lambda_, cost_every=1, tol=None):
+    m = len(y)
+    cost_history = []
+
+    for i in range(iterations):
+        predictions = sigmoid(X @ weights)
+        gradient = (1 / m) * X.T @ (predictions - y)
+        l1_gradient = lambda_ * np.sign(weights)
+        l1_gradient[0] = 0
+        step = learning_rate * (gradient + l1_gradient)
+        weights -= step
+        if _should_log(cost_every, i):
+            cost_history.append(compute_cost_l1(X, y, weights, lambda_))
+        if tol is not None and np.max(np.abs(step)) < tol:
+            break
+
+    return weights, cost_history
+
+
+def gradient_descent_l1_batched(X, y, weights, learning_rates, lambdas, iterations, tol=None):
+    """gradient_descent_l1 for K configurations at once.
+
+    weights is (d, K) with one column per configuration, learning_rates and
+    lambdas have length K. Every iteration is one (m, d) @ (d, K) product
+    instead of K matrix-vector products; column k follows exactly the path
+    gradient_descent_l1 takes with learning_rates[k] and lambdas[k]
+    (lambda 0 is plain gradient_descent), tol included: a column is frozen
+    once its own largest update falls below tol, and the remaining
+    iterations only update the others. Returns the (d, K) weights.
+    """
+    m = len(y)
+    learning_rates = np.asarray(learning_rates, dtype=np.float64)
+    lambdas = np.asarray(lambdas, dtype=np.float64)
+    active = np.arange(weights.shape[1])
+
+    for i in range(iterations):
+        current = weights[:, active]
+        predictions = sigmoid(X @ current)
+        gradient = (1 / m) * X.T @ (predictions - y)
+        l1_gradient = lambdas[active] * np.sign(current)
+        l1_gradient[0] = 0
+        step = learning_rates[active] * (gradient + l1_gradient)
+        weights[:, active] = current - step
+        if tol is not None:
+            active = active[np.max(np.abs(step), axis=0) >= tol]
+            if not active.size:
+                break
+
+    return weights
+
+"""Newton / IRLS for the small unregularized problem"""
+
+def newton_irls(X, y, weights, iterations=25, tol=1e-8, cost_every=1, ridge=1e-10):
+    """Newton's method on the log-loss; converges in a handful of iterations for d ~ 10.
+
+    A tiny ridge term keeps the Hessian invertible when classes are separable.
+    """
+    m, d = X.shape
+    cost_history = []
+
+    for i in range(iterations):
+        predictions = sigmoid(X @ weights)
+        gradient = X.T @ (predictions - y) / m
+        curvature = (predictions * (1 - predictions)).ravel()
+        hessian = (X.T * curvature) @ X / m + ridge * np.eye(d)
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if _should_log(cost_every, i):
+            cost_history.append(compute_cost(X, y, weights))
+        if np.max(np.abs(step)) < tol:
+            break
+
+    return weights, cost_history
+
+
+"""Proximal gradient (FISTA) for the L1-regularized problem"""
+
+def _soft_threshold(weights, threshold):
+    shrunk = np.sign(weights) * np.maximum(np.abs(weights) - threshold, 0)
+    shrunk[0] = weights[0]  # the bias is not penalized
+    return shrunk
+
+def proximal_gradient_l1(X, y, weights, lambda_, iterations=1000, learning_rate=None, tol=1e-7, cost_every=1):
+    """Accelerated proximal gradient on log-loss + lambda_ * |w[1:]|_1.
+
+    The default step is 1/L with L = ||X||_2^2 / (4m), the Lipschitz
+    constant of the log-loss gradient, so no learning rate tuning is needed.
+    """
+    m = len(y)
+    if learning_rate is None:
+        learning_rate = 4 * m / np.linalg.norm(X, 2) ** 2
+    cost_history = []
+    momentum_point = weights.copy()
+    t = 1.0
+
+    for i in range(iterations):
+        predictions = sigmoid(X @ momentum_point)
+        gradient = (1 / m) * X.T @ (predictions - y)
+        new_weights = _soft_threshold(momentum_point - learning_rate * gradient, learning_rate * lambda_)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum_point = new_weights + ((t - 1) / t_next) * (new_weights - weights)
+        step = new_weights - weights
+        weights, t = new_weights, t_next
+        if _should_log(cost_every, i):
+            cost_history.append(compute_cost_l1(X, y, weights, lambda_))
+        if np.max(np.abs(step)) < tol:
+            break
+
+    return weights, cost_history
+
+
+"""Mini-batch SGD for large datasets"""
+
+def minibatch_sgd(X, y, weights, learning_rate=0.1, epochs=20, batch_size=256, lambda_=0.0,
+                  tol=1e-6, cost_every=1, seed=0):
+    """Mini-batch SGD with an optional L1 proximal step; tol and cost_every count epochs"""
+    m = len(y)
+    rng = np.random.default_rng(seed)
+    cost_history = []
+
+    for epoch in range(epochs):
+        start_weights = weights.copy()
+        order = rng.permutation(m)
+        for start in range(0, m, batch_size):
+            batch = order[start:start + batch_size]
+            X_batch, y_batch = X[batch], y[batch]
+            gradient = X_batch.T @ (sigmoid(X_batch @ weights) - y_batch) / len(batch)
+            weights = weights - learning_rate * gradient
+            if lambda_:
+                weights = _soft_threshold(weights, learning_rate * lambda_)
+        if _should_log(cost_every, epoch):
+            cost_history.append(compute_cost_l1(X, y, weights, lambda_))
+        if np.max(np.abs(weights - start_weights)) < tol:
+            break
+
+    return weights, cost_history
+
+
+def _newton(X, y, weights, learning_rate=None, iterations=25, lambda_=0.0, **kwargs):
+    if lambda_:
+        raise ValueError("The newton solver is unregularized, use proximal_l1 for lambda_ > 0")
+    return newton_irls(X, y, weights, iterations=iterations, **kwargs)
+
+def _proximal_l1(X, y, weights, learning_rate=None, iterations=1000, lambda_=0.0, **kwargs):
+    return proximal_gradient_l1(X, y, weights, lambda_, iterations=iterations, learning_rate=learning_rate, **kwargs)
+
+def _sgd(X, y, weights, learning_rate=0.1, iterations=20, lambda_=0.0, **kwargs):
+    return minibatch_sgd(X, y, weights, learning_rate=learning_rate, epochs=iterations, lambda_=lambda_, **kwargs)
+
+def _gd(X, y, weights, learning_rate=0.01, iterations=1000, lambda_=0.0, **kwargs):
+    if lambda_:
+        return gradient_descent_l1(X, y, weights, learning_rate, iterations, lambda_, **kwargs)
+    return gradient_descent(X, y, weights, learning_rate, iterations, **kwargs)
+
+# name -> solver(X, y, weights, learning_rate, iterations, lambda_, **options)
+SOLVERS = {
+    'gd': _gd,
+    'newton': _newton,
+    'proximal_l1': _proximal_l1,
+    'sgd': _sgd,
+}
+
+
+def fit_logistic(X, y, solver='gd', weights=None, learning_rate=None, iterations=None, lambda_=0.0,
+                 dtype=np.float64, **options):
+    """Add the bias column and fit with the named solver; weights warm-starts it.
+
+    learning_rate and iterations default to each solver's own defaults.
+    dtype is the float type X, y and the weights are cast to; with float32
+    the gradient descent solvers run entirely in float32.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver {solver!r}, expected one of {sorted(SOLVERS)}")
+    X = np.c_[np.ones((X.shape[0], 1), dtype=dtype), np.asarray(X, dtype=dtype)]
+    y = np.asarray(y, dtype=dtype).reshape(-1, 1)
+    if weights is None:
+        weights = np.zeros((X.shape[1], 1), dtype=dtype)
+    else:
+        weights = np.array(weights, dtype=dtype).reshape(-1, 1)
+        if weights.shape[0] != X.shape[1]:
+            raise ValueError(f"Warm-start weights have {weights.shape[0]} rows, expected {X.shape[1]}")
+    if learning_rate is not None:
+        options['learning_rate'] = learning_rate
+    if iterations is not None:
+        options['iterations'] = iterations
+    return SOLVERS[solver](X, y, weights, lambda_=lambda_, **options)
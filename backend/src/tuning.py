@@ -0,0 +1,176 @@
+"""Hyperparameter search for the L1 logistic model.
+
+    python src/tuning.py [--learning-rates 0.01,0.05,0.1] [--lambdas 0,0.003,0.009,0.03] [--folds 5]
+
+Every (learning_rate, lambda_) pair of the grid is trained at once: their
+weight vectors are the columns of one (d, K) matrix, so each gradient
+descent iteration is a single matrix product for all of them (see
+solvers.gradient_descent_l1_batched). The cross-validation folds of the
+training split run in a process pool; the raw training rows are written
+once to .npy files that every worker memory-maps read-only, so they are
+shared through the page cache rather than copied into each process.
+
+Each fold fits its own outlier imputation, scaler and PCA on its training
+rows (preprocess_split), like train() does on the whole training split,
+so no validation row leaks into the preprocessing it is scored with.
+
+The best configuration (highest mean validation accuracy, then lowest
+log-loss) is retrained on the whole training split with train() and saved
+as the usual logistic_model.pkl.
+"""
+
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from ml_final_project import load_split, preprocess_split, train
+from solvers import gradient_descent_l1_batched, sigmoid
+
+DEFAULT_LEARNING_RATES = (0.01, 0.05, 0.1)
+DEFAULT_LAMBDAS = (0.0, 0.003, 0.009, 0.03)
+
+# Set in each worker by _init_worker
+_shared = {}
+
+
+def param_grid(learning_rates, lambdas):
+    return [{'learning_rate': lr, 'lambda_': lam} for lr, lam in itertools.product(learning_rates, lambdas)]
+
+
+def kfold_indices(m, folds, seed=0):
+    """(train_index, validation_index) pairs of a shuffled k-fold split"""
+    order = np.random.default_rng(seed).permutation(m)
+    parts = np.array_split(order, folds)
+    return [(np.concatenate(parts[:k] + parts[k + 1:]), parts[k]) for k in range(folds)]
+
+
+def fit_grid(X, y, grid, iterations=1000, tol=None):
+    """Fit every configuration of grid on X (without bias column), returns (d + 1, K) weights"""
+    X = np.c_[np.ones((X.shape[0], 1)), X]
+    y = np.asarray(y, dtype=np.float64).reshape(-1, 1)
+    weights = np.zeros((X.shape[1], len(grid)))
+    return gradient_descent_l1_batched(X, y, weights, [g['learning_rate'] for g in grid],
+                                       [g['lambda_'] for g in grid], iterations, tol=tol)
+
+
+def score_grid(X, y, weights):
+    """Per-configuration (accuracy, log-loss) of (d + 1, K) weights on X"""
+    X = np.c_[np.ones((X.shape[0], 1)), X]
+    y = np.asarray(y, dtype=np.float64).reshape(-1, 1)
+    probabilities = sigmoid(X @ weights)
+    accuracy = np.mean((probabilities >= 0.5) == y, axis=0)
+    epsilon = 1e-5  # as in solvers.compute_cost
+    log_loss = -np.mean(y * np.log(probabilities + epsilon) + (1 - y) * np.log(1 - probabilities + epsilon), axis=0)
+    return accuracy, log_loss
+
+
+def _init_worker(data_dir):
+    _shared['X'] = np.load(os.path.join(data_dir, 'X.npy'), mmap_mode='r')
+    _shared['y'] = np.load(os.path.join(data_dir, 'y.npy'), mmap_mode='r')
+
+
+def _run_fold(train_index, validation_index, grid, iterations, tol):
+    X, y = _shared['X'], _shared['y']
+    fold = preprocess_split(X[train_index], X[validation_index])
+    weights = fit_grid(fold['X_train'], y[train_index], grid, iterations, tol)
+    return score_grid(fold['X_test'], y[validation_index], weights)
+
+
+def cross_validate(X, y, grid, folds=5, iterations=1000, tol=None, workers=None, seed=0):
+    """(accuracy, log_loss) arrays of shape (folds, K) for every configuration of grid.
+
+    X is raw features, preprocessed inside each fold.
+    """
+    splits = kfold_indices(len(y), folds, seed)
+    data_dir = tempfile.mkdtemp(prefix='lpd_tuning_')
+    try:
+        np.save(os.path.join(data_dir, 'X.npy'), np.ascontiguousarray(X, dtype=np.float64))
+        np.save(os.path.join(data_dir, 'y.npy'), np.ascontiguousarray(y, dtype=np.float64))
+        workers = min(workers or os.cpu_count() or 1, folds)
+        if workers == 1:
+            _init_worker(data_dir)
+            results = [_run_fold(train_index, validation_index, grid, iterations, tol)
+                       for train_index, validation_index in splits]
+        else:
+            # Deferred like in retraining.py
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(data_dir,)) as executor:
+                futures = [executor.submit(_run_fold, train_index, validation_index, grid, iterations, tol)
+                           for train_index, validation_index in splits]
+                results = [future.result() for future in futures]
+    finally:
+        _shared.clear()
+        shutil.rmtree(data_dir, ignore_errors=True)
+    accuracy, log_loss = zip(*results)
+    return np.array(accuracy), np.array(log_loss)
+
+
+def rank(grid, accuracy, log_loss):
+    """Table rows sorted best first: highest mean accuracy, then lowest mean log-loss"""
+    rows = [dict(config, cv_accuracy=float(accuracy[:, k].mean()), cv_accuracy_std=float(accuracy[:, k].std()),
+                 cv_log_loss=float(log_loss[:, k].mean()))
+            for k, config in enumerate(grid)]
+    rows.sort(key=lambda row: (-row['cv_accuracy'], row['cv_log_loss']))
+    for position, row in enumerate(rows, 1):
+        row['rank'] = position
+    return rows
+
+
+def print_table(rows):
+    print(f"{'rank':>4}  {'learning_rate':>13}  {'lambda':>8}  {'accuracy':>16}  {'log_loss':>8}")
+    for row in rows:
+        print(f"{row['rank']:>4}  {row['learning_rate']:>13g}  {row['lambda_']:>8g}  "
+              f"{row['cv_accuracy'] * 100:>8.2f}% ±{row['cv_accuracy_std'] * 100:5.2f}  {row['cv_log_loss']:>8.4f}")
+
+
+def tune(dataset_path=None, feedback_path=None, model_dir=None, learning_rates=DEFAULT_LEARNING_RATES,
+         lambdas=DEFAULT_LAMBDAS, iterations=1000, folds=5, workers=None, tol=None, cache=True, cache_dir=None,
+         save=True, verbose=True):
+    """Cross-validate the grid, then retrain and (optionally) save the best configuration.
+
+    Returns a dict with the ranked table and the train() result of the best one.
+    """
+    grid = param_grid(learning_rates, lambdas)
+    X_train, _, y_train, _, _ = load_split(dataset_path, feedback_path, cache=cache, cache_dir=cache_dir)
+    accuracy, log_loss = cross_validate(X_train, y_train, grid, folds, iterations, tol, workers)
+    table = rank(grid, accuracy, log_loss)
+    if verbose:
+        print_table(table)
+
+    best = table[0]
+    result = train(dataset_path=dataset_path, model_dir=model_dir, feedback_path=feedback_path,
+                   learning_rate=best['learning_rate'], iterations=iterations, lambda_=best['lambda_'],
+                   solver='gd', cost_every=0, cache=cache, cache_dir=cache_dir, save=save, verbose=verbose)
+    return {'table': table, 'best': best, 'result': result}
+
+
+def _floats(text):
+    return [float(value) for value in text.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset-path', default=None, help="folder containing the LPD training csv")
+    parser.add_argument('--model-dir', default=None, help="where to write logistic_model.pkl")
+    parser.add_argument('--feedback-path', default=None, help="feedback csv written by the backend")
+    parser.add_argument('--learning-rates', type=_floats, default=list(DEFAULT_LEARNING_RATES))
+    parser.add_argument('--lambdas', type=_floats, default=list(DEFAULT_LAMBDAS))
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help="default: one per fold, up to the CPU count")
+    parser.add_argument('--no-save', dest='save', action='store_false', help="only print the ranking")
+    args = parser.parse_args(argv)
+    tune(dataset_path=args.dataset_path, feedback_path=args.feedback_path, model_dir=args.model_dir,
+         learning_rates=args.learning_rates, lambdas=args.lambdas, iterations=args.iterations,
+         folds=args.folds, workers=args.workers, save=args.save)
+
+
+if __name__ == '__main__':
+    main()
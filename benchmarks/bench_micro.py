@@ -0,0 +1,182 @@
+"""Micro-benchmarks for the prediction math, the training stages, float32 vs float64 and the csv/feedback I/O.
+
+    python benchmarks/bench_micro.py [--repeat 200] [--train-repeat 5] [--output results.json]
+
+Runs entirely in-process against the shipped model and the LPD csv; the
+dataset cache and all written files live in a temporary directory.
+"""
+
+import argparse
+import functools
+import os
+import pickle
+import sys
+import tempfile
+
+import numpy as np
+
+from harness import BACKEND_SRC, measure, print_table, summarize, write_results
+
+sys.path.append(BACKEND_SRC)
+
+from feedback_sink import FeedbackSink
+from inference import FEATURE_NAMES, PRECISION_TOLERANCE, compile_model, predict_proba, predict_proba_compiled
+from ml_final_project import (DEFAULT_DATASET_PATH, DATASET_FILE, load_feedback, open_dataset_store, prepare_data,
+                              read_dataset_csv, train)
+from solvers import fit_logistic
+
+MODEL_PATH = os.path.join(BACKEND_SRC, '../models/logistic_model.pkl')
+BATCH_SIZES = (1, 64, 1000)
+PRECISION_BATCH_SIZES = (1000, 100000)
+
+
+def sample_rows(n, seed=0):
+    """Rows drawn from the LPD csv so scores land in the model's usual range"""
+    X, _ = read_dataset_csv(os.path.join(DEFAULT_DATASET_PATH, DATASET_FILE))
+    return X[np.random.default_rng(seed).integers(0, len(X), n)]
+
+
+def bench_predict(repeat):
+    with open(MODEL_PATH, 'rb') as f:
+        model = pickle.load(f)
+    compiled = compile_model(model)
+    cases = []
+    for batch_size in BATCH_SIZES:
+        X = sample_rows(batch_size)
+        cases.append(measure(f'predict/original/batch={batch_size}', lambda: predict_proba(model, X),
+                             repeat, items=batch_size))
+        cases.append(measure(f'predict/compiled/batch={batch_size}', lambda: predict_proba_compiled(compiled, X),
+                             repeat, items=batch_size))
+    # A single row as a plain list, the way /predict calls it
+    row = sample_rows(1)[0].tolist()
+    cases.append(measure('predict/compiled/request_row', lambda: predict_proba_compiled(compiled, row), repeat))
+    return cases
+
+
+def bench_training(repeat, workdir):
+    """Per-stage wall time of train(), from csv and from the columnar cache"""
+    cases = []
+    for cache in (False, True):
+        cache_dir = os.path.join(workdir, 'cache')
+        if cache:
+            # Build the cache once, the timed runs measure the warm path
+            prepare_data(cache_dir=cache_dir)
+        stage_times = {}
+        for _ in range(repeat):
+            result = train(cache=cache, cache_dir=cache_dir, save=False, verbose=False, cost_every=0)
+            for stage, seconds in result['timings'].items():
+                stage_times.setdefault(stage, []).append(seconds)
+        label = 'cached' if cache else 'csv'
+        cases.extend(summarize(f'train/{label}/{stage}', times) for stage, times in stage_times.items())
+    return cases
+
+
+def bench_precision(repeat, train_rows):
+    """float64 vs float32 batch scoring and gradient descent.
+
+    Each case records the bytes of its input matrix and the largest
+    difference to the float64 result; scoring raises if the float32 model
+    is outside PRECISION_TOLERANCE.
+    """
+    with open(MODEL_PATH, 'rb') as f:
+        model = pickle.load(f)
+    cases = []
+    for batch_size in PRECISION_BATCH_SIZES:
+        rows = sample_rows(batch_size)
+        reference = predict_proba(model, rows)
+        for precision in ('float64', 'float32'):
+            compiled = compile_model(model, precision)
+            # Clients of /predict/matrix send the matrix in the model's float type
+            X = rows.astype(precision)
+            max_diff = float(np.max(np.abs(predict_proba_compiled(compiled, X) - reference)))
+            if max_diff > PRECISION_TOLERANCE[precision]:
+                raise ValueError(f"{precision} scoring differs from float64 by {max_diff:.3g}")
+            cases.append(measure(f'precision/predict/{precision}/batch={batch_size}',
+                                 functools.partial(predict_proba_compiled, compiled, X), repeat,
+                                 items=batch_size, input_bytes=X.nbytes, max_abs_diff=max_diff))
+
+    # Gradient descent on a projected-size matrix (the 8 principal components the model keeps)
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((train_rows, 8))
+    y = (X @ rng.standard_normal(8) + rng.standard_normal(train_rows) > 0).astype(float)
+    reference = None
+    for precision in ('float64', 'float32'):
+        X_typed = X.astype(precision)
+        fit = functools.partial(fit_logistic, X_typed, y, solver='gd', iterations=100, lambda_=0.009,
+                                cost_every=0, dtype=np.dtype(precision))
+        weights, _ = fit()
+        reference = weights if reference is None else reference
+        cases.append(measure(f'precision/gd_l1/{precision}/rows={train_rows}', fit, max(repeat // 20, 3),
+                             warmup=1, items=train_rows * 100, input_bytes=X_typed.nbytes,
+                             max_abs_diff=float(np.max(np.abs(weights - reference)))))
+    return cases
+
+
+def write_feedback_csv(path, X, y):
+    sink = FeedbackSink(path, FEATURE_NAMES + ['actual_result'], fsync=False)
+    sink._write_batch([dict(zip(FEATURE_NAMES, row), actual_result=int(label)) for row, label in zip(X, y)])
+
+
+def bench_io(repeat, workdir, feedback_rows):
+    csv_path = os.path.join(DEFAULT_DATASET_PATH, DATASET_FILE)
+    X, y = read_dataset_csv(csv_path)
+    cases = [measure('io/read_dataset_csv', functools.partial(read_dataset_csv, csv_path), repeat,
+                     items=len(X))]
+
+    # A feedback log of feedback_rows rows, read in full and incrementally from an offset
+    feedback_path = os.path.join(workdir, 'feedback.csv')
+    index = np.random.default_rng(0).integers(0, len(X), feedback_rows)
+    write_feedback_csv(feedback_path, X[index], y[index])
+    _, _, end_offset = load_feedback(feedback_path)
+    cases.append(measure('io/load_feedback/full', functools.partial(load_feedback, feedback_path), repeat,
+                         items=feedback_rows))
+    cases.append(measure('io/load_feedback/no_new_rows', functools.partial(load_feedback, feedback_path, end_offset),
+                         repeat))
+
+    # One background flush of the feedback sink, with and without fsync
+    batch = [dict(zip(FEATURE_NAMES, row), actual_result=1) for row in X[:256]]
+    for fsync in (False, True):
+        sink = FeedbackSink(os.path.join(workdir, f'sink-{fsync}.csv'), FEATURE_NAMES + ['actual_result'],
+                            fsync=fsync)
+        cases.append(measure(f'io/feedback_flush/256_rows/fsync={fsync}', functools.partial(sink._write_batch, batch),
+                             repeat, items=len(batch)))
+
+    # Enqueue cost of /feedback, put() only appends to the in-memory buffer
+    sink = FeedbackSink(os.path.join(workdir, 'put.csv'), FEATURE_NAMES + ['actual_result'], capacity=repeat + 10)
+    cases.append(measure('io/feedback_put', functools.partial(sink.put, batch[0]), repeat, warmup=0))
+
+    store = open_dataset_store(cache_dir=os.path.join(workdir, 'cache'))
+    cases.append(measure('io/dataset_store/read', functools.partial(store.read, 'base'), repeat, items=len(X)))
+    return cases
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200, help="calls per predict/io case")
+    parser.add_argument('--train-repeat', type=int, default=5, help="train() runs per cache mode")
+    parser.add_argument('--feedback-rows', type=int, default=10000)
+    parser.add_argument('--precision-train-rows', type=int, default=200000,
+                        help="rows of the synthetic gradient descent problem of the precision group")
+    parser.add_argument('--only', choices=['predict', 'training', 'precision', 'io'], action='append',
+                        help="run only these groups (repeatable)")
+    parser.add_argument('--output', default=None, help="JSON results path (default benchmarks/results/)")
+    args = parser.parse_args(argv)
+    groups = args.only or ['predict', 'training', 'precision', 'io']
+
+    cases = []
+    with tempfile.TemporaryDirectory() as workdir:
+        if 'predict' in groups:
+            cases += bench_predict(args.repeat)
+        if 'training' in groups:
+            cases += bench_training(args.train_repeat, workdir)
+        if 'precision' in groups:
+            cases += bench_precision(args.repeat, args.precision_train_rows)
+        if 'io' in groups:
+            cases += bench_io(args.repeat, workdir, args.feedback_rows)
+
+    print_table(cases)
+    write_results('micro', cases, args.output, config=vars(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compare the logistic regression solvers on the LPD training csv.
+
+    python benchmarks/bench_solvers.py [--repeat 3] [--lambda 0.009]
+
+Reports wall time, iterations-to-stop and final loss for every solver next
+to the original 1000-iteration gradient descent.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../backend/src')))
+
+from ml_final_project import prepare_data
+from solvers import compute_cost, compute_cost_l1, fit_logistic, predict
+
+
+def run_solver(data, solver, lambda_, repeat, **options):
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        weights, _ = fit_logistic(data['X_train'], data['y_train'], solver=solver, lambda_=lambda_, **options)
+        best = min(best, time.perf_counter() - start_time)
+
+    X_train = np.c_[np.ones((len(data['X_train']), 1)), data['X_train']]
+    X_test = np.c_[np.ones((len(data['X_test']), 1)), data['X_test']]
+    y_train = data['y_train'].reshape(-1, 1)
+    return {
+        'seconds': best,
+        'log_loss': compute_cost(X_train, y_train, weights).item(),
+        'l1_objective': compute_cost_l1(X_train, y_train, weights, lambda_).item(),
+        'accuracy': np.mean(predict(X_test, weights).ravel() == data['y_test']) * 100
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset-path', default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--lambda', dest='lambda_', type=float, default=0.009)
+    args = parser.parse_args(argv)
+
+    data = prepare_data(args.dataset_path)
+    cases = [
+        ('gd (original)', 'gd', 0.0, {}),
+        ('gd, cost every 100', 'gd', 0.0, {'cost_every': 100}),
+        ('newton', 'newton', 0.0, {}),
+        ('sgd', 'sgd', 0.0, {'cost_every': 0}),
+        ('gd_l1 (original)', 'gd', args.lambda_, {}),
+        ('gd_l1, cost every 100', 'gd', args.lambda_, {'cost_every': 100}),
+        ('proximal_l1', 'proximal_l1', args.lambda_, {'cost_every': 0}),
+        ('sgd_l1', 'sgd', args.lambda_, {'cost_every': 0}),
+    ]
+
+    print(f"{'solver':<24}{'lambda':>8}{'time ms':>11}{'log-loss':>11}{'L1 obj':>11}{'acc %':>8}")
+    for label, solver, lambda_, options in cases:
+        result = run_solver(data, solver, lambda_, args.repeat, **options)
+        print(f"{label:<24}{lambda_:>8.3g}{result['seconds'] * 1000:>11.2f}{result['log_loss']:>11.5f}"
+              f"{result['l1_objective']:>11.5f}{result['accuracy']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
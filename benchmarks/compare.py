@@ -0,0 +1,55 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python benchmarks/compare.py baseline.json current.json [--threshold 0.10] [--metric p95_ms]
+
+A case regresses when its latency metric grew, or its throughput dropped,
+by more than threshold (a fraction). Exits with status 1 if any case
+regressed, so it can gate CI.
+"""
+
+import argparse
+import json
+import sys
+
+
+def load_cases(path):
+    with open(path) as f:
+        return {case['name']: case for case in json.load(f)['cases']}
+
+
+def compare(baseline, current, metric='p95_ms', threshold=0.10):
+    """Rows of (name, baseline value, current value, relative change, regressed) for cases in both runs"""
+    rows = []
+    for name, case in current.items():
+        if name not in baseline or metric not in case or metric not in baseline[name]:
+            continue
+        before, after = baseline[name][metric], case[metric]
+        change = (after - before) / before if before else 0.0
+        # Higher is better for throughput, lower for latencies
+        regressed = -change > threshold if metric == 'throughput' else change > threshold
+        rows.append((name, before, after, change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--metric', default='p95_ms', help="throughput, mean_ms, p50_ms, p95_ms or p99_ms")
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    rows = compare(load_cases(args.baseline), load_cases(args.current), args.metric, args.threshold)
+    width = max([len(row[0]) for row in rows] + [4]) + 2
+    print(f"{'case':<{width}}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, before, after, change, regressed in rows:
+        print(f"{name:<{width}}{before:>12.3f}{after:>12.3f}{change:>+10.1%}{'  REGRESSION' if regressed else ''}")
+
+    regressions = sum(row[4] for row in rows)
+    if regressions:
+        print(f"{regressions} case(s) regressed by more than {args.threshold:.0%} on {args.metric}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Shared timing, reporting and result-file helpers for the benchmark scripts.
+
+Every benchmark produces a list of cases, one dict per measured thing:
+
+    {'name': 'predict/compiled/batch=1', 'n': 2000, 'seconds': 0.21,
+     'throughput': 9523.8, 'mean_ms': 0.105, 'p50_ms': 0.1, 'p95_ms': 0.12, 'p99_ms': 0.2}
+
+write_results() stores them with enough metadata (git commit, versions,
+host) to compare runs over time, see compare.py.
+"""
+
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+BACKEND_SRC = os.path.join(REPO_ROOT, 'backend', 'src')
+FRONTEND_DIR = os.path.join(REPO_ROOT, 'frontend')
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+
+
+def summarize(name, latencies, elapsed=None, items=1, **extra):
+    """Case dict from per-call latencies in seconds.
+
+    elapsed is the wall time of the whole run (defaults to the sum of the
+    latencies, i.e. a sequential run); items is the number of rows each call
+    handled, so throughput is in rows per second.
+    """
+    latencies = np.asarray(latencies, dtype=np.float64)
+    if elapsed is None:
+        elapsed = float(latencies.sum())
+    case = {'name': name, 'n': int(len(latencies)), 'seconds': elapsed,
+            'throughput': len(latencies) * items / elapsed if elapsed > 0 else float('inf')}
+    if len(latencies):
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        case.update(mean_ms=float(latencies.mean() * 1000), p50_ms=float(p50), p95_ms=float(p95),
+                    p99_ms=float(p99))
+    case.update(extra)
+    return case
+
+
+def measure(name, fn, repeat=100, warmup=5, items=1, **extra):
+    """Call fn() repeat times (after warmup untimed calls) and summarize the latencies"""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start_time)
+    return summarize(name, latencies, items=items, **extra)
+
+
+def print_table(cases):
+    width = max([len(case['name']) for case in cases] + [4]) + 2
+    print(f"{'case':<{width}}{'n':>7}{'per sec':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for case in cases:
+        print(f"{case['name']:<{width}}{case['n']:>7}{case['throughput']:>12.1f}{case.get('p50_ms', 0):>10.3f}"
+              f"{case.get('p95_ms', 0):>10.3f}{case.get('p99_ms', 0):>10.3f}")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(suite, cases, output=None, config=None):
+    """Save cases as JSON, by default to benchmarks/results/<suite>-<timestamp>.json"""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if output is None:
+        os.makedirs(DEFAULT_RESULTS_DIR, exist_ok=True)
+        output = os.path.join(DEFAULT_RESULTS_DIR, f"{suite}-{now.strftime('%Y%m%dT%H%M%SZ')}.json")
+    result = {
+        'suite': suite,
+        'timestamp': now.isoformat(),
+        'git_commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': config or {},
+        'cases': cases
+    }
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {output}")
+    return output
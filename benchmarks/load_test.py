@@ -0,0 +1,187 @@
+"""HTTP load generator for the backend /predict and /feedback and the frontend /api/predict.
+
+    python benchmarks/load_test.py [--requests 2000] [--concurrency 32] [--target backend-predict ...]
+    python benchmarks/load_test.py --backend-url http://localhost:8000 --frontend-url http://localhost:5000
+
+Without URLs the apps run in-process: the FastAPI app through httpx's ASGI
+transport (feedback goes to a temporary csv, retraining is disabled) and the
+Flask app through its test client, scoring through a local stand-in for the
+backend so only the frontend's own overhead is measured. Each target is a
+closed loop of `concurrency` clients sending `requests` requests in total;
+throughput, p50/p95/p99 latency and the status code counts are reported.
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+import requests
+
+from harness import BACKEND_SRC, FRONTEND_DIR, print_table, summarize, write_results
+
+sys.path.append(BACKEND_SRC)
+
+from inference import FEATURE_NAMES, load_serving_model, predict_proba_compiled
+from ml_final_project import DEFAULT_DATASET_PATH, DATASET_FILE, read_dataset_csv
+
+TARGETS = ['backend-predict', 'backend-feedback', 'frontend-predict']
+
+
+def make_payloads(n, seed=0):
+    """n request bodies drawn from the LPD csv"""
+    X, y = read_dataset_csv(os.path.join(DEFAULT_DATASET_PATH, DATASET_FILE))
+    index = np.random.default_rng(seed).integers(0, len(X), n)
+    payloads = []
+    for row, label in zip(X[index], y[index]):
+        payload = dict(zip(FEATURE_NAMES, row.tolist()))
+        payload['gender'] = int(payload['gender'])
+        payload['actual_result'] = int(label)
+        payloads.append(payload)
+    return payloads
+
+
+async def run_load(name, send, payloads, concurrency):
+    """Closed loop: concurrency workers each send the next payload as soon as their last call returns"""
+    latencies = []
+    statuses = collections.Counter()
+    queue = iter(payloads)
+
+    async def worker():
+        for payload in queue:
+            start_time = time.perf_counter()
+            try:
+                status = await send(payload)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start_time)
+            statuses[str(status)] += 1
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start_time
+    errors = sum(count for status, count in statuses.items() if not status.startswith('2'))
+    return summarize(name, latencies, elapsed, concurrency=concurrency, errors=errors, statuses=dict(statuses))
+
+
+def http_sender(client, path, fields):
+    async def send(payload):
+        response = await client.post(path, json={name: payload[name] for name in fields})
+        return response.status_code
+    return send
+
+
+class LocalBackend:
+    """Stand-in for frontend's BackendClient that scores with the shipped model in-process"""
+
+    def __init__(self):
+        self.model = load_serving_model(os.path.join(BACKEND_SRC, '../models/logistic_model.pkl'))
+
+    def post(self, path, **kwargs):
+        patient = kwargs['json']
+        probability = float(predict_proba_compiled(self.model, [patient[name] for name in FEATURE_NAMES])[0])
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps({'probability': probability, 'prediction': int(probability >= 0.5),
+                                        'model_version': 1}).encode()
+        return response
+
+
+def flask_sender(app, path, fields, executor):
+    loop = asyncio.get_running_loop()
+
+    def post(payload):
+        with app.test_client() as client:
+            return client.post(path, json={name: payload[name] for name in fields}).status_code
+
+    async def send(payload):
+        return await loop.run_in_executor(executor, post, payload)
+    return send
+
+
+async def run_backend(targets, payloads, concurrency, backend_url):
+    predict_fields = FEATURE_NAMES
+    feedback_fields = FEATURE_NAMES + ['actual_result']
+    cases = []
+    if backend_url:
+        async with httpx.AsyncClient(base_url=backend_url, limits=httpx.Limits(max_connections=concurrency)) as client:
+            if 'backend-predict' in targets:
+                cases.append(await run_load('backend /predict', http_sender(client, '/predict', predict_fields),
+                                            payloads, concurrency))
+            if 'backend-feedback' in targets:
+                cases.append(await run_load('backend /feedback', http_sender(client, '/feedback', feedback_fields),
+                                            payloads, concurrency))
+        return cases
+
+    import main
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url='http://backend') as client:
+            if 'backend-predict' in targets:
+                cases.append(await run_load('backend /predict (in-process)',
+                                            http_sender(client, '/predict', predict_fields), payloads, concurrency))
+            if 'backend-feedback' in targets:
+                cases.append(await run_load('backend /feedback (in-process)',
+                                            http_sender(client, '/feedback', feedback_fields), payloads, concurrency))
+    return cases
+
+
+async def run_frontend(payloads, concurrency, frontend_url, backend_url):
+    if frontend_url:
+        async with httpx.AsyncClient(base_url=frontend_url, limits=httpx.Limits(max_connections=concurrency)) as client:
+            return [await run_load('frontend /api/predict', http_sender(client, '/api/predict', FEATURE_NAMES),
+                                   payloads, concurrency)]
+
+    sys.path.insert(0, FRONTEND_DIR)
+    import frontend
+    from backend_client import BackendClient
+    if backend_url:
+        frontend.backend = BackendClient(backend_url, pool_size=concurrency)
+        name = 'frontend /api/predict (in-process)'
+    else:
+        frontend.backend = LocalBackend()
+        name = 'frontend /api/predict (in-process, local backend stand-in)'
+    with ThreadPoolExecutor(concurrency) as executor:
+        sender = flask_sender(frontend.app, '/api/predict', FEATURE_NAMES, executor)
+        return [await run_load(name, sender, payloads, concurrency)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=TARGETS, action='append', help="targets to run (repeatable, default all)")
+    parser.add_argument('--requests', type=int, default=2000, help="requests per target")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--backend-url', default=None, help="load a running backend instead of the in-process app")
+    parser.add_argument('--frontend-url', default=None, help="load a running frontend instead of the in-process app")
+    parser.add_argument('--output', default=None, help="JSON results path (default benchmarks/results/)")
+    args = parser.parse_args(argv)
+    targets = args.target or TARGETS
+    payloads = make_payloads(args.requests)
+
+    cases = []
+    with tempfile.TemporaryDirectory() as workdir:
+        if not args.backend_url:
+            # Must be set before main is imported: keep feedback out of the repo and never retrain
+            os.environ.setdefault('FEEDBACK_PATH', os.path.join(workdir, 'feedback.csv'))
+            os.environ.setdefault('RETRAIN_THRESHOLD', str(sys.maxsize))
+        if any(target.startswith('backend') for target in targets):
+            cases += asyncio.run(run_backend(targets, payloads, args.concurrency, args.backend_url))
+        if 'frontend-predict' in targets:
+            cases += asyncio.run(run_frontend(payloads, args.concurrency, args.frontend_url, args.backend_url))
+
+    print_table(cases)
+    for case in cases:
+        if case['errors']:
+            print(f"{case['name']}: {case['errors']} failed requests {case['statuses']}")
+    write_results('load', cases, args.output, config=vars(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+from prometheus_client import Counter, Gauge, Histogram
+
+# Set by the backend's admission control on requests it refused without processing them
+LOAD_SHED_HEADER = 'X-Load-Shed'
+
+BACKEND_CLIENT_LATENCY = Histogram(
+    'frontend_backend_request_latency_seconds',
+    'Latency of frontend calls to the backend, including retries',
+    ['endpoint', 'outcome']
+)
+
+BACKEND_CLIENT_CONNECTIONS = Counter(
+    'frontend_backend_connections_total',
+    'Backend requests by whether they reused a pooled keep-alive connection',
+    ['reused']
+)
+
+BACKEND_CLIENT_RETRIES = Counter(
+    'frontend_backend_retries_total',
+    'Retried backend requests',
+    ['endpoint']
+)
+
+BACKEND_CIRCUIT_OPEN = Gauge(
+    'frontend_backend_circuit_open',
+    '1 while the backend circuit breaker is open and calls fail fast'
+)
+
+
+class BackendUnavailable(Exception):
+    """The backend could not be reached, or the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures and fails fast for
+    reset_timeout seconds, then lets one trial call through (half-open)."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+        BACKEND_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+        if self.is_open:
+            BACKEND_CIRCUIT_OPEN.set(1)
+
+
+def parse_retry_after(value):
+    """Seconds of a Retry-After header, None if missing or not a number of seconds"""
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def never_sent(error):
+    """True if a requests ConnectionError happened while connecting, before the request was sent"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    # requests wraps urllib3's MaxRetryError, whose reason is the underlying error;
+    # NewConnectionError (refused, unresolvable) is a ConnectTimeoutError too
+    return isinstance(getattr(reason, 'reason', reason), ConnectTimeoutError)
+
+
+class ReuseTrackingAdapter(HTTPAdapter):
+    """Sets response.connection_reused: whether its urllib3 connection had served a request before.
+
+    Counted on the connection object itself, which only one thread uses at a
+    time, so concurrent requests can't be charged with each other's connections.
+    """
+
+    def build_response(self, req, resp):
+        response = super().build_response(req, resp)
+        # The body isn't read yet (preload_content=False), so the response still holds its connection
+        connection = getattr(resp, 'connection', None)
+        if connection is not None:
+            served = getattr(connection, 'backend_client_requests', 0)
+            connection.backend_client_requests = served + 1
+            response.connection_reused = served > 0
+        return response
+
+
+class BackendClient:
+    """Shared client for the FastAPI backend.
+
+    One pooled keep-alive requests.Session for every Flask worker thread,
+    connect/read timeouts on every call, bounded retries with full jitter
+    and a circuit breaker. A thread waits at most pool_timeout seconds for
+    one of the pool_size connections (requests itself would wait forever);
+    running out counts as a breaker failure. Only failures to connect, where
+    the request never reached the backend, are retried unless the call is
+    marked idempotent, in which case dropped connections, timeouts and
+    502/503/504 are retried too.
+
+    Responses with an X-Load-Shed header were refused by the backend's
+    admission control before being processed: they are resent for any
+    call, after their Retry-After, as long as the call stays within
+    retry_budget seconds, and they don't count as breaker failures.
+    """
+
+    RETRY_STATUSES = (502, 503, 504)
+
+    def __init__(self, base_url, pool_size=10, connect_timeout=2.0, read_timeout=10.0,
+                 retries=2, backoff=0.1, breaker=None, pool_timeout=1.0, retry_budget=2.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_timeout = pool_timeout
+        self.retry_budget = retry_budget
+        # One slot per pooled connection, so the pool below never has to block
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        self._adapter = ReuseTrackingAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount('http://', self._adapter)
+        self.session.mount('https://', self._adapter)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.getenv('BACKEND_URL', 'http://backend:8000'),
+            pool_size=int(os.getenv('BACKEND_POOL_SIZE', '10')),
+            pool_timeout=float(os.getenv('BACKEND_POOL_TIMEOUT', '1')),
+            retry_budget=float(os.getenv('BACKEND_RETRY_BUDGET', '2')),
+            connect_timeout=float(os.getenv('BACKEND_CONNECT_TIMEOUT', '2')),
+            read_timeout=float(os.getenv('BACKEND_READ_TIMEOUT', '10')),
+            retries=int(os.getenv('BACKEND_RETRIES', '2')),
+            backoff=float(os.getenv('BACKEND_RETRY_BACKOFF', '0.1')),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv('BACKEND_BREAKER_THRESHOLD', '5')),
+                reset_timeout=float(os.getenv('BACKEND_BREAKER_RESET', '30'))
+            )
+        )
+
+    def post(self, path, idempotent=False, **kwargs):
+        return self.request('POST', path, idempotent=idempotent, **kwargs)
+
+    def request(self, method, path, idempotent=False, **kwargs):
+        """Send a request, returns the Response or raises BackendUnavailable"""
+        if not self.breaker.allow():
+            BACKEND_CLIENT_LATENCY.labels(path, 'circuit_open').observe(0)
+            raise BackendUnavailable("Backend circuit breaker is open, failing fast")
+
+        kwargs.setdefault('timeout', self.timeout)
+        url = f"{self.base_url}{path}"
+        start_time = time.perf_counter()
+        delay = 0
+        for attempt in range(self.retries + 1):
+            if attempt:
+                BACKEND_CLIENT_RETRIES.labels(path).inc()
+                time.sleep(delay)
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            if not self._slots.acquire(timeout=self.pool_timeout):
+                self.breaker.record_failure()
+                BACKEND_CLIENT_LATENCY.labels(path, 'pool_timeout').observe(time.perf_counter() - start_time)
+                raise BackendUnavailable(f"No backend connection free within {self.pool_timeout:g}s")
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # Connect failures and timeouts, plus connections dropped by the backend: a drop
+                # may come after the backend got the request, so only idempotent calls resend then
+                error = e
+                if idempotent or never_sent(e):
+                    continue
+                break
+            except requests.exceptions.Timeout as e:
+                error = e
+                if idempotent:
+                    continue
+                break
+            finally:
+                # The body is read by now (no stream=True), so the connection is back in the pool
+                self._slots.release()
+            reused = getattr(response, 'connection_reused', None)
+            if reused is not None:
+                BACKEND_CLIENT_CONNECTIONS.labels(str(reused).lower()).inc()
+            shed = LOAD_SHED_HEADER in response.headers
+            if attempt < self.retries and (shed or idempotent and response.status_code in self.RETRY_STATUSES):
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is None:
+                    continue
+                if time.perf_counter() - start_time + retry_after <= self.retry_budget:
+                    delay = retry_after
+                    continue
+                # Asked to wait longer than this call may take: hand the response back now
+            if response.status_code >= 500 and not shed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            BACKEND_CLIENT_LATENCY.labels(path, str(response.status_code)).observe(time.perf_counter() - start_time)
+            return response
+
+        self.breaker.record_failure()
+        BACKEND_CLIENT_LATENCY.labels(path, 'error').observe(time.perf_counter() - start_time)
+        raise BackendUnavailable(f"Backend request to {path} failed: {error}") from error
@@ -0,0 +1,158 @@
+"""Streaming bulk scoring of CSV / NDJSON uploads.
+
+Records are read lazily from the upload, validated a chunk at a time with
+column-wise range checks (the same ranges as PredictionForm), sent to the
+backend's /predict/batch in bounded chunks and written back as NDJSON
+lines as soon as each chunk is scored. Only one chunk is ever held in
+memory, whatever the size of the upload.
+"""
+
+import csv
+import io
+import json
+
+import numpy as np
+from wtforms import validators
+
+from backend_client import BackendUnavailable
+
+
+class FieldRule:
+    """Validation of one form field, taken from its wtforms validators"""
+
+    def __init__(self, required_message, low=None, high=None, range_message=None, choices=None):
+        self.required_message = required_message
+        self.low = low
+        self.high = high
+        self.range_message = range_message
+        self.choices = choices
+
+
+def field_rules(form_class):
+    """name -> FieldRule for every field of a wtforms Form class, in form order"""
+    rules = {}
+    for name, field in form_class()._fields.items():
+        rule = FieldRule(f"{field.label.text} is required")
+        for validator in field.validators:
+            if isinstance(validator, validators.InputRequired) and validator.message:
+                rule.required_message = validator.message
+            elif isinstance(validator, validators.NumberRange):
+                rule.low, rule.high = validator.min, validator.max
+                rule.range_message = validator.message or f"{field.label.text} must be between {validator.min} and {validator.max}"
+        if getattr(field, 'choices', None):
+            rule.choices = [float(value) for value, _ in field.choices]
+            rule.range_message = f"{field.label.text} must be one of {', '.join(value for value, _ in field.choices)}"
+        rules[name] = rule
+    return rules
+
+
+class InvalidRecord(dict):
+    """An empty record standing for an input line that could not be read"""
+
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+
+
+def read_records(stream, fmt):
+    """Yield one dict per record from a binary stream of CSV or NDJSON (with or without a BOM)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'ndjson':
+        for line in text:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield InvalidRecord("Invalid JSON")
+                continue
+            yield record if isinstance(record, dict) else InvalidRecord("Record must be a JSON object")
+    else:
+        yield from csv.DictReader(text)
+
+
+def chunked(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def validate_chunk(records, rules):
+    """Column-wise validation, returns (payloads, errors) with one entry per record.
+
+    payloads[i] is the backend payload of a valid record (None otherwise)
+    and errors[i] the first problem found with an invalid one (None otherwise).
+    """
+    n = len(records)
+    errors = [getattr(record, 'error', None) for record in records]
+    columns = {}
+    for name, rule in rules.items():
+        raw = [record.get(name) for record in records]
+        missing = np.array([value is None or value == '' for value in raw])
+        values = np.array([_to_float(value) for value in raw], dtype=np.float64)
+        if rule.choices is not None:
+            out_of_range = ~np.isin(values, rule.choices)
+        else:
+            low = -np.inf if rule.low is None else rule.low
+            high = np.inf if rule.high is None else rule.high
+            # NaN (not a number) fails both comparisons, so it is caught by ~
+            out_of_range = ~((values >= low) & (values <= high))
+        for i in np.flatnonzero(missing | out_of_range):
+            if errors[i] is None:
+                errors[i] = rule.required_message if missing[i] else rule.range_message
+        columns[name] = values
+
+    payloads = [None] * n
+    for i in range(n):
+        if errors[i] is None:
+            payloads[i] = {name: int(columns[name][i]) if rule.choices is not None else float(columns[name][i])
+                           for name, rule in rules.items()}
+    return payloads, errors
+
+
+def score_stream(records, backend, rules, chunk_size=500):
+    """Yield NDJSON result lines for records, scoring them in chunks of chunk_size"""
+    row = 0
+    for chunk in chunked(records, chunk_size):
+        payloads, errors = validate_chunk(chunk, rules)
+        valid = [i for i, payload in enumerate(payloads) if payload is not None]
+        results = {}
+        backend_error = None
+        if valid:
+            try:
+                response = backend.post('/predict/batch', json={'patients': [payloads[i] for i in valid]},
+                                        idempotent=True)
+                if response.ok:
+                    for i, result in zip(valid, response.json()['results']):
+                        results[i] = result
+                else:
+                    backend_error = f"API Error {response.status_code}: {response.text}"
+            except BackendUnavailable as e:
+                backend_error = str(e)
+
+        for i in range(len(chunk)):
+            line = {'row': row + i}
+            if errors[i] is not None:
+                line['error'] = errors[i]
+            elif i in results and 'probability' in results[i]:
+                line['probability'] = results[i]['probability']
+                line['prediction'] = results[i]['prediction']
+            elif i in results:
+                line['error'] = results[i].get('error')
+            else:
+                line['error'] = backend_error
+            yield json.dumps(line) + '\n'
+        row += len(chunk)
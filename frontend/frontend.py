@@ -1,8 +1,13 @@
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
-import requests
-from wtforms import Form, FloatField, SelectField, validators
 import os
-from prometheus_client import Counter
+import shutil
+import tempfile
+
+from flask import Flask, render_template, request, jsonify, flash, redirect, url_for, Response, stream_with_context
+from wtforms import Form, FloatField, SelectField, validators
+from prometheus_client import Counter, generate_latest, CONTENT_TYPE_LATEST
+
+from backend_client import BackendClient, BackendUnavailable
+from bulk_scoring import field_rules, read_records, score_stream
 
 app = Flask(__name__)
 app.secret_key = 'liver_disease_prediction_app'
@@ -14,6 +19,13 @@ FRONTEND_REQUESTS = Counter(
     ['endpoint']
 )
 
+# One pooled keep-alive client shared by every request (see backend_client.py)
+backend = BackendClient.from_env()
+
+@app.route('/metrics')
+def metrics():
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
 class PredictionForm(Form):
     age = FloatField('Age', [
         validators.InputRequired(message="Age is required"),
@@ -65,8 +77,7 @@ def index():
             try:
                 payload = { field: float(form._fields[field].data) if field != 'gender' else int(form.gender.data)
                             for field in form._fields }
-                backend_url = os.getenv('BACKEND_URL', 'http://backend:8000')
-                response = requests.post(f"{backend_url}/predict", json=payload)
+                response = backend.post('/predict', json=payload, idempotent=True)
                 if response.ok:
                     prediction_result = response.json()
                 else:
@@ -97,10 +108,47 @@ def api_predict():
     if data['gender'] not in [0, 1, '0', '1']:
         return jsonify({'error': 'Gender must be 0 or 1'}), 400
     data['gender'] = int(data['gender'])
-    backend_url = os.getenv('BACKEND_URL', 'http://backend:8000')
-    resp = requests.post(f"{backend_url}/predict", json=data)
+    try:
+        resp = backend.post('/predict', json=data, idempotent=True)
+    except BackendUnavailable as e:
+        return jsonify({'error': str(e)}), 503
     return jsonify(resp.json()), resp.status_code
 
+# Rows per /predict/batch call, must stay within the backend's MAX_BATCH_SIZE
+BULK_CHUNK_SIZE = int(os.getenv('BULK_CHUNK_SIZE', '500'))
+BULK_RULES = field_rules(PredictionForm)
+
+@app.route('/api/predict/bulk', methods=['POST'])
+def api_predict_bulk():
+    """Score an uploaded CSV or NDJSON file, streaming one NDJSON result line per input row.
+
+    Send the file as the 'file' field of a multipart form or as the raw
+    request body; NDJSON is detected from a .ndjson/.jsonl filename, an
+    ndjson content type or ?format=ndjson, anything else is read as CSV
+    with a header row using the API field names.
+    """
+    FRONTEND_REQUESTS.labels(endpoint='/api/predict/bulk').inc()
+    upload = request.files.get('file')
+    if upload is not None:
+        # werkzeug closes request.files when the view returns, before the response is streamed,
+        # so hand the generator its own copy (spooled to disk past 1 MiB)
+        stream = tempfile.SpooledTemporaryFile(max_size=1 << 20)
+        shutil.copyfileobj(upload.stream, stream)
+        stream.seek(0)
+        name, content_type = upload.filename or '', upload.mimetype or ''
+    else:
+        stream, name, content_type = request.stream, '', request.mimetype or ''
+    fmt = request.args.get('format')
+    if fmt is None:
+        is_ndjson = name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type or 'jsonl' in content_type
+        fmt = 'ndjson' if is_ndjson else 'csv'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson'}), 400
+
+    records = read_records(stream, fmt)
+    return Response(stream_with_context(score_stream(records, backend, BULK_RULES, BULK_CHUNK_SIZE)),
+                    mimetype='application/x-ndjson')
+
 # Route to submit feedback on predictions
 @app.route('/submit-feedback', methods=['POST'])
 def submit_feedback():
@@ -126,8 +174,7 @@ def submit_feedback():
             }
             
             # Send to backend
-            backend_url = os.environ.get('BACKEND_URL', 'http://backend:8000')
-            response = requests.post(f"{backend_url}/feedback", json=patient_data)
+            response = backend.post('/feedback', json=patient_data)
             
             # Check response status
             if response.status_code != 200:
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from admission import AdmissionController, AdmissionRejected, parse_limits
+
+
+def test_parse_limits():
+    assert parse_limits('predict=64:256, feedback=4') == {'predict': (64, 256), 'feedback': (4, 0)}
+    assert parse_limits('') == {}
+    with pytest.raises(ValueError):
+        parse_limits('predict=0:10')
+
+
+def test_queue_is_bounded_and_slots_are_handed_over_in_order():
+    async def run():
+        admission = AdmissionController({'predict': (1, 1)}, queue_timeout=1.0)
+        assert await admission.acquire('predict') == 0.0
+        queued = asyncio.ensure_future(admission.acquire('predict'))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire('predict')
+        assert rejected.value.status_code == 429 and rejected.value.headers == {'Retry-After': '1', 'X-Load-Shed': 'queue_full'}
+        admission.release('predict')
+        assert await queued > 0
+        assert admission.in_flight['predict'] == 1
+
+    asyncio.run(run())
+
+
+def test_predict_waiters_go_before_feedback_waiters():
+    order = []
+
+    async def request(admission, name):
+        await admission.acquire(name)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        admission.release(name)
+
+    async def run():
+        admission = AdmissionController({'predict': (1, 8), 'feedback': (1, 8)}, queue_timeout=1.0)
+        await admission.acquire('predict')
+        # feedback has a free slot of its own but waits behind the queued predict requests
+        tasks = [asyncio.ensure_future(request(admission, 'predict'))]
+        await asyncio.sleep(0)
+        tasks += [asyncio.ensure_future(request(admission, name)) for name in ('feedback', 'predict')]
+        await asyncio.sleep(0)
+        admission.release('predict')
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ['predict', 'predict', 'feedback']
+
+
+def test_expired_deadline_drops_queued_request_and_frees_its_place():
+    async def run():
+        admission = AdmissionController({'predict': (1, 1)}, queue_timeout=5.0)
+        await admission.acquire('predict')
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire('predict', time.perf_counter_ns() + 20_000_000)
+        assert rejected.value.status_code == 503 and rejected.value.reason == 'deadline'
+        assert not admission.waiters['predict']
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire('predict', time.perf_counter_ns() - 1)
+        assert rejected.value.reason == 'deadline'
+        admission.release('predict')
+        assert admission.in_flight['predict'] == 0
+
+    asyncio.run(run())
+
+
+def test_predict_endpoint_rejects_expired_deadline_with_retry_after():
+    from fastapi.testclient import TestClient
+    from prometheus_client import REGISTRY
+    from main import app
+
+    client = TestClient(app)
+    labels = {'endpoint': '/predict', 'reason': 'deadline'}
+    before = REGISTRY.get_sample_value('app_admission_rejected_total', labels) or 0
+    patient = {"age": 65, "gender": 1, "total_bilirubin": 0.7, "direct_bilirubin": 0.1,
+               "alkaline_phosphotase": 187, "alanine_aminotransferase": 16, "aspartate_aminotransferase": 18,
+               "total_proteins": 6.8, "albumin": 3.3, "albumin_globulin_ratio": 0.9}
+
+    response = client.post("/predict", json=patient, headers={"X-Deadline-Ms": "0"})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+    assert response.headers["X-Load-Shed"] == "deadline"
+    assert REGISTRY.get_sample_value('app_admission_rejected_total', labels) == before + 1
+    assert REGISTRY.get_sample_value('app_request_count_total',
+                                     {'method': 'POST', 'endpoint': '/predict', 'http_status': '503'}) >= 1
+    assert client.post("/predict", json=patient, headers={"X-Deadline-Ms": "soon"}).status_code == 400
+    assert client.post("/predict", json=patient, headers={"X-Deadline-Ms": "5000"}).status_code == 200
+
+
+def test_queue_wait_is_not_timed_as_validation(monkeypatch):
+    from fastapi.testclient import TestClient
+    from prometheus_client import REGISTRY
+    import main
+
+    async def slow_acquire(name, deadline_ns=None):
+        await asyncio.sleep(0.2)
+        return 0.2
+
+    monkeypatch.setattr(main.admission, 'acquire', slow_acquire)
+    monkeypatch.setattr(main.admission, 'release', lambda name: None)
+    labels = {'stage': 'validation'}
+    count = REGISTRY.get_sample_value('app_inference_stage_seconds_count', labels) or 0
+    total = REGISTRY.get_sample_value('app_inference_stage_seconds_sum', labels) or 0
+
+    patient = {"age": 65, "gender": 1, "total_bilirubin": 0.7, "direct_bilirubin": 0.1,
+               "alkaline_phosphotase": 187, "alanine_aminotransferase": 16, "aspartate_aminotransferase": 18,
+               "total_proteins": 6.8, "albumin": 3.3, "albumin_globulin_ratio": 0.9}
+    assert TestClient(main.app).post("/predict", json=patient).status_code == 200
+
+    assert REGISTRY.get_sample_value('app_inference_stage_seconds_count', labels) == count + 1
+    assert REGISTRY.get_sample_value('app_inference_stage_seconds_sum', labels) - total < 0.1
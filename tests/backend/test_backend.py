@@ -14,3 +14,87 @@ def test_read_main():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Hello World"}  # Adjust based on your endpoint
+
+SAMPLE_PATIENT = {
+    "age": 65, "gender": 1, "total_bilirubin": 0.7, "direct_bilirubin": 0.1,
+    "alkaline_phosphotase": 187, "alanine_aminotransferase": 16,
+    "aspartate_aminotransferase": 18, "total_proteins": 6.8,
+    "albumin": 3.3, "albumin_globulin_ratio": 0.9
+}
+
+def test_predict_batch_matches_single_predict():
+    single = client.post("/predict", json=SAMPLE_PATIENT).json()
+    bad = dict(SAMPLE_PATIENT, age="not a number")
+    response = client.post("/predict/batch", json={"patients": [SAMPLE_PATIENT, bad]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 1 and body["errors"] == 1
+    assert body["results"][0]["probability"] == pytest.approx(single["probability"], abs=1e-12)
+    assert body["results"][0]["prediction"] == single["prediction"]
+    assert body["results"][1]["error"][0]["field"] == "age"
+
+def test_predict_batch_rejects_oversized_batch(monkeypatch):
+    import main
+    monkeypatch.setattr(main, "MAX_BATCH_SIZE", 1)
+    response = client.post("/predict/batch", json={"patients": [SAMPLE_PATIENT] * 2})
+    assert response.status_code == 413
+    # Rejected during request validation, before the rows themselves are validated
+    assert client.post("/predict/batch", json={"patients": [1, 2]}).status_code == 413
+
+def test_request_metrics_use_route_templates_and_stage_timers():
+    from prometheus_client import REGISTRY
+
+    def sample(name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    stage_before = sample('app_inference_stage_seconds_count', {'stage': 'sigmoid'})
+    client.post("/predict", json=SAMPLE_PATIENT)
+    client.get("/no/such/path/42")
+    assert sample('app_inference_stage_seconds_count', {'stage': 'sigmoid'}) == stage_before + 1
+    assert sample('app_request_count_total', {'method': 'POST', 'endpoint': '/predict', 'http_status': '200'}) >= 1
+    assert sample('app_request_count_total', {'method': 'GET', 'endpoint': 'unmatched', 'http_status': '404'}) >= 1
+    assert sample('app_request_count_total', {'method': 'GET', 'endpoint': '/no/such/path/42', 'http_status': '404'}) == 0
+
+def test_readiness_follows_warm_up_and_shutdown(monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, 'METRICS_PORT', 0)
+    assert client.get("/healthz").status_code == 200
+    assert client.get("/readyz").status_code == 503
+    with TestClient(app) as started:
+        response = started.get("/readyz")
+        assert response.status_code == 200
+        assert response.json()["model_version"] >= 1
+    assert client.get("/readyz").status_code == 503
+
+def test_predict_matrix_matches_json_batch():
+    import numpy as np
+    from binary_format import MATRIX_CONTENT_TYPE, decode_probabilities, encode_matrix
+    from inference import FEATURE_NAMES
+
+    row = [SAMPLE_PATIENT[name] for name in FEATURE_NAMES]
+    X = np.array([row, row, row], dtype=np.float32)
+    X[1, 0] = -5
+    response = client.post("/predict/matrix", content=encode_matrix(X, np.float32),
+                           headers={"Content-Type": MATRIX_CONTENT_TYPE})
+    assert response.status_code == 200
+    assert response.headers["X-Invalid-Rows"] == "1"
+    probabilities = decode_probabilities(response.content)
+    assert probabilities.dtype == np.float32 and np.isnan(probabilities[1])
+    expected = client.post("/predict", json=SAMPLE_PATIENT).json()["probability"]
+    assert abs(probabilities[0] - expected) < 1e-6
+
+    assert client.post("/predict/matrix", json={"rows": []}).status_code == 415
+    assert client.post("/predict/matrix", content=b"LPDX", headers={"Content-Type": MATRIX_CONTENT_TYPE}).status_code == 400
+
+def test_predict_with_shadow_model_serves_primary_and_reports_variant(monkeypatch):
+    import main
+    from model_variants import ModelVariants
+    expected = client.post("/predict", json=SAMPLE_PATIENT).json()
+    _, model = main.model_ref.get()
+    shadow = dict(model, intercept=model['intercept'] + 1)
+    monkeypatch.setattr(main, "model_variants", ModelVariants(main.model_ref, {"shadow": shadow}))
+
+    body = client.post("/predict", json=SAMPLE_PATIENT, headers={"X-Routing-Key": "patient-1"}).json()
+    assert body["model_variant"] == "primary"
+    assert body["probability"] == pytest.approx(expected["probability"], abs=1e-12)
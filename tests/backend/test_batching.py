@@ -0,0 +1,35 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from batching import MicroBatcher
+
+
+def test_micro_batcher_coalesces_and_returns_each_row():
+    batch_sizes = []
+
+    def score(X):
+        batch_sizes.append(len(X))
+        return X.sum(axis=1)
+
+    async def run():
+        batcher = MicroBatcher(score, max_batch_size=4, max_wait_us=1000)
+        return await asyncio.gather(*(batcher.submit([i, i]) for i in range(6)))
+
+    results = asyncio.run(run())
+    assert results == [2 * i for i in range(6)]
+    assert batch_sizes == [4, 2]
+
+
+def test_micro_batcher_propagates_scoring_errors():
+    def score(X):
+        raise ValueError("bad batch")
+
+    async def run():
+        batcher = MicroBatcher(score, max_batch_size=8, max_wait_us=100)
+        return await asyncio.gather(batcher.submit([1.0]), return_exceptions=True)
+
+    [error] = asyncio.run(run())
+    assert isinstance(error, ValueError)
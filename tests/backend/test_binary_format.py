@@ -0,0 +1,40 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from binary_format import decode_matrix, decode_probabilities, encode_matrix, encode_probabilities, valid_rows
+
+ROW = [65, 1, 0.7, 0.1, 187, 16, 18, 6.8, 3.3, 0.9]
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_matrix_round_trip_is_zero_copy(dtype):
+    X = np.array([ROW, ROW], dtype=dtype)
+    decoded = decode_matrix(encode_matrix(X, dtype))
+    assert decoded.dtype == np.dtype(dtype) and not decoded.flags.owndata
+    np.testing.assert_array_equal(decoded, X)
+    probabilities = np.array([0.25, 0.75], dtype=dtype)
+    np.testing.assert_array_equal(decode_probabilities(encode_probabilities(probabilities, dtype)), probabilities)
+
+
+def test_malformed_bodies_are_rejected():
+    body = encode_matrix([ROW])
+    with pytest.raises(ValueError):
+        decode_matrix(body[:-1])
+    with pytest.raises(ValueError):
+        decode_matrix(b'JUNK' + body[4:])
+    with pytest.raises(ValueError):
+        decode_probabilities(body)
+
+
+def test_valid_rows_checks_ranges_and_gender():
+    X = np.array([ROW] * 5, dtype=np.float64)
+    X[1, 0] = 150        # age out of range
+    X[2, 1] = 0.5        # gender not 0/1
+    X[3, 4] = np.nan
+    X[4, 8] = np.inf
+    assert valid_rows(X).tolist() == [True, False, False, False, False]
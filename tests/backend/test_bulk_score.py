@@ -0,0 +1,67 @@
+import csv
+import os
+import sys
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from bulk_score import bulk_score
+from inference import FEATURE_NAMES
+from main import app
+
+client = TestClient(app)
+
+
+def _patients(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.abs(rng.normal([45, 0, 3, 1.5, 290, 80, 110, 6.5, 3.1, 0.95],
+                          [16, 1, 6, 2.8, 240, 180, 280, 1.1, 0.8, 0.3], (n, len(FEATURE_NAMES))))
+    X[:, 1] = rng.integers(0, 2, n)
+    return X
+
+
+def test_csv_scores_equal_predict_endpoint_in_input_order(tmp_path):
+    X = _patients(60)
+    input_path, output_path = tmp_path / 'patients.csv', tmp_path / 'scores.csv'
+    with open(input_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['patient_id'] + FEATURE_NAMES[::-1])  # any column order
+        for i, row in enumerate(X.tolist()):
+            values = [repr(value) for value in row[::-1]]
+            if i == 7:
+                values[2] = 'n/a'
+            elif i == 8:
+                values[-1] = '-5'  # age out of range
+            elif i == 9:
+                values[-2] = '0.5'  # gender not 0 or 1
+            writer.writerow([f'p{i:03d}'] + values)
+
+    stats = bulk_score(str(input_path), str(output_path), workers=2, chunk_size=8, keep=['patient_id'],
+                       verbose=False)
+
+    assert stats['rows'] == 60 and stats['invalid_rows'] == 3
+    with open(output_path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['patient_id'] for row in rows] == [f'p{i:03d}' for i in range(60)]
+    for i in [7, 8, 9]:
+        assert rows[i]['probability'] == '' and rows[i]['prediction'] == ''
+    for i in [0, 1, 13, 31, 59]:
+        expected = client.post("/predict", json=dict(zip(FEATURE_NAMES, X[i].tolist()))).json()
+        # Bit-identical, not just close
+        assert float(rows[i]['probability']) == expected['probability']
+        assert int(rows[i]['prediction']) == expected['prediction']
+
+
+def test_npy_input_matches_csv_input(tmp_path):
+    X = _patients(25, seed=1)
+    np.save(tmp_path / 'patients.npy', X)
+    np.savetxt(tmp_path / 'patients.csv', X, delimiter=',', fmt='%.17g', header=','.join(FEATURE_NAMES), comments='')
+
+    bulk_score(str(tmp_path / 'patients.npy'), str(tmp_path / 'from_npy.csv'), workers=1, chunk_size=10,
+               verbose=False)
+    bulk_score(str(tmp_path / 'patients.csv'), str(tmp_path / 'from_csv.csv'), workers=1, chunk_size=4,
+               verbose=False)
+
+    assert (tmp_path / 'from_npy.csv').read_text() == (tmp_path / 'from_csv.csv').read_text()
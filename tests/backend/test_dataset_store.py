@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from dataset_store import DatasetStore
+
+
+def make_columns(start, rows):
+    values = np.arange(start, start + rows, dtype=float)
+    return {'age': values, 'result': values % 2}
+
+
+def test_store_builds_once_appends_segments_and_compacts(tmp_path):
+    source = tmp_path / 'data.csv'
+    source.write_text('age,result\n')
+    calls = []
+
+    def loader(path):
+        calls.append(path)
+        return make_columns(0, 5)
+
+    store = DatasetStore.for_source(str(tmp_path / 'cache'), str(source), loader, max_segments=2)
+    assert isinstance(store.read('base')['age'], np.memmap)
+    DatasetStore.for_source(str(tmp_path / 'cache'), str(source), loader)
+    assert len(calls) == 1
+
+    store.append(make_columns(5, 2), feedback_offset=10)
+    store.append(make_columns(7, 2), feedback_offset=20)
+    assert len(store.segments('feedback')) == 2
+    store.append(make_columns(9, 1), feedback_offset=30)
+    # Third feedback segment goes over max_segments and triggers compaction
+    assert len(store.segments('feedback')) == 1
+
+    reopened = DatasetStore(store.root)
+    assert reopened.feedback_offset == 30
+    np.testing.assert_array_equal(reopened.read('feedback')['age'], np.arange(5, 10))
+    np.testing.assert_array_equal(reopened.read()['age'], np.arange(10))
+
+    # A changed source gets its own store
+    source.write_text('age,result\n1,1\n')
+    DatasetStore.for_source(str(tmp_path / 'cache'), str(source), loader)
+    assert len(calls) == 2
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from drift import (FEATURE_COUNT, FEATURE_MEAN_SHIFT, FEATURE_ZSCORE_NEGATIVE, FEATURE_ZSCORE_POSITIVE, Z_EDGES,
+                   DriftMonitor, StreamingHistogram)
+from inference import FEATURE_NAMES
+from model_registry import ModelRef
+
+
+def test_histogram_matches_numpy_and_merges():
+    values = np.random.default_rng(0).standard_normal((1000, 3)) * 2
+    whole = StreamingHistogram(3, Z_EDGES)
+    whole.update(values)
+    parts = StreamingHistogram(3, Z_EDGES)
+    for chunk in np.array_split(values, 7):
+        part = StreamingHistogram(3, Z_EDGES)
+        part.update(chunk)
+        parts.merge(part)
+
+    edges = np.r_[-np.inf, Z_EDGES, np.inf]
+    for j in range(3):
+        np.testing.assert_array_equal(whole.counts[j], np.histogram(values[:, j], edges)[0])
+    np.testing.assert_array_equal(parts.counts, whole.counts)
+    np.testing.assert_allclose(parts.mean, values.mean(axis=0))
+    np.testing.assert_allclose(parts.std, values.std(axis=0))
+
+
+def test_monitor_compares_inputs_with_model_reference():
+    model = {'coef': np.zeros(10), 'intercept': 0.0, 'mean': np.full(10, 10.0), 'std': np.full(10, 2.0)}
+    monitor = DriftMonitor(ModelRef(model), row_buffer_size=4)
+    X = 10 + 2 * np.random.default_rng(1).standard_normal((500, 10))
+    X[:, 0] += 3  # age drifted by 1.5 training standard deviations
+    monitor.observe(X[:-3], np.full(497, 0.5))
+    for row in X[-3:]:
+        monitor.observe_row(row.tolist(), 0.5)
+    assert monitor.features.count == 497
+
+    before = FEATURE_COUNT.labels('age')._value.get()
+    monitor.export()
+    assert FEATURE_COUNT.labels('age')._value.get() - before == 500
+    assert abs(FEATURE_MEAN_SHIFT.labels('age')._value.get() - 1.5) < 0.2
+    assert abs(FEATURE_MEAN_SHIFT.labels(FEATURE_NAMES[1])._value.get()) < 0.2
+    assert monitor.predictions.counts.sum() == 500
+
+
+def test_negative_shift_is_exported_as_two_growing_counters():
+    model = {'coef': np.zeros(10), 'intercept': 0.0, 'mean': np.full(10, 10.0), 'std': np.full(10, 2.0)}
+    monitor = DriftMonitor(ModelRef(model))
+    name = FEATURE_NAMES[2]
+    counters = (FEATURE_ZSCORE_POSITIVE.labels(name), FEATURE_ZSCORE_NEGATIVE.labels(name), FEATURE_COUNT.labels(name))
+    rng = np.random.default_rng(2)
+
+    for shift in (-3.0, -3.0):  # 1.5 training standard deviations down, exported twice
+        before = [counter._value.get() for counter in counters]
+        X = 10 + 2 * rng.standard_normal((1000, 10))
+        X[:, 2] += shift
+        monitor.observe(X, np.full(1000, 0.5))
+        monitor.export()
+        positive, negative, count = [counter._value.get() - b for counter, b in zip(counters, before)]
+        assert positive >= 0 and negative >= 0 and count == 1000
+        assert abs((positive - negative) / count + 1.5) < 0.2
+    assert abs(FEATURE_MEAN_SHIFT.labels(name)._value.get() + 1.5) < 0.2
@@ -0,0 +1,55 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from evaluation import EvaluationAccumulator, ModelRejected, check_gate, evaluate_probabilities, roc_auc
+
+
+def make_scores(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    y = rng.integers(0, 2, n)
+    probabilities = 1 / (1 + np.exp(-(1.5 * y - 0.75 + rng.standard_normal(n))))
+    return probabilities, y
+
+
+def test_chunked_report_matches_in_memory_metrics():
+    probabilities, y = make_scores()
+    accumulator = EvaluationAccumulator()
+    for p_chunk, y_chunk in zip(np.array_split(probabilities, 9), np.array_split(y, 9)):
+        accumulator.update(p_chunk, y_chunk)
+    report = accumulator.report()
+    whole = evaluate_probabilities(probabilities, y)
+    assert report['confusion_matrix'] == whole['confusion_matrix'] and report['roc_auc'] == whole['roc_auc']
+    assert report['log_loss'] == pytest.approx(whole['log_loss'])
+    assert report['expected_calibration_error'] == pytest.approx(whole['expected_calibration_error'])
+
+    predicted = probabilities >= 0.5
+    assert report['accuracy'] == pytest.approx(np.mean(predicted == y))
+    assert report['confusion_matrix']['fp'] == np.sum(predicted & (y == 0))
+    expected_log_loss = -np.mean(y * np.log(probabilities) + (1 - y) * np.log(1 - probabilities))
+    assert report['log_loss'] == pytest.approx(expected_log_loss)
+    assert sum(b['rows'] for b in report['calibration']) == len(y)
+    assert report['roc_auc'] == pytest.approx(roc_auc(probabilities, y), abs=1e-4)
+
+
+def test_exact_auc_matches_pair_count_with_ties():
+    probabilities = np.round(make_scores(300, seed=1)[0], 1)
+    y = make_scores(300, seed=1)[1]
+    positives, negatives = probabilities[y == 1], probabilities[y == 0]
+    wins = (positives[:, None] > negatives[None, :]).sum() + 0.5 * (positives[:, None] == negatives[None, :]).sum()
+    assert roc_auc(probabilities, y) == pytest.approx(wins / (len(positives) * len(negatives)))
+
+
+def test_gate_rejects_regressions_beyond_tolerance():
+    reports = {'candidate': {'roc_auc': 0.70, 'log_loss': 0.50}, 'current': {'roc_auc': 0.72, 'log_loss': 0.51}}
+    check_gate(reports, 'log_loss', 0.0)
+    check_gate(reports, 'roc_auc', 0.05)
+    with pytest.raises(ModelRejected) as excinfo:
+        check_gate(reports, 'roc_auc', 0.005)
+    # Survives the trip back from the trainer process
+    assert pickle.loads(pickle.dumps(excinfo.value)).reports == reports
@@ -0,0 +1,31 @@
+import asyncio
+import csv
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from feedback_sink import FeedbackSink
+
+
+def test_feedback_sink_buffers_and_drains_on_shutdown(tmp_path):
+    path = str(tmp_path / 'feedback' / 'train.csv')
+    sink = FeedbackSink(path, fieldnames=['age', 'actual_result'], flush_size=2, flush_interval=60)
+
+    async def run():
+        sink.start()
+        for i in range(5):
+            assert sink.put({'age': i, 'actual_result': i % 2})
+        await sink.drain()
+
+    asyncio.run(run())
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['age'] for row in rows] == ['0', '1', '2', '3', '4']
+    assert len(sink) == 0
+
+
+def test_feedback_sink_rejects_when_full(tmp_path):
+    sink = FeedbackSink(str(tmp_path / 'train.csv'), fieldnames=['age'], capacity=1)
+    assert sink.put({'age': 1})
+    assert not sink.put({'age': 2})
@@ -0,0 +1,55 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from inference import (PRECISION_TOLERANCE, check_equivalence, compile_model, load_compiled, predict_proba,
+                       predict_proba_compiled, save_compiled)
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '../../backend/models/logistic_model.pkl')
+
+
+@pytest.fixture
+def model():
+    with open(MODEL_PATH, 'rb') as f:
+        return pickle.load(f)
+
+
+def test_compiled_artifact_round_trip_matches_original(model, tmp_path):
+    compiled = compile_model(model)
+    assert check_equivalence(model, compiled) < 1e-12
+
+    path = str(tmp_path / 'model.bin')
+    save_compiled(compiled, path)
+    loaded = load_compiled(path)
+
+    X = model['mean'] + model['std'] * np.random.default_rng(1).standard_normal((50, 10))
+    np.testing.assert_allclose(predict_proba_compiled(loaded, X), predict_proba(model, X), atol=1e-12)
+
+
+def test_float32_artifact_is_half_size_and_within_tolerance(model, tmp_path):
+    compiled = compile_model(model, 'float32')
+    assert check_equivalence(model, compiled) <= PRECISION_TOLERANCE['float32']
+
+    path32, path64 = str(tmp_path / 'model32.bin'), str(tmp_path / 'model64.bin')
+    save_compiled(compiled, path32)
+    save_compiled(compile_model(model, 'float64'), path64)
+    assert os.path.getsize(path32) < os.path.getsize(path64)
+    loaded = load_compiled(path32)
+    assert loaded['coef'].dtype == np.float32
+
+    X = model['mean'] + model['std'] * np.random.default_rng(1).standard_normal((50, 10))
+    probabilities = predict_proba_compiled(loaded, X)
+    assert probabilities.dtype == np.float32
+    np.testing.assert_allclose(probabilities, predict_proba(model, X), atol=PRECISION_TOLERANCE['float32'])
+
+
+def test_load_compiled_rejects_other_files(tmp_path):
+    path = tmp_path / 'model.bin'
+    path.write_bytes(b'nope' + bytes(16))
+    with pytest.raises(ValueError):
+        load_compiled(str(path))
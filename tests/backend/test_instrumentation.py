@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from prometheus_client import CollectorRegistry, Histogram
+
+from instrumentation import NULL_TIMER, StageTimer, sampled
+
+
+def test_stage_timer_records_each_lap():
+    registry = CollectorRegistry()
+    histogram = Histogram('test_stage_seconds', 'test', ['stage'], registry=registry)
+    timer = StageTimer(histogram)
+    timer.lap('validation')
+    timer.lap('sigmoid')
+    timer.lap('sigmoid')
+    assert registry.get_sample_value('test_stage_seconds_count', {'stage': 'validation'}) == 1
+    assert registry.get_sample_value('test_stage_seconds_count', {'stage': 'sigmoid'}) == 2
+
+
+def test_sample_rate_switch():
+    assert sampled(1.0)
+    assert not any(sampled(0.0) for _ in range(100))
+    assert 0 < sum(sampled(0.5) for _ in range(1000)) < 1000
+    NULL_TIMER.lap('anything')
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from inference import load_compiled, save_compiled
+from model_registry import ModelFileWatcher, ModelRef
+
+
+def make_compiled(intercept):
+    return {'coef': np.arange(10, dtype=np.float64), 'intercept': intercept,
+            'mean': np.zeros(10), 'std': np.ones(10)}
+
+
+def test_watcher_publishes_replaced_artifact_once(tmp_path):
+    path = str(tmp_path / 'logistic_model.bin')
+    save_compiled(make_compiled(0.5), path)
+    model_ref = ModelRef(load_compiled(path))
+    watcher = ModelFileWatcher(model_ref, path, load_compiled, interval=0.01)
+
+    assert watcher.check() is None
+    save_compiled(make_compiled(1.5), path)
+    assert watcher.check() == 2
+    assert watcher.check() is None
+    assert model_ref.get()[1]['intercept'] == 1.5
+
+
+def test_retrainer_hook_serves_artifact_without_double_publish(tmp_path):
+    path = str(tmp_path / 'logistic_model.bin')
+    save_compiled(make_compiled(0.5), path)
+    model_ref = ModelRef(load_compiled(path))
+    watcher = ModelFileWatcher(model_ref, path, load_compiled)
+
+    # What a trainer job does: write the artifact, then hand back its in-memory copy
+    retrained = make_compiled(2.5)
+    save_compiled(retrained, path)
+    assert watcher.publish(retrained) == 2
+    # The periodic check in the same worker sees nothing new
+    assert watcher.check() is None
+    version, model = model_ref.get()
+    assert version == 2 and isinstance(model['coef'], np.memmap)
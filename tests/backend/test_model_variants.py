@@ -0,0 +1,81 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from inference import load_serving_model, predict_proba_compiled
+from model_registry import ModelRef
+from model_variants import MODEL_AGREEMENT, ModelVariants, artifact_version, parse_pairs
+
+
+def make_compiled(seed):
+    rng = np.random.default_rng(seed)
+    return {'coef': rng.standard_normal(10) * 0.1, 'intercept': float(rng.standard_normal()),
+            'mean': np.zeros(10), 'std': np.ones(10)}
+
+
+def test_stacked_scores_match_each_model_and_follow_retrains():
+    primary, candidate, shadow = make_compiled(0), make_compiled(1), make_compiled(2)
+    model_ref = ModelRef(primary)
+    variants = ModelVariants(model_ref, {'candidate': candidate, 'shadow': shadow}, {'primary': 1, 'candidate': 1})
+    assert variants.shadows == ['shadow']
+
+    X = np.random.default_rng(3).standard_normal((25, 10))
+    version, probabilities = variants.score(X)
+    assert version == 1 and probabilities.shape == (25, 3)
+    for j, model in enumerate([primary, candidate, shadow]):
+        np.testing.assert_allclose(probabilities[:, j], predict_proba_compiled(model, X), atol=1e-12)
+
+    retrained = make_compiled(4)
+    model_ref.publish(retrained)
+    version, probabilities = variants.score(X)
+    assert version == 2
+    np.testing.assert_allclose(probabilities[:, 0], predict_proba_compiled(retrained, X), atol=1e-12)
+
+
+def test_every_column_is_bit_identical_to_scoring_the_model_alone_at_any_batch_size():
+    served = load_serving_model(os.path.join(os.path.dirname(__file__), '../../backend/models/logistic_model.pkl'))
+    candidate = dict(served, coef=served['coef'] * 1.1)
+    variants = ModelVariants(ModelRef(served), {'candidate': candidate})
+    rng = np.random.default_rng(0)
+    X = np.abs(served['mean'] + served['std'] * rng.standard_normal((500, 10)))
+
+    _, batched = variants.score(X)
+    single = np.concatenate([variants.score(row)[1] for row in X.tolist()])
+    for j, model in enumerate([served, candidate]):
+        expected = predict_proba_compiled(model, X)
+        assert np.array_equal(batched[:, j], expected)
+        assert np.array_equal(single[:, j], expected)
+
+
+def test_extra_models_are_versioned_by_content():
+    candidate = make_compiled(1)
+    variants = ModelVariants(ModelRef(make_compiled(0)), {'a': candidate, 'b': dict(candidate), 'c': make_compiled(2)})
+
+    primary_version, a, b, c = variants.versions(7)
+    assert primary_version == 7
+    assert a == b == artifact_version(candidate) and a != c and len(a) == 12
+
+
+def test_routing_is_sticky_per_key_and_follows_weights():
+    variants = ModelVariants(ModelRef(make_compiled(0)), {'candidate': make_compiled(1), 'shadow': make_compiled(2)},
+                             parse_pairs('primary=80, candidate=20'))
+    assert all(variants.route('patient-7') == variants.route('patient-7') for _ in range(10))
+    served = np.array([variants.route(f'patient-{i}') for i in range(5000)])
+    # The shadow never serves
+    assert set(served.tolist()) == {0, 1}
+    assert np.mean(served == 1) == pytest.approx(0.2, abs=0.03)
+
+    with pytest.raises(ValueError):
+        ModelVariants(ModelRef(make_compiled(0)), {}, {'unknown': 1})
+
+
+def test_record_counts_agreement_with_served_model():
+    variants = ModelVariants(ModelRef(make_compiled(0)), {'candidate': make_compiled(1)})
+    probabilities = np.array([[0.9, 0.8], [0.2, 0.7], [0.4, 0.1]])
+    before = MODEL_AGREEMENT.labels('candidate', 'primary', 'disagree')._value.get()
+    variants.record(0, probabilities)
+    assert MODEL_AGREEMENT.labels('candidate', 'primary', 'disagree')._value.get() - before == 1
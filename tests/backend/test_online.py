@@ -0,0 +1,45 @@
+import csv
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from inference import FEATURE_NAMES
+from ml_final_project import train
+from online import update_from_feedback, warm_start_weights
+from running_stats import RunningStats
+
+
+def test_running_stats_match_full_recompute():
+    X = np.random.default_rng(0).standard_normal((1000, 4)) * [1, 2, 3, 4] + [5, 0, -1, 2]
+    stats = RunningStats.from_array(X[:10])
+    for start in range(10, 1000, 97):
+        stats.update(X[start:start + 97])
+    other = RunningStats.from_array(X[:500])
+    other.merge(RunningStats.from_array(X[500:]))
+
+    for s in (stats, other):
+        assert s.count == 1000
+        np.testing.assert_allclose(s.mean, X.mean(axis=0))
+        np.testing.assert_allclose(s.covariance, np.cov(X, rowvar=False))
+
+
+def test_online_update_consumes_only_new_feedback(tmp_path):
+    result = train(model_dir=str(tmp_path), cache=False, solver='newton', lambda_=0, verbose=False)
+    model = result['model']
+    np.testing.assert_allclose(
+        warm_start_weights(model, model['mean'], model['std'], model['eigenvectors']), model['weights'], atol=1e-10)
+
+    feedback_path = str(tmp_path / 'feedback.csv')
+    rows = np.random.default_rng(1).standard_normal((20, 10)) * model['std'] + model['mean']
+    with open(feedback_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(FEATURE_NAMES + ['actual_result'])
+        writer.writerows(np.c_[rows, np.arange(20) % 2].tolist())
+
+    compiled = update_from_feedback(feedback_path, result['model_path'])
+    assert compiled is not None and np.all(np.isfinite(compiled['coef']))
+    # Nothing new appended since the last update
+    assert update_from_feedback(feedback_path, result['model_path']) is None
@@ -0,0 +1,57 @@
+import csv
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from inference import FEATURE_NAMES
+from ml_final_project import find_outliers_iqr, outlier_bounds, prepare_data
+from out_of_core import OrderStatistics, _bounds, _quartile_ranks, prepare_data_chunked
+
+
+def write_feedback(path, rows=37):
+    X = np.random.default_rng(2).lognormal(size=(rows, 10)) * 20
+    X[:, FEATURE_NAMES.index('gender')] = np.arange(rows) % 2
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(FEATURE_NAMES + ['actual_result'])
+        writer.writerows(np.c_[X, np.arange(rows) % 2].tolist())
+
+
+def test_streamed_quartiles_match_sorting():
+    rng = np.random.default_rng(0)
+    for n in (1, 2, 7, 1000, 1001):
+        data = np.round(rng.lognormal(size=(n, 3)), 1)  # rounded, so there are ties
+        order = OrderStatistics(data.min(axis=0), data.max(axis=0), _quartile_ranks(n), bins=16)
+        for chunk in np.array_split(data, 5):
+            order.add_to_histogram(chunk)
+        for chunk in np.array_split(data, 5):
+            order.add_candidates(chunk)
+        bounds, (lower, upper) = _bounds(order, n)
+
+        for got, expected in zip(bounds, outlier_bounds(data)):
+            np.testing.assert_array_equal(got, expected)
+        np.testing.assert_array_equal((data < lower) | (data > upper), find_outliers_iqr(data))
+
+
+def test_chunked_preparation_matches_in_memory(tmp_path):
+    feedback_path = str(tmp_path / 'feedback.csv')
+    write_feedback(feedback_path)
+    expected = prepare_data(feedback_path=feedback_path, cache=False)
+
+    for cache in (False, True):
+        timings = {}
+        data = prepare_data_chunked(feedback_path=feedback_path, timings=timings, chunk_size=50,
+                                    cache=cache, cache_dir=str(tmp_path / 'cache'))
+        assert set(timings) == {'load', 'impute', 'scale', 'eig', 'project'}
+        assert data['n_components'] == expected['n_components']
+        assert data['outlier_counts'] == expected['outlier_counts']
+        assert data['state']['feedback_offset'] == expected['state']['feedback_offset']
+        for got, want in zip(data['state']['bounds'], expected['state']['bounds']):
+            np.testing.assert_array_equal(got, want)
+        for key in ('mean', 'std', 'eigenvalues', 'eigenvectors', 'X_train', 'X_test'):
+            np.testing.assert_allclose(data[key], expected[key], atol=1e-9, err_msg=key)
+        np.testing.assert_array_equal(data['y_train'], expected['y_train'])
+        np.testing.assert_array_equal(data['y_test'], expected['y_test'])
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from prediction_cache import PredictionCache
+
+
+def test_cache_is_lru_bounded_and_invalidated_by_new_model_version():
+    cache = PredictionCache(maxsize=2)
+    a, b, c = (cache.key([x, 1.0]) for x in (1.0, 2.0, 3.0))
+    assert cache.key([-0.0, 1]) == cache.key([0.0, 1.0])
+
+    cache.put(1, a, 0.1)
+    cache.put(1, b, 0.2)
+    assert cache.get(1, a) == 0.1
+    cache.put(1, c, 0.3)
+    # b was least recently used
+    assert cache.get(1, b) is None
+    assert len(cache) == 2 and cache.memory_bytes() > 0
+
+    # A newer model drops every entry, a late put from the old model is ignored
+    assert cache.get(2, a) is None
+    cache.put(1, a, 0.1)
+    assert len(cache) == 0
+
+
+def test_cache_entries_expire_after_ttl(monkeypatch):
+    import prediction_cache
+    now = [100.0]
+    monkeypatch.setattr(prediction_cache.time, 'monotonic', lambda: now[0])
+    cache = PredictionCache(maxsize=10, ttl=5)
+    key = cache.key([1.0])
+    cache.put(1, key, 0.5)
+    assert cache.get(1, key) == 0.5
+    now[0] += 6
+    assert cache.get(1, key) is None
@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from model_registry import ModelRef
+from retraining import Retrainer
+
+
+def test_retrainer_publishes_new_version_and_coalesces_triggers():
+    model_ref = ModelRef({'name': 'initial'})
+    runs = []
+
+    def job():
+        runs.append(len(runs))
+        return {'name': f'retrained-{len(runs)}'}
+
+    async def run():
+        retrainer = Retrainer(model_ref, job, executor=ThreadPoolExecutor(max_workers=1))
+        assert retrainer.trigger()
+        assert not retrainer.trigger()
+        assert not retrainer.trigger()
+        await retrainer.wait()
+        await retrainer.close()
+
+    asyncio.run(run())
+    # One run plus a single coalesced follow-up
+    assert len(runs) == 2
+    assert model_ref.get() == (3, {'name': 'retrained-2'})
+
+
+def test_failed_retrain_keeps_serving_model():
+    model_ref = ModelRef({'name': 'initial'})
+
+    def job():
+        raise RuntimeError("training blew up")
+
+    async def run():
+        retrainer = Retrainer(model_ref, job, executor=ThreadPoolExecutor(max_workers=1))
+        retrainer.trigger()
+        await retrainer.close()
+
+    asyncio.run(run())
+    assert model_ref.get() == (1, {'name': 'initial'})
+
+
+def test_rejected_retrain_keeps_serving_model_and_exports_evaluation():
+    from evaluation import EVALUATION_METRIC, ModelRejected
+    from retraining import RETRAIN_RUNS
+
+    model_ref = ModelRef({'name': 'initial'})
+    report = {'seconds': 0.01, 'accuracy': 0.7, 'roc_auc': 0.6, 'log_loss': 0.6, 'expected_calibration_error': 0.1}
+
+    def job():
+        raise ModelRejected("worse", {'candidate': report, 'current': dict(report, roc_auc=0.7)})
+
+    async def run():
+        retrainer = Retrainer(model_ref, job, executor=ThreadPoolExecutor(max_workers=1))
+        retrainer.trigger()
+        await retrainer.close()
+
+    before = RETRAIN_RUNS.labels('rejected')._value.get()
+    asyncio.run(run())
+    assert model_ref.get() == (1, {'name': 'initial'})
+    assert RETRAIN_RUNS.labels('rejected')._value.get() - before == 1
+    assert EVALUATION_METRIC.labels('candidate', 'roc_auc')._value.get() == 0.6
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from solvers import compute_cost, compute_cost_l1, fit_logistic
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((2000, 5))
+    logits = X @ np.array([1.5, -2.0, 0.0, 0.5, 0.0]) + 0.3
+    y = (rng.random(2000) < 1 / (1 + np.exp(-logits))).astype(float)
+    return X, y, np.c_[np.ones(len(X)), X], y.reshape(-1, 1)
+
+
+def test_newton_reaches_lower_loss_than_fixed_gradient_descent(data):
+    X, y, Xb, yb = data
+    gd_weights, gd_history = fit_logistic(X, y, solver='gd')
+    newton_weights, newton_history = fit_logistic(X, y, solver='newton')
+    assert len(newton_history) < 25 and len(gd_history) == 1000
+    assert compute_cost(Xb, yb, newton_weights).item() < compute_cost(Xb, yb, gd_weights).item()
+
+
+def test_proximal_l1_converges_and_zeroes_irrelevant_weights(data):
+    X, y, Xb, yb = data
+    gd_weights, _ = fit_logistic(X, y, solver='gd', lambda_=0.05)
+    weights, _ = fit_logistic(X, y, solver='proximal_l1', lambda_=0.05)
+    assert compute_cost_l1(Xb, yb, weights, 0.05).item() < compute_cost_l1(Xb, yb, gd_weights, 0.05).item()
+    assert weights[3, 0] == 0 and weights[5, 0] == 0
+
+
+def test_warm_start_and_cost_every(data):
+    X, y, _, _ = data
+    weights, _ = fit_logistic(X, y, solver='newton')
+    warm_weights, history = fit_logistic(X, y, solver='newton', weights=weights, cost_every=1)
+    assert len(history) == 1
+    np.testing.assert_allclose(warm_weights, weights, atol=1e-8)
+
+    _, history = fit_logistic(X, y, solver='gd', iterations=100, cost_every=25)
+    assert len(history) == 4
+
+    with pytest.raises(ValueError):
+        fit_logistic(X, y, solver='newton', weights=np.zeros(3))
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from inference import load_serving_model, predict_proba, predict_proba_compiled
+from ml_final_project import impute_outliers_with_median, train
+
+
+def impute_one_column(data):
+    # Per-column reference implementation from the original notebook
+    data_sorted = sorted(data)
+    n = len(data)
+    median = (data_sorted[n // 2 - 1] + data_sorted[n // 2]) / 2 if n % 2 == 0 else data_sorted[n // 2]
+    q1 = data_sorted[(n + 1) // 4 - 1]
+    q3 = data_sorted[3 * (n + 1) // 4 - 1]
+    iqr = q3 - q1
+    return [x if q1 - 1.5 * iqr <= x <= q3 + 1.5 * iqr else median for x in data]
+
+
+def test_vectorized_imputation_matches_per_column_version():
+    data = np.random.default_rng(0).lognormal(size=(501, 4))
+    expected = np.column_stack([impute_one_column(data[:, j].tolist()) for j in range(data.shape[1])])
+    np.testing.assert_array_equal(impute_outliers_with_median(data), expected)
+
+
+def test_train_writes_model_main_can_load(tmp_path):
+    result = train(model_dir=str(tmp_path), cache_dir=str(tmp_path / 'cache'), iterations=20, verbose=False)
+    model = result['model']
+    assert model['mean'].shape == (10,) and model['std'].shape == (10,)
+    assert model['eigenvectors'].shape == (10, model['n_components'])
+    assert model['weights'].shape == (model['n_components'] + 1, 1)
+    assert set(result['timings']) >= {'load', 'impute', 'scale', 'eig', 'project', 'solve'}
+
+    served = load_serving_model(result['model_path'])
+    X = model['mean'] + model['std'] * np.random.default_rng(1).standard_normal((20, 10))
+    np.testing.assert_allclose(predict_proba_compiled(served, X), predict_proba(model, X), atol=1e-12)
+
+
+def test_float32_training_matches_float64(tmp_path):
+    kwargs = dict(cache_dir=str(tmp_path / 'cache'), iterations=200, save=False, verbose=False, cost_every=0)
+    result64 = train(precision='float64', **kwargs)
+    result32 = train(precision='float32', **kwargs)
+    assert result32['compiled']['coef'].dtype == np.float32
+    assert result32['model']['weights'].dtype == np.float64
+    np.testing.assert_allclose(result32['model']['weights'], result64['model']['weights'], atol=1e-4)
+    assert abs(result32['accuracy'] - result64['accuracy']) < 0.5
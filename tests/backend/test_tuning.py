@@ -0,0 +1,77 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../backend/src')))
+
+from inference import load_serving_model
+from ml_final_project import preprocess_split
+from solvers import gradient_descent, gradient_descent_l1
+import tuning
+from tuning import cross_validate, fit_grid, param_grid, tune
+
+
+def test_batched_grid_matches_one_run_per_configuration():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((200, 4))
+    y = (X @ [1.0, -2.0, 0.5, 0.0] + rng.standard_normal(200) > 0).astype(float)
+    grid = param_grid([0.05, 0.2], [0.0, 0.01, 0.05])
+
+    weights = fit_grid(X, y, grid, iterations=100)
+
+    X_bias, y_column = np.c_[np.ones((200, 1)), X], y.reshape(-1, 1)
+    for k, config in enumerate(grid):
+        if config['lambda_']:
+            expected, _ = gradient_descent_l1(X_bias, y_column, np.zeros((5, 1)), config['learning_rate'], 100,
+                                              config['lambda_'], cost_every=0)
+        else:
+            expected, _ = gradient_descent(X_bias, y_column, np.zeros((5, 1)), config['learning_rate'], 100,
+                                           cost_every=0)
+        np.testing.assert_allclose(weights[:, k], expected.ravel(), atol=1e-10)
+
+
+def test_batched_grid_stops_each_configuration_at_its_own_tolerance():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((200, 4))
+    y = (X @ [1.0, -2.0, 0.5, 0.0] + rng.standard_normal(200) > 0).astype(float)
+    # The large learning rate converges long before the small one
+    grid = param_grid([0.01, 1.0], [0.0])
+
+    weights = fit_grid(X, y, grid, iterations=2000, tol=1e-4)
+
+    X_bias, y_column = np.c_[np.ones((200, 1)), X], y.reshape(-1, 1)
+    for k, config in enumerate(grid):
+        expected, _ = gradient_descent(X_bias, y_column, np.zeros((5, 1)), config['learning_rate'], 2000,
+                                       cost_every=0, tol=1e-4)
+        np.testing.assert_allclose(weights[:, k], expected.ravel(), atol=1e-10)
+
+
+def test_each_fold_fits_its_preprocessing_on_its_training_rows_only(monkeypatch):
+    rng = np.random.default_rng(1)
+    X = rng.random((120, 10)) + np.arange(120)[:, None]  # row i is told apart by its offset
+    y = (rng.random(120) > 0.5).astype(float)
+    fitted_on = []
+
+    def spy(X_train, X_test, timings=None):
+        fitted_on.append((np.floor(X_train[:, 0]), np.floor(X_test[:, 0])))
+        return preprocess_split(X_train, X_test, timings)
+
+    monkeypatch.setattr(tuning, 'preprocess_split', spy)
+    accuracy, _ = cross_validate(X, y, param_grid([0.1], [0.0]), folds=4, iterations=5, workers=1)
+
+    assert accuracy.shape == (4, 1) and len(fitted_on) == 4
+    for train_rows, validation_rows in fitted_on:
+        assert len(train_rows) == 90 and not set(train_rows) & set(validation_rows)
+
+
+def test_tune_ranks_grid_and_saves_best_model(tmp_path):
+    tuned = tune(model_dir=str(tmp_path), cache_dir=str(tmp_path / 'cache'), learning_rates=[0.05, 0.1],
+                 lambdas=[0.0, 0.009], iterations=30, folds=3, workers=2, verbose=False)
+
+    table = tuned['table']
+    assert [row['rank'] for row in table] == [1, 2, 3, 4]
+    assert all(a['cv_accuracy'] >= b['cv_accuracy'] for a, b in zip(table, table[1:]))
+    model = tuned['result']['model']
+    served = load_serving_model(tuned['result']['model_path'])
+    assert served['coef'].shape == (10,) and model['weights'].shape == (model['n_components'] + 1, 1)
@@ -0,0 +1,183 @@
+import sys
+import os
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../frontend')))
+
+from backend_client import BackendClient, BackendUnavailable, CircuitBreaker
+
+
+class FakeSession:
+    """Stands in for requests.Session, replaying a list of responses/exceptions"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        status_code, headers = outcome if isinstance(outcome, tuple) else (outcome, {})
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers)
+        return response
+
+
+def make_client(outcomes, **kwargs):
+    client = BackendClient('http://backend:8000', backoff=0, **kwargs)
+    client.session = FakeSession(outcomes)
+    return client
+
+
+def connect_failure():
+    from urllib3.exceptions import MaxRetryError, NewConnectionError
+    return requests.exceptions.ConnectionError(
+        MaxRetryError(None, '/predict', NewConnectionError(None, 'Connection refused')))
+
+
+def test_retries_connection_errors_then_succeeds():
+    client = make_client([connect_failure(), 200], retries=2)
+    assert client.post('/predict', json={}).status_code == 200
+    assert client.session.calls == 2
+
+
+def test_read_timeouts_only_retried_for_idempotent_calls():
+    client = make_client([requests.exceptions.ReadTimeout()], retries=2)
+    with pytest.raises(BackendUnavailable):
+        client.post('/feedback', json={})
+    assert client.session.calls == 1
+
+    client = make_client([requests.exceptions.ReadTimeout(), 503, 200], retries=2)
+    assert client.post('/predict', json={}, idempotent=True).status_code == 200
+
+
+def test_circuit_breaker_fails_fast_after_repeated_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client = make_client([requests.exceptions.ConnectionError()] * 2, retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(BackendUnavailable):
+            client.post('/predict', json={})
+    with pytest.raises(BackendUnavailable, match="circuit breaker"):
+        client.post('/predict', json={})
+    assert client.session.calls == 2
+
+
+def test_waiting_for_a_pooled_connection_is_bounded_and_counts_as_failure():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client = make_client([200], pool_size=1, pool_timeout=0.01, breaker=breaker)
+    client._slots.acquire()  # every connection busy in another thread
+    with pytest.raises(BackendUnavailable, match="No backend connection free"):
+        client.post('/predict', json={})
+    assert client.session.calls == 0 and breaker.is_open
+
+    client._slots.release()
+    breaker.record_success()
+    assert client.post('/predict', json={}).status_code == 200
+
+
+def test_connection_reuse_is_tracked_per_request_under_concurrency():
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.send_response(200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = BackendClient(f'http://127.0.0.1:{server.server_port}', pool_size=4)
+        responses = []
+
+        def worker():
+            for _ in range(5):
+                responses.append(client.post('/predict', json={}))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    pools = client._adapter.poolmanager.pools
+    opened = sum(pools[key].num_connections for key in pools.keys())
+    assert len(responses) == 20
+    assert sum(not response.connection_reused for response in responses) == opened
+
+
+def test_non_idempotent_call_is_not_resent_when_a_reused_connection_drops():
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+
+        def do_POST(self):
+            received.append(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if len(received) > 1:
+                # The feedback row was received, then the connection drops before the response
+                self.close_connection = True
+                return
+            self.send_response(200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'{}')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = BackendClient(f'http://127.0.0.1:{server.server_port}', backoff=0, retries=2)
+        assert client.post('/feedback', json={'age': 1}).status_code == 200
+        with pytest.raises(BackendUnavailable):
+            client.post('/feedback', json={'age': 2})
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert len(received) == 2
+
+
+def test_load_shed_is_retried_after_retry_after_and_not_counted_by_breaker(monkeypatch):
+    import backend_client
+    sleeps = []
+    monkeypatch.setattr(backend_client.time, 'sleep', sleeps.append)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    shed = (503, {'Retry-After': '1', 'X-Load-Shed': 'queue_timeout'})
+    # Shed requests never ran, so even a non-idempotent call is resent
+    client = make_client([shed, 200], retries=2, breaker=breaker)
+    assert client.post('/feedback', json={}).status_code == 200
+    assert client.session.calls == 2 and sleeps == [1.0] and not breaker.is_open
+
+    client = make_client([shed], retries=0, breaker=breaker)
+    assert client.post('/predict', json={}).status_code == 503
+    assert not breaker.is_open
+
+
+def test_retry_after_beyond_the_budget_is_not_waited_for(monkeypatch):
+    import backend_client
+    sleeps = []
+    monkeypatch.setattr(backend_client.time, 'sleep', sleeps.append)
+    client = make_client([(429, {'Retry-After': '5', 'X-Load-Shed': 'queue_full'}), 200], retries=2, retry_budget=2.0)
+    assert client.post('/predict', json={}, idempotent=True).status_code == 429
+    assert client.session.calls == 1 and sleeps == []
@@ -0,0 +1,100 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../frontend')))
+
+import frontend
+from backend_client import BackendUnavailable
+
+HEADER = ("age,gender,total_bilirubin,direct_bilirubin,alkaline_phosphotase,alanine_aminotransferase,"
+          "aspartate_aminotransferase,total_proteins,albumin,albumin_globulin_ratio\n")
+VALID_ROW = "45,1,0.7,0.1,187,16,18,6.8,3.3,0.9\n"
+
+
+class FakeResponse:
+    ok = True
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class FakeBackend:
+    """Scores every patient with probability = age / 100 and records the chunk sizes"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.chunks = []
+
+    def post(self, path, json=None, idempotent=False):
+        assert path == '/predict/batch' and idempotent
+        if self.fail:
+            raise BackendUnavailable("Backend circuit breaker is open, failing fast")
+        self.chunks.append(len(json['patients']))
+        results = [{'index': i, 'probability': p['age'] / 100, 'prediction': int(p['age'] >= 50)}
+                   for i, p in enumerate(json['patients'])]
+        return FakeResponse({'results': results})
+
+
+@pytest.fixture
+def client():
+    with frontend.app.test_client() as client:
+        yield client
+
+
+def read_lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_csv_upload_is_scored_in_chunks(client, monkeypatch):
+    fake = FakeBackend()
+    monkeypatch.setattr(frontend, 'backend', fake)
+    monkeypatch.setattr(frontend, 'BULK_CHUNK_SIZE', 2)
+    body = HEADER + VALID_ROW + "200,1,0.7,0.1,187,16,18,6.8,3.3,0.9\n" + VALID_ROW.replace('45', '60', 1) + \
+        "30,2,0.7,0.1,187,16,18,6.8,3.3,0.9\n" + "31,0,abc,0.1,187,16,18,6.8,,0.9\n"
+
+    response = client.post('/api/predict/bulk', data={'file': (io.BytesIO(body.encode()), 'patients.csv')})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = read_lines(response)
+
+    assert [line['row'] for line in lines] == [0, 1, 2, 3, 4]
+    assert lines[0] == {'row': 0, 'probability': 0.45, 'prediction': 0}
+    assert lines[1]['error'] == "Age must be between 0.1 and 120"
+    assert lines[2] == {'row': 2, 'probability': 0.6, 'prediction': 1}
+    assert lines[3]['error'].startswith("Gender must be one of")
+    assert lines[4]['error'] == "Total Bilirubin must be between 0 and 100"
+    # Only the valid rows of each chunk reach the backend
+    assert fake.chunks == [1, 1]
+
+
+def test_ndjson_body_and_backend_failure(client, monkeypatch):
+    monkeypatch.setattr(frontend, 'backend', FakeBackend(fail=True))
+    patient = dict(zip(HEADER.strip().split(','), map(float, VALID_ROW.strip().split(','))))
+    body = json.dumps(patient) + "\n\n" + json.dumps({'age': 45}) + "\n"
+
+    response = client.post('/api/predict/bulk', data=body, content_type='application/x-ndjson')
+    lines = read_lines(response)
+    assert lines[0] == {'row': 0, 'error': "Backend circuit breaker is open, failing fast"}
+    assert lines[1] == {'row': 1, 'error': "Gender is required"}
+
+
+def test_bom_header_and_invalid_json_lines(client, monkeypatch):
+    monkeypatch.setattr(frontend, 'backend', FakeBackend())
+    body = ('\ufeff' + HEADER + VALID_ROW).encode()
+    response = client.post('/api/predict/bulk', data={'file': (io.BytesIO(body), 'patients.csv')})
+    assert read_lines(response) == [{'row': 0, 'probability': 0.45, 'prediction': 0}]
+
+    patient = dict(zip(HEADER.strip().split(','), map(float, VALID_ROW.strip().split(','))))
+    body = '\ufeff' + json.dumps(patient) + "\n{'age': 45\n[1, 2]\n"
+    response = client.post('/api/predict/bulk', data=body.encode(), content_type='application/x-ndjson')
+    assert read_lines(response) == [{'row': 0, 'probability': 0.45, 'prediction': 0},
+                                     {'row': 1, 'error': "Invalid JSON"},
+                                     {'row': 2, 'error': "Record must be a JSON object"}]